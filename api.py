@@ -0,0 +1,219 @@
+"""
+api.py — Service HTTP JSON (ASGI) de tarification, sans Streamlit
+
+Lancement local:
+    uvicorn api:app --port 8000 --workers 4
+
+Endpoints:
+    GET  /sante                 état du service
+    GET  /tarifs                fonctions tarifaires exposées et leurs paramètres
+    POST /tarifs/{nom}          appel d'une fonction tarifaire, corps = paramètres nommés
+    POST /cout-escale           coût d'escale TM / NWM / Algeciras, corps = paramètres navire/escale
+    POST /cout-escale/lot       {"escales": [...]} calculé par lots sur un pool de processus
+Les réponses /cout-escale sont mises en cache (LRU) par spécification navire/escale identique.
+"""
+import asyncio
+import inspect
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from tarifs_data import (
+    REMORQUAGE_TM, REMORQUAGE_TM_SUP, REMORQUAGE_NWM, REMORQUAGE_NWM_SUP,
+    calc_vg, calc_stationnement, calc_pilotage_tm, calc_pilotage_nwm_entree_sortie, calc_pilotage_nwm_chg_quai,
+    calc_remorquage, calc_lamanage_nwm, calc_alg_t1, calc_alg_t6, calc_alg_pilotage, calc_alg_dechets,
+)
+from cout_escale import ESCALE_DEFAUT, calc_cout_escale, calc_cout_escale_lot
+
+TAILLE_LOT = 500          # escales par tâche envoyée au pool
+CACHE_MAX = 50000         # réponses /cout-escale conservées
+NB_WORKERS = int(os.environ.get("SIMULATEUR_API_WORKERS", os.cpu_count() or 1))
+
+
+def calc_remorquage_tm(gt):
+    """Remorquage TM par remorqueur et par mouvement"""
+    return calc_remorquage(gt, REMORQUAGE_TM, REMORQUAGE_TM_SUP)
+
+
+def calc_remorquage_nwm(gt):
+    """Remorquage NWM par remorqueur et par mouvement"""
+    return calc_remorquage(gt, REMORQUAGE_NWM, REMORQUAGE_NWM_SUP)
+
+
+FONCTIONS_TARIFS = {
+    "vg": calc_vg,
+    "stationnement": calc_stationnement,
+    "pilotage_tm": calc_pilotage_tm,
+    "pilotage_nwm": calc_pilotage_nwm_entree_sortie,
+    "pilotage_nwm_chg_quai": calc_pilotage_nwm_chg_quai,
+    "remorquage_tm": calc_remorquage_tm,
+    "remorquage_nwm": calc_remorquage_nwm,
+    "lamanage_nwm": calc_lamanage_nwm,
+    "alg_t1": calc_alg_t1,
+    "alg_t6": calc_alg_t6,
+    "alg_pilotage": calc_alg_pilotage,
+    "alg_dechets": calc_alg_dechets,
+}
+
+
+class ErreurRequete(Exception):
+    """Erreur client → réponse 4xx"""
+    def __init__(self, message, statut=400):
+        super().__init__(message)
+        self.statut = statut
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CACHE DE RÉPONSES & POOL DE CALCUL
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_cache = OrderedDict()
+_pool = None
+
+
+def _cle_escale(e):
+    """Clé canonique d'une spécification d'escale (défauts appliqués)"""
+    if not isinstance(e, dict):
+        raise ErreurRequete("Chaque escale doit être un objet JSON")
+    inconnus = set(e) - set(ESCALE_DEFAUT) - {"loa", "beam", "draft", "gt"}
+    if inconnus:
+        raise ErreurRequete(f"Paramètres inconnus: {sorted(inconnus)}")
+    return json.dumps({**ESCALE_DEFAUT, **e}, sort_keys=True, ensure_ascii=False)
+
+
+def _cache_get(k):
+    val = _cache.get(k)
+    if val is not None:
+        _cache.move_to_end(k)
+    return val
+
+
+def _cache_set(k, val):
+    _cache[k] = val
+    _cache.move_to_end(k)
+    while len(_cache) > CACHE_MAX:
+        _cache.popitem(last=False)
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=NB_WORKERS)
+    return _pool
+
+
+def cout_escale(e):
+    """Coût d'une escale, servi depuis le cache si la spécification a déjà été calculée"""
+    k = _cle_escale(e)
+    res = _cache_get(k)
+    if res is None:
+        try:
+            res = calc_cout_escale(**json.loads(k))
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ErreurRequete(f"Paramètres invalides: {exc!r}")
+        _cache_set(k, res)
+    return res
+
+
+async def cout_escale_lot(escales):
+    """Coûts d'une liste d'escales: cache d'abord, puis calcul des manquantes par lots sur le pool"""
+    if not isinstance(escales, list):
+        raise ErreurRequete("'escales' doit être une liste")
+    cles = [_cle_escale(e) for e in escales]
+    resultats = {k: _cache_get(k) for k in dict.fromkeys(cles)}
+    manquantes = [k for k, v in resultats.items() if v is None]
+    if manquantes:
+        specs = [json.loads(k) for k in manquantes]
+        lots = [specs[i:i + TAILLE_LOT] for i in range(0, len(specs), TAILLE_LOT)]
+        loop = asyncio.get_running_loop()
+        try:
+            calcules = await asyncio.gather(*(loop.run_in_executor(_get_pool(), calc_cout_escale_lot, lot) for lot in lots))
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ErreurRequete(f"Paramètres invalides: {exc!r}")
+        for k, res in zip(manquantes, (r for lot in calcules for r in lot)):
+            resultats[k] = res
+            _cache_set(k, res)
+    return [resultats[k] for k in cles]
+
+
+def appeler_tarif(nom, params):
+    """Appel d'une fonction tarifaire exposée avec des paramètres nommés"""
+    fn = FONCTIONS_TARIFS.get(nom)
+    if fn is None:
+        raise ErreurRequete(f"Fonction tarifaire inconnue: {nom}", 404)
+    if not isinstance(params, dict):
+        raise ErreurRequete("Le corps doit être un objet JSON de paramètres nommés")
+    try:
+        return {"fonction": nom, "valeur": fn(**params)}
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ErreurRequete(f"Paramètres invalides: {exc!r}")
+
+
+def lister_tarifs():
+    return {nom: list(inspect.signature(fn).parameters) for nom, fn in FONCTIONS_TARIFS.items()}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# APPLICATION ASGI
+# ═══════════════════════════════════════════════════════════════════════════════
+
+async def _lire_json(receive):
+    corps = b""
+    while True:
+        msg = await receive()
+        corps += msg.get("body", b"")
+        if not msg.get("more_body"):
+            break
+    try:
+        return json.loads(corps or b"{}")
+    except ValueError:
+        raise ErreurRequete("Corps JSON invalide")
+
+
+async def _repondre(send, statut, payload):
+    corps = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send({"type": "http.response.start", "status": statut,
+                "headers": [(b"content-type", b"application/json; charset=utf-8"),
+                            (b"content-length", str(len(corps)).encode())]})
+    await send({"type": "http.response.body", "body": corps})
+
+
+async def _router(methode, chemin, receive):
+    if chemin == "/sante" and methode == "GET":
+        return {"statut": "ok", "cache": len(_cache)}
+    if chemin == "/tarifs" and methode == "GET":
+        return lister_tarifs()
+    if chemin.startswith("/tarifs/") and methode == "POST":
+        return appeler_tarif(chemin[len("/tarifs/"):], await _lire_json(receive))
+    if chemin == "/cout-escale" and methode == "POST":
+        return cout_escale(await _lire_json(receive))
+    if chemin == "/cout-escale/lot" and methode == "POST":
+        corps = await _lire_json(receive)
+        return {"resultats": await cout_escale_lot(corps.get("escales") if isinstance(corps, dict) else corps)}
+    if chemin in ("/sante", "/tarifs", "/cout-escale", "/cout-escale/lot") or chemin.startswith("/tarifs/"):
+        raise ErreurRequete(f"Méthode {methode} non autorisée", 405)
+    raise ErreurRequete(f"Route inconnue: {chemin}", 404)
+
+
+async def app(scope, receive, send):
+    """Point d'entrée ASGI (uvicorn api:app)"""
+    global _pool
+    if scope["type"] == "lifespan":
+        while True:
+            msg = await receive()
+            if msg["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif msg["type"] == "lifespan.shutdown":
+                if _pool is not None:
+                    _pool.shutdown(cancel_futures=True)
+                    _pool = None
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+    try:
+        payload = await _router(scope["method"], scope["path"].rstrip("/") or "/", receive)
+        await _repondre(send, 200, payload)
+    except ErreurRequete as exc:
+        await _repondre(send, exc.statut, {"erreur": str(exc)})
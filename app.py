@@ -5,13 +5,41 @@ Cahiers tarifaires 2025
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
+import io
 import math
+import json
 from tarifs_data import *
+from projections import *
+from scenarios import iter_scenarios, table_scenarios
+from taches import lancer, annuler, annuler_si_perimee, en_cours
+from cout_escale import PORTS, ESCALE_DEFAUT, calc_cout_escale, tarif_ctn_alg, tarifs_courants
+from export import FORMATS, archive_zip, tables_export, exporter_projection_flux
+from tableaux import (fmt, pct, table, EUR, TAUX, PCT, grille_droits_port, grille_remorquage,
+                      grille_manutention_ctn, grille_marchandises_div, grille_hydrocarbures, grille_alg_pilotage, grille_stockage_ctn,
+                      grille_recap_cout, grille_projection, grille_ecart_projection)
+from cache_disque import en_cache
+from stockage_vrac import cout_vrac, cout_lots
+from mrn import cout_mrn, facturer_mrn
+from tvcu import TYPES_TVCU, OPERATIONS_TVCU, tarifer_manifeste, ventilation
+from services import SERVICES, factures_services, totaux_escale
+from facture import facture_escale, lignes_dataframe
+from classeurs import lire_flotte, ecrire_flotte, modele_flotte, lire_navires, lire_scenarios, ecrire_scenarios
+from flotte import AXES, TAILLES_PAGE, tarifer_flotte, agregat_ports, agregat, page
+from historique import importer_csv, inventaire, iter_retarification
+from estimation import INDEX_NAVIRES, TOUS_TYPES, compiler_index, table_index, proportions_type
+from optimisation_nwm import MODES, BORNES_DEFAUT, flotte_reference, optimiser
+from parts_marche import (ELASTICITE_DEFAUT, compiler_marche, equilibre, projection_equilibre, table_parts,
+                          table_ports)
+from revision_tarifs import version, charger_version, json_version, diff_tarifs, impact, impact_historique, synthese_impact
+from postes_quai import (POSTES_NWM, PROFILS_SAISON, PROFIL_CATEGORIE, CV_SEJOUR, simuler, synthese_postes,
+                         synthese_mensuelle, simulation_horizon)
+from balayage import AXES_BALAYAGE, PLAGES_BALAYAGE, LIGNES, balayer
+from rapprochement import TOLERANCE_EUR, TOLERANCE_REL, rapprocher, synthese_rapprochement, modele_classeur
+from parking_tir import montant_sejour, etat_parking, facturer_flux, lire_evenements_csv, synthese
 
 # ─── CONFIG ──────────────────────────────────────────────────────────────────
 st.set_page_config(page_title="Simulateur Tarifs TM vs NWM vs Algeciras", page_icon="🚢", layout="wide")
 TM_C, NWM_C, ALG_C = "#1B4F72", "#C0392B", "#2E7D32"
-TAUX_DH_EUR_DEFAULT = 10.85
 
 # ─── CSS ─────────────────────────────────────────────────────────────────────
 st.markdown("""<style>
@@ -21,12 +49,6 @@ st.markdown("""<style>
 </style>""", unsafe_allow_html=True)
 
 # ─── HELPERS ─────────────────────────────────────────────────────────────────
-def fmt(v): return f"{v:,.2f} €"
-def pct(tm, nwm):
-    if tm == 0: return "—"
-    d = (nwm - tm) / tm * 100
-    return f"{'+' if d > 0 else ''}{d:.1f}%"
-
 def bar2(label, vtm, vnwm, title=""):
     fig = go.Figure()
     fig.add_trace(go.Bar(name="Tanger Med", x=[title or ""], y=[vtm], marker_color=TM_C, text=[fmt(vtm)], textposition="outside"))
@@ -58,6 +80,34 @@ def stacked_bar(labels, vtm, vnwm):
     fig.update_layout(barmode="stack", height=480, margin=dict(t=30,b=20), yaxis_title="€", legend=dict(orientation="h", y=1.12))
     return fig
 
+def afficher_table(df, hide_index=True):
+    """Rendu d'une table numérique: formats (df.attrs) appliqués par column_config, valeurs triables"""
+    cfg = {c: st.column_config.NumberColumn(c, format=f) for c, f in df.attrs.get("formats", {}).items()}
+    st.dataframe(df, use_container_width=True, hide_index=hide_index, column_config=cfg)
+
+def balayage_ui(lignes, cle, base, proportions=None, axes=("gt", "vg", "loa"), height=420):
+    """Choix de l'axe, de la plage et de la résolution puis balayage des lignes → (DataFrame, axe, figure)"""
+    c1, c2, c3, c4 = st.columns(4)
+    with c1: axe = st.selectbox("Axe", axes, format_func=AXES_BALAYAGE.get, key=f"{cle}_axe")
+    lo, hi = PLAGES_BALAYAGE[axe]
+    with c2: debut = st.number_input("De", 0.0, None, float(lo), key=f"{cle}_de_{axe}")
+    with c3: fin = st.number_input("À", 0.0, None, float(hi), key=f"{cle}_a_{axe}")
+    with c4: nb_pts = st.number_input("Points", 10, 5000, 200, 10, key=f"{cle}_pts", disabled=axe == "nb_rem")
+    df = balayer(lignes, axe, debut, max(fin, debut + 1), pas=1 if axe == "nb_rem" else None, nb_points=nb_pts,
+                 base=base, proportions=proportions)
+    x = AXES_BALAYAGE[axe]
+    fig = go.Figure()
+    styles = {"TM": (TM_C, "solid"), "NWM": (NWM_C, "dash"), "Algeciras": (ALG_C, "dot")}
+    for l in lignes:
+        coul, tiret = styles[LIGNES[l]["port"]]
+        fig.add_trace(go.Scatter(x=df[x], y=df[l], name=l, line=dict(color=coul, width=3, dash=tiret)))
+    fig.update_layout(xaxis_title=x, yaxis_title="€", height=height)
+    return df, axe, fig
+
+# ─── CACHE DISQUE (partagé entre sessions et workers) ────────────────────────
+calc_projection_c = en_cache("projection")(calc_projection)
+calc_revenus_par_escale_c = en_cache("revenus_escale")(calc_revenus_par_escale)
+
 # ─── SIDEBAR ─────────────────────────────────────────────────────────────────
 with st.sidebar:
     st.title("⚙️ Paramètres Navire")
@@ -89,7 +139,7 @@ st.caption("**Tanger Med** vs **Nador West Med** vs **Algeciras** — Tous les 
 tabs = st.tabs(["🏗️ Droits Port","🧭 Pilotage","⚓ Remorquage","🪢 Lamanage",
                 "📦 Conteneurs","🚛 Marchandises Div.","🛢️ Hydrocarbures",
                 "🚗 Roulier","📊 Stockage","🔧 Services & Divers",
-                "🇪🇸 Algeciras","💰 Coût Total 3 Ports","📈 Projections NWM"])
+                "🇪🇸 Algeciras","💰 Coût Total 3 Ports","🚢 Flotte 3 Ports","📈 Projections NWM"])
 
 # ═════════════════════════════════════════════════════════════════════════════
 # TAB 0 — DROITS DE PORT SUR NAVIRES
@@ -129,20 +179,7 @@ with tabs[0]:
     st.markdown(f"**Écart NWM vs TM : {pct(tot_dp_tm, tot_dp_nwm)}**")
 
     with st.expander("📋 Grille complète des taux (€/m³)"):
-        rows = []
-        mapping = [("TC", "Terminaux à Conteneurs (TC1-TC4)", "Terminal à Conteneurs"),
-                   ("Vrac/MD", "Terminal Vrac & MD", "Terminal Marchandises Div"),
-                   ("Hydrocarbures", "Terminal Hydrocarbures", "Terminal Hydrocarbures"),
-                   ("GPL/GAZ", "Navires GPL", "Terminal GAZ")]
-        for label, tm_k, nwm_k in mapping:
-            a = DROITS_PORT_NAVIRES_TM.get(tm_k, {})
-            b = DROITS_PORT_NAVIRES_NWM.get(nwm_k, {})
-            if a and b:
-                rows.append({"Terminal": label,
-                    "TM Naut.": a["nautique"], "NWM Naut.": b["nautique"],
-                    "TM Port": a["port"], "NWM Port": b["port"],
-                    "TM Stat.": a["stationnement"], "NWM Stat.": b["stationnement"]})
-        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        afficher_table(grille_droits_port())
 
     with st.expander("📜 Règles de modulation — Stationnement"):
         st.markdown("""
@@ -182,8 +219,8 @@ with tabs[1]:
             if des_tm: t *= 2
             if dur_dep: t *= 1.5
             tot_pil_tm += t
-            det.append({"Mouvement": m, "Tarif (€)": f"{t:,.2f}"})
-        st.dataframe(pd.DataFrame(det), use_container_width=True, hide_index=True)
+            det.append({"Mouvement": m, "Tarif (€)": t})
+        afficher_table(table(det, {"Tarif (€)": EUR}, ["Mouvement", "Tarif (€)"]))
         st.metric("**TOTAL Pilotage TM**", fmt(tot_pil_tm))
 
     with c2:
@@ -192,46 +229,43 @@ with tabs[1]:
         des_nwm = st.checkbox("Navire désemparé (×2)", key="des_nwm")
         p_es = calc_pilotage_nwm_entree_sortie(gt)
         p_cq = calc_pilotage_nwm_chg_quai(gt)
-        st.caption(f"E/S: 0.022641 × {gt:,} + 21.26 = **{p_es:,.2f} €** | Chg.Quai: {p_cq:,.2f} € | Min: 261,10 €")
+        p_nwm = PILOTAGE_NWM["Entrée/Sortie"]
+        st.caption(f"E/S: {p_nwm['variable']:.6f} × {gt:,} + {p_nwm['fixe']:.2f} = **{p_es:,.2f} €** | "
+                   f"Chg.Quai: {p_cq:,.2f} € | Min: {p_nwm['min']:,.2f} €")
         tot_pil_nwm = 0
         det2 = []
         for m in mvts_nwm:
             t = p_es if m == "Entrée/Sortie" else p_cq
             if des_nwm: t *= 2
             tot_pil_nwm += t
-            det2.append({"Mouvement": m, "Tarif (€)": f"{t:,.2f}"})
-        st.dataframe(pd.DataFrame(det2), use_container_width=True, hide_index=True)
+            det2.append({"Mouvement": m, "Tarif (€)": t})
+        afficher_table(table(det2, {"Tarif (€)": EUR}, ["Mouvement", "Tarif (€)"]))
         st.metric("**TOTAL Pilotage NWM**", fmt(tot_pil_nwm))
 
     st.plotly_chart(bar2("", tot_pil_tm, tot_pil_nwm, "Pilotage"), use_container_width=True)
 
     with st.expander("📈 Courbe pilotage E+S par taille navire"):
         st.caption("""
-        **Méthode:** On utilise les proportions du navire saisi (LOA/beam/draft) comme référence,
-        puis on fait varier la taille par un facteur d'échelle. Le VG est recalculé à chaque point
-        via la formule officielle VG = L × b × Te. Le GT est estimé via le ratio GT/VG du navire de référence.
+        **Méthode:** Le navire est mis à l'échelle à proportions constantes (LOA/beam, Te/beam et ratio GT/VG
+        du navire saisi ou médianes du type de navire choisi). Le VG est recalculé à chaque point
+        via la formule officielle VG = L × b × Te; les bornes de tranches du barème sont placées exactement
+        sur l'axe (fin de tranche et début de la suivante), les discontinuités apparaissent sans approximation.
         """)
-        # Ratio réel GT/VG du navire saisi
-        ratio_gt_vg = gt / vg if vg > 0 else 0.3
-        # Gamme de GT cible de 5k à 150k
-        gts_target = list(range(5000, 150001, 2500))
-        c_tm, c_nwm = [], []
-        for g_t in gts_target:
-            # VG dérivé du ratio du navire de référence
-            vg_t = g_t / ratio_gt_vg
-            c_tm.append(calc_pilotage_tm(vg_t, "Entrée") + calc_pilotage_tm(vg_t, "Sortie"))
-            c_nwm.append(calc_pilotage_nwm_entree_sortie(g_t) * 2)
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(x=gts_target, y=c_tm, name="Tanger Med (barème VG)", line=dict(color=TM_C, width=3)))
-        fig.add_trace(go.Scatter(x=gts_target, y=c_nwm, name="NWM (formule GT)", line=dict(color=NWM_C, width=3, dash="dash")))
+        ref_ratio = st.selectbox("Ratio GT/VG", ["Navire saisi"] + INDEX_NAVIRES["types"], key="pil_ratio",
+                                 format_func=lambda t: "Tous types (médiane)" if t == TOUS_TYPES else t)
+        prop_pil = None if ref_ratio == "Navire saisi" else proportions_type(ref_ratio)
+        ratio_gt_vg = (gt / vg if vg > 0 else 0.3) if prop_pil is None else prop_pil["ratio_gt_vg"]
+        _, axe_pil, fig = balayage_ui(["TM · Pilotage E+S", "NWM · Pilotage E+S"], "pil",
+                                      {"loa": loa, "beam": beam, "draft": draft, "gt": gt}, prop_pil)
         # Marqueur pour le navire actuel
         pil_now_tm = calc_pilotage_tm(vg, "Entrée") + calc_pilotage_tm(vg, "Sortie")
         pil_now_nwm = calc_pilotage_nwm_entree_sortie(gt) * 2
-        fig.add_trace(go.Scatter(x=[gt, gt], y=[pil_now_tm, pil_now_nwm],
+        x_now = {"gt": gt, "vg": vg, "loa": loa}[axe_pil]
+        fig.add_trace(go.Scatter(x=[x_now, x_now], y=[pil_now_tm, pil_now_nwm],
             mode="markers", marker=dict(size=12, symbol="diamond"),
             name=f"Navire actuel (GT={gt:,})", showlegend=True))
-        fig.update_layout(xaxis_title="GT (axe de référence)", yaxis_title="Pilotage Entrée+Sortie (€)", height=420,
-            annotations=[dict(x=gt, y=max(pil_now_tm, pil_now_nwm)*1.08,
+        fig.update_layout(yaxis_title="Pilotage Entrée+Sortie (€)",
+            annotations=[dict(x=x_now, y=max(pil_now_tm, pil_now_nwm)*1.08,
                 text=f"Votre navire<br>GT={gt:,} / VG={vg:,.0f}m³", showarrow=False, font=dict(size=11))])
         st.plotly_chart(fig, use_container_width=True)
 
@@ -249,7 +283,9 @@ with tabs[1]:
             - Écart: **{pil_t1 - pil_t2:,.0f}€** → Avantage significatif pour les très grands navires à TM
             """)
 
-        st.info(f"**Ratio de référence:** GT/VG = {ratio_gt_vg:.4f} (basé sur votre navire: GT={gt:,} / VG={vg:,.0f}m³). "
+        base_ratio = (f"basé sur votre navire: GT={gt:,} / VG={vg:,.0f}m³" if ref_ratio == "Navire saisi"
+                      else f"médiane des navires de référence: {ref_ratio}")
+        st.info(f"**Ratio de référence:** GT/VG = {ratio_gt_vg:.4f} ({base_ratio}). "
                 f"TM utilise le VG (m³), NWM utilise les GTs — les deux assiettes sont liées par les proportions de votre navire. "
                 f"Ce ratio varie selon le type de navire: un porte-conteneurs aura un ratio différent d'un tanker ou d'un ferry.")
 
@@ -296,12 +332,7 @@ with tabs[2]:
     st.plotly_chart(bar2("", tot_r_tm, tot_r_nwm, "Remorquage"), use_container_width=True)
 
     with st.expander("📋 Barème complet"):
-        all_gts = sorted(set([lo for lo,_,_ in REMORQUAGE_TM] + [lo for lo,_,_ in REMORQUAGE_NWM]))
-        rows = []
-        for lo, hi, t in REMORQUAGE_TM:
-            n = calc_remorquage((lo+hi)//2, REMORQUAGE_NWM, REMORQUAGE_NWM_SUP)
-            rows.append({"GT": f"{lo:,}–{hi:,}", "TM (€)": f"{t:,.1f}", "NWM (€)": f"{n:,.1f}", "Δ": pct(t, n)})
-        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        afficher_table(grille_remorquage())
 
     with st.expander("📜 Services spéciaux remorquage"):
         st.markdown(f"""
@@ -334,7 +365,7 @@ with tabs[3]:
     with c2:
         st.subheader("🔴 NWM — Formule GTs")
         tot_l_nwm = calc_lamanage_nwm(gt)
-        st.caption(f"0.0108104 × {gt:,} + 6.68 = **{tot_l_nwm:,.2f} €**")
+        st.caption(f"{LAMANAGE_NWM['variable']} × {gt:,} + {LAMANAGE_NWM['fixe']} = **{tot_l_nwm:,.2f} €**")
         st.metric("**TOTAL NWM**", fmt(tot_l_nwm))
 
     st.plotly_chart(bar2("", tot_l_tm, tot_l_nwm, "Lamanage"), use_container_width=True)
@@ -369,11 +400,7 @@ with tabs[4]:
     st.plotly_chart(bar2("", tot_c_tm, tot_c_nwm, f"Conteneurs {op_ctn}"), use_container_width=True)
 
     with st.expander("📋 Manutention Conteneurs TM (tarifs max publics)"):
-        rows = []
-        for tc, v in MANUTENTION_CTN_TM.items():
-            rows.append({"Terminal": tc, "20' Bord-Quai": f"{v['20_bord_quai']}€", "40' Bord-Quai": f"{v['40_bord_quai']}€",
-                         "20' Terre": f"{v['20_terre']}€", "Pesage": f"{v['pesage']}€"})
-        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        afficher_table(grille_manutention_ctn())
         st.warning("⚠️ NWM ne publie pas de tarifs de manutention conteneurs")
 
 # ═════════════════════════════════════════════════════════════════════════════
@@ -383,17 +410,7 @@ with tabs[5]:
     st.header("🚛 Marchandises Diverses")
     tonnage = st.number_input("Tonnage (tonnes)", 1, 500000, 5000, 100, key="ton_md")
     all_md = sorted(set(list(MARCHANDISES_DIV_TM.keys()) + list(MARCHANDISES_DIV_NWM.keys())))
-    rows = []
-    for t in all_md:
-        a = MARCHANDISES_DIV_TM.get(t)
-        b = MARCHANDISES_DIV_NWM.get(t)
-        rows.append({"Marchandise": t,
-            "TM (€/T)": f"{a:.3f}" if a else "N/A",
-            "NWM (€/T)": f"{b:.3f}" if b else "N/A",
-            f"TM ({tonnage:,}T)": fmt(a * tonnage) if a else "N/A",
-            f"NWM ({tonnage:,}T)": fmt(b * tonnage) if b else "N/A",
-            "Écart": pct(a, b) if (a and b) else "—"})
-    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    afficher_table(grille_marchandises_div(tonnage))
 
     common = [t for t in all_md if t in MARCHANDISES_DIV_TM and t in MARCHANDISES_DIV_NWM]
     fig = go.Figure()
@@ -414,11 +431,7 @@ with tabs[6]:
     st.metric(f"🔴 NWM: {t_h} €/T × {ton_h:,}T", fmt(t_h * ton_h))
     st.info("Tanger Med ne publie pas de détail comparable pour les hydrocarbures")
 
-    rows = []
-    for p, ops in HYDROCARBURES_NWM.items():
-        for o, t in ops.items():
-            rows.append({"Produit": p, "Opération": o, "€/T": t, f"Total {ton_h:,}T": fmt(t * ton_h)})
-    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    afficher_table(grille_hydrocarbures(ton_h))
 
 # ═════════════════════════════════════════════════════════════════════════════
 # TAB 7 — ROULIER
@@ -464,8 +477,8 @@ with tabs[7]:
         st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
     with c2:
         st.markdown(f"#### 🔴 NWM (DH → € @ {taux_dh:.2f})")
-        rows = [{"Type": k, "DH": f"{v:,.2f}", "€": fmt(v / taux_dh)} for k, v in MARCHANDISES_ROULIER_NWM_DH.items()]
-        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        rows = [{"Type": k, "DH": v, "€": v / taux_dh} for k, v in MARCHANDISES_ROULIER_NWM_DH.items()]
+        afficher_table(table(rows, {"DH": "%.2f", "€": EUR}))
         st.warning("⚠️ NWM facture en DH — risque de change")
 
     st.divider()
@@ -500,20 +513,13 @@ with tabs[8]:
         nb_j = st.slider("Durée (jours)", 1, 30, 7, key="nb_j")
         nb_c = st.number_input("Nombre conteneurs", 1, 5000, 100, key="nb_c")
 
-    tarifs = STOCKAGE_CTN_TM[tc_s][type_s]
-    cout = 0
-    det = []
-    for j in range(1, nb_j + 1):
-        if j <= tarifs["franchise"]: t = 0; p = "Franchise"
-        elif j <= 7: t = tarifs["j3_7"]; p = "J3-7"
-        else: t = tarifs["j8+"]; p = "J8+"
-        cout += t
-        det.append({"Jour": j, "Période": p, "€/j": f"{t:.2f}", "Cumul": f"{cout:.2f}"})
+    det = grille_stockage_ctn(STOCKAGE_CTN_TM[tc_s][type_s], nb_j)
+    cout = det["Cumul"].iloc[-1]
     with c2:
         st.metric(f"Coût/conteneur ({nb_j}j)", fmt(cout))
         st.metric(f"**TOTAL ({nb_c} × {nb_j}j)**", fmt(cout * nb_c))
         with st.expander("Détail jour par jour"):
-            st.dataframe(pd.DataFrame(det), use_container_width=True, hide_index=True)
+            afficher_table(det)
 
     st.warning("⚠️ **NWM ne publie aucun tarif de stockage conteneurs** — lacune majeure")
 
@@ -525,10 +531,46 @@ with tabs[8]:
             rows.append({"Lieu": lieu, "Période": per, "€/T/j": val})
     st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
 
+    c1, c2, c3 = st.columns(3)
+    with c1: lieu_v = st.selectbox("Lieu", list(STOCKAGE_VRAC_TM.keys()), key="vrac_lieu")
+    with c2: ton_v = st.number_input("Tonnage", 1, 500000, 5000, 100, key="vrac_t")
+    with c3: jours_v = st.number_input("Jours", 1, 365, 20, 1, key="vrac_j")
+    st.metric(f"Stockage vrac {lieu_v} — {ton_v:,}T × {jours_v}j", fmt(cout_vrac(lieu_v, ton_v, jours_v)))
+
+    with st.expander("📦 Inventaire de lots (réévaluation par durée)"):
+        lots_v = st.data_editor(pd.DataFrame({"lieu": ["Hangar", "Terre-plein", "Terre-plein"],
+                                              "tonnage": [1200.0, 8000.0, 25000.0], "jours": [8, 12, 30]}),
+                                num_rows="dynamic", use_container_width=True, hide_index=True, key="vrac_lots",
+                                column_config={"lieu": st.column_config.SelectboxColumn("lieu", options=list(STOCKAGE_VRAC_TM))})
+        decal_v = st.slider("Jours supplémentaires (tous lots)", 0, 60, 0, key="vrac_dec")
+        lots_v = lots_v.dropna()
+        lots_v["coût (€)"] = cout_lots(lots_v["lieu"], lots_v["tonnage"], lots_v["jours"] + decal_v)
+        afficher_table(table(lots_v, {"coût (€)": EUR}))
+        st.metric("Total inventaire", fmt(lots_v["coût (€)"].sum()))
+
     st.divider()
     st.subheader("Parking TIR (Tanger Med)")
     rows = [{"Catégorie": k, **{kk: vv for kk, vv in v.items()}} for k, v in PARKING_TIR_TM.items()]
     st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    st.caption(f"Plafond litiges douane: {PARKING_TIR_PLAFOND_LITIGE:,} € par séjour")
+
+    c1, c2, c3 = st.columns(3)
+    with c1: cat_p = st.selectbox("Catégorie", list(PARKING_TIR_TM.keys()), key="tir_cat")
+    with c2: duree_p = st.number_input("Durée de séjour (h)", 0.0, 2000.0, 96.0, 1.0, key="tir_h")
+    with c3: litige_p = st.checkbox("Litige douane (plafond)", key="tir_lit")
+    st.metric(f"Parking TIR — {duree_p:,.0f}h", fmt(montant_sejour(cat_p, duree_p, litige_p)))
+
+    with st.expander("🚛 Facturation d'un fichier d'événements portes (CSV)"):
+        st.caption("Colonnes: horodatage (ISO 8601), sens (in/out), camion, categorie, litige (optionnel). "
+                   "Événements triés par horodatage; facturation en une passe.")
+        ev_csv = st.file_uploader("Événements portes", type="csv", key="tir_csv")
+        if ev_csv is not None:
+            etat_p = etat_parking()
+            sejours_p = list(facturer_flux(lire_evenements_csv(io.TextIOWrapper(ev_csv, encoding="utf-8")), etat_p))
+            afficher_table(table(synthese(etat_p), {"duree_moy_h": "%.1f", "revenus": EUR}))
+            st.metric("Total facturé", fmt(sum(s["montant"] for s in sejours_p)))
+            if etat_p["anomalies"]:
+                st.warning(f"{len(etat_p['anomalies'])} événements ignorés (entrée double, sortie sans entrée, catégorie inconnue)")
 
 # ═════════════════════════════════════════════════════════════════════════════
 # TAB 9 — SERVICES DIVERS
@@ -561,14 +603,73 @@ with tabs[9]:
         st.subheader("🚗 TVCU Manutention TM")
         st.dataframe(pd.DataFrame([{"Service": k, "€": v} for k, v in TVCU_MANUTENTION_TM.items()]), use_container_width=True, hide_index=True)
 
+    with st.expander("🚢 Manifeste car-carrier — tarification TVCU"):
+        st.caption("Une ligne par véhicule ou par lot (colonne nb). Types: " + ", ".join(TYPES_TVCU) +
+                   ". CSV: type, poids_t, operation[, nb, depannage, escale].")
+        man_csv = st.file_uploader("Manifeste(s) (CSV)", type="csv", key="tvcu_csv")
+        if man_csv is not None:
+            manifeste = pd.read_csv(man_csv)
+        else:
+            manifeste = st.data_editor(pd.DataFrame({
+                "type": ["tourisme", "tourisme", "tourisme", "leger_roulant"], "poids_t": [1.2, 2.1, 3.4, 1.4],
+                "operation": ["Import", "Import", "Import", "Transbordement"], "nb": [4200, 900, 150, 600],
+                "depannage": [False, False, False, True]}),
+                num_rows="dynamic", use_container_width=True, hide_index=True, key="tvcu_edit",
+                column_config={"type": st.column_config.SelectboxColumn("type", options=list(TYPES_TVCU)),
+                               "operation": st.column_config.SelectboxColumn("operation", options=OPERATIONS_TVCU)}).dropna(subset=["type", "operation"])
+        try:
+            tarife = tarifer_manifeste(manifeste)
+        except (KeyError, ValueError) as e:
+            st.error(f"Manifeste invalide: {e}")
+        else:
+            vent = ventilation(tarife, "escale" if "escale" in tarife else None)
+            afficher_table(table(vent, {"manutention": EUR, "depannage_eur": EUR, "total": EUR}))
+            st.metric("Total manutention + dépannage", fmt(tarife["total"].sum()))
+
     c1, c2 = st.columns(2)
     with c1:
         st.subheader("📄 MRN TM")
         st.dataframe(pd.DataFrame([{"Tranche": k, "€/MRN": v} for k, v in MRN_TM.items()]), use_container_width=True, hide_index=True)
+        nb_mrn = st.number_input("MRN / agent / mois", 0, 100000, 800, 50, key="mrn_nb")
+        m1, m2 = st.columns(2)
+        m1.metric("Progressif (marginal)", fmt(cout_mrn(nb_mrn, "progressif")))
+        m2.metric("Tranche atteinte (tout le volume)", fmt(cout_mrn(nb_mrn, "tranche")))
+        mrn_csv = st.file_uploader("Déclarations MRN (CSV: agent, date)", type="csv", key="mrn_csv")
+        if mrn_csv is not None:
+            fact_mrn = facturer_mrn(pd.read_csv(mrn_csv, usecols=["agent", "date"]))
+            afficher_table(table(fact_mrn, {"cout_progressif": EUR, "cout_tranche": EUR, "ecart": EUR}))
     with c2:
         st.subheader("🏥 Divers TM")
         st.metric("Consultation médicale", f"{CONSULTATION_MEDICALE_TM} €")
-        st.dataframe(pd.DataFrame([{"": k, "Tarif": f"{v} €"} for k, v in DIVERS_TM.items()]), use_container_width=True, hide_index=True)
+        afficher_table(table([{"": k, "Tarif": v} for k, v in DIVERS_TM.items()], {"Tarif": "%g €"}))
+
+    st.divider()
+    st.subheader("🧾 Facturation fournitures & services par escale (3 ports)")
+    st.caption("Relevés de compteurs et vacations: escale, port, service, quantite (m³, kWh, h, kg), nb (remorqueurs). "
+               f"Services: {', '.join(SERVICES)}. Heures entamées, minimums et tranches de mise à disposition appliqués.")
+    rel_csv = st.file_uploader("Relevés (CSV)", type="csv", key="srv_csv")
+    if rel_csv is not None:
+        releves = pd.read_csv(rel_csv)
+    else:
+        releves = st.data_editor(pd.DataFrame({
+            "escale": ["E1"] * 6, "port": ["TM", "TM", "TM", "NWM", "NWM", "Algeciras"],
+            "service": ["eau", "elec_mt", "remorqueur_dispo", "eau", "elec_mt", "eau"],
+            "quantite": [150.0, 4000.0, 5.0, 150.0, 4000.0, 150.0], "nb": [1, 1, 2, 1, 1, 1]}),
+            num_rows="dynamic", use_container_width=True, hide_index=True, key="srv_edit",
+            column_config={"port": st.column_config.SelectboxColumn("port", options=PORTS),
+                           "service": st.column_config.SelectboxColumn("service", options=list(SERVICES))}).dropna(subset=["port", "service"])
+    try:
+        fact_srv = factures_services(releves)
+    except (KeyError, ValueError) as e:
+        st.error(f"Relevés invalides: {e}")
+    else:
+        c1, c2 = st.columns([3, 2])
+        with c1: afficher_table(table(fact_srv, {"montant": EUR}))
+        with c2:
+            tot_srv = totaux_escale(fact_srv)
+            tot_srv.attrs["formats"] = {p: EUR for p in PORTS}
+            afficher_table(tot_srv, hide_index=False)
+        st.caption("Montant vide = service non publié dans ce port.")
 
 # ═════════════════════════════════════════════════════════════════════════════
 # TAB 10 — ALGECIRAS
@@ -687,32 +788,21 @@ with tabs[10]:
 
         # Courbe comparative par taille navire
         with st.expander("📈 Courbe pilotage E+S par taille navire (3 ports)"):
-            ratio_gt_vg = gt / vg if vg > 0 else 0.3
-            gts_pil = list(range(5000, 150001, 2500))
-            c_tm_p, c_nwm_p, c_alg_p = [], [], []
-            for g_t in gts_pil:
-                vg_t = g_t / ratio_gt_vg
-                c_tm_p.append(calc_pilotage_tm(vg_t, "Entrée") + calc_pilotage_tm(vg_t, "Sortie"))
-                c_nwm_p.append(calc_pilotage_nwm_entree_sortie(g_t) * 2)
-                c_alg_p.append(calc_alg_pilotage(g_t, "Entrée", alg_pil_tranche) + calc_alg_pilotage(g_t, "Sortie", alg_pil_tranche))
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=gts_pil, y=c_tm_p, name="Tanger Med (VG)", line=dict(color=TM_C, width=3)))
-            fig.add_trace(go.Scatter(x=gts_pil, y=c_nwm_p, name="NWM (GT)", line=dict(color=NWM_C, width=3, dash="dash")))
-            fig.add_trace(go.Scatter(x=gts_pil, y=c_alg_p, name="Algeciras (fixe+var×GT)", line=dict(color=ALG_C, width=3, dash="dot")))
-            fig.add_trace(go.Scatter(x=[gt]*3, y=[pil_tm, pil_nwm, pil_es_alg],
+            ref_ratio_alg = st.selectbox("Ratio GT/VG", ["Navire saisi"] + INDEX_NAVIRES["types"], key="alg_pil_ratio",
+                                         format_func=lambda t: "Tous types (médiane)" if t == TOUS_TYPES else t)
+            _, axe_alg, fig = balayage_ui(["TM · Pilotage E+S", "NWM · Pilotage E+S", "Algeciras · Pilotage E+S"], "alg_pil",
+                                          {"loa": loa, "beam": beam, "draft": draft, "gt": gt, "alg_pil_tranche": alg_pil_tranche},
+                                          None if ref_ratio_alg == "Navire saisi" else proportions_type(ref_ratio_alg),
+                                          height=450)
+            x_now = {"gt": gt, "vg": vg, "loa": loa}[axe_alg]
+            fig.add_trace(go.Scatter(x=[x_now]*3, y=[pil_tm, pil_nwm, pil_es_alg],
                 mode="markers", marker=dict(size=12, symbol="diamond"), name=f"Navire actuel (GT={gt:,})"))
-            fig.update_layout(xaxis_title="GT", yaxis_title="Pilotage E+S (€)", height=450)
+            fig.update_layout(yaxis_title="Pilotage E+S (€)")
             st.plotly_chart(fig, use_container_width=True)
 
         # Détail barème
         with st.expander("📋 Barème complet Algeciras"):
-            rows = []
-            for tr, mouvs in ALG_PILOTAGE_TARIFS.items():
-                for m, vals in mouvs.items():
-                    exemple = vals["fixe"] + vals["variable"] * gt
-                    rows.append({"Tranche": tr, "Mouvement": m, "Fixe (€)": vals["fixe"], "Variable (€/GT)": vals["variable"],
-                                 f"Exemple GT={gt:,}": f"{exemple:,.2f}€"})
-            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+            afficher_table(grille_alg_pilotage(gt))
 
     # --- T3 Marchandise ---
     with alg_tabs[2]:
@@ -765,8 +855,8 @@ with tabs[10]:
         with st.expander("📋 Grille complète régime simplifié"):
             rows = []
             for k, v in ALG_T3_SIMPLIFIE.items():
-                rows.append({"Équipement": k, "Coefficient": v["coef"], "Tarif (€/u)": f"{v['total']:.2f}"})
-            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+                rows.append({"Équipement": k, "Coefficient": v["coef"], "Tarif (€/u)": v["total"]})
+            afficher_table(table(rows, {"Tarif (€/u)": "%.2f"}))
 
     # --- T2 Passagers ---
     with alg_tabs[3]:
@@ -775,8 +865,8 @@ with tabs[10]:
 
         rows = []
         for k, v in ALG_T2.items():
-            rows.append({"Concept": k, "Coefficient": v["coef"], "Tarif (€/u)": f"{v['total']:.2f}"})
-        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+            rows.append({"Concept": k, "Coefficient": v["coef"], "Tarif (€/u)": v["total"]})
+        afficher_table(table(rows, {"Tarif (€/u)": "%.2f"}))
 
         # Comparaison passagers
         st.divider()
@@ -805,8 +895,8 @@ with tabs[10]:
 
         rows = []
         for k, v in ALG_T6_COEF.items():
-            rows.append({"Période": k, "Coefficient": v["coef"], "Tarif (€/m²/j)": f"{v['total']:.3f}"})
-        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+            rows.append({"Période": k, "Coefficient": v["coef"], "Tarif (€/m²/j)": v["total"]})
+        afficher_table(table(rows, {"Tarif (€/m²/j)": TAUX}))
 
     # --- Utilities ---
     with alg_tabs[5]:
@@ -849,54 +939,14 @@ with tabs[11]:
 
     cat_lam_t = st.selectbox("Cat. lamanage TM", list(LAMANAGE_TM.keys()), key="lt")
 
-    # === CALCULS TM ===
-    r_tm = DROITS_PORT_NAVIRES_TM[tt_tm]
-    v_naut_tm = vg * r_tm["nautique"]
-    v_port_tm = vg * r_tm["port"]
-    v_stat_tm = calc_stationnement(vg, r_tm["stationnement"], sejour_h)
-    v_pil_tm = calc_pilotage_tm(vg, "Entrée") + calc_pilotage_tm(vg, "Sortie")
-    v_rem_tm = calc_remorquage(gt, REMORQUAGE_TM, REMORQUAGE_TM_SUP) * nb_rem * nb_mvt
-    ll = LAMANAGE_TM[cat_lam_t]
-    v_lam_tm = max(loa * ll["tarif_ml"], ll["min"])
-    v_ctn_tm = CONTENEURS_TM[op_t] * evp_t
-
-    # === CALCULS NWM ===
-    r_nwm = DROITS_PORT_NAVIRES_NWM[tt_nwm]
-    v_naut_nwm = vg * r_nwm["nautique"]
-    v_port_nwm = vg * r_nwm["port"]
-    v_stat_nwm = calc_stationnement(vg, r_nwm["stationnement"], sejour_h)
-    v_pil_nwm = calc_pilotage_nwm_entree_sortie(gt) * 2
-    v_rem_nwm = calc_remorquage(gt, REMORQUAGE_NWM, REMORQUAGE_NWM_SUP) * nb_rem * nb_mvt
-    v_lam_nwm = calc_lamanage_nwm(gt)
-    v_ctn_nwm = CONTENEURS_NWM[op_t] * evp_t
-
-    # === CALCULS ALGECIRAS ===
-    coef_u_tot = ALG_T1_COEF_UTILISATION[alg_concession]
-    freq_r_tot = ALG_T1_REDUCTION_FREQUENCE[alg_freq]
-    v_t1_alg = calc_alg_t1(gt, sejour_h, coef_util=coef_u_tot, reduc_freq=freq_r_tot, regulier=alg_regulier)
-    v_pil_alg = calc_alg_pilotage(gt, "Entrée") + calc_alg_pilotage(gt, "Sortie")
-    v_rem_alg = 0  # Non publié — service privé
-    v_lam_alg = 0  # Non publié — service privé
-    # T3 marchandise conteneurs
-    if "Transshipment" in op_t or "transbordement" in op_t.lower():
-        t3_reduc = 0.30  # transbordement accostés
-        t3_bonif = 1.00
-    else:
-        t3_reduc = 1.00
-        t3_bonif = ALG_T3_BONIF_CTN  # 0.70 pour CTN I/E
-    # 20' = 1 TEU → 1 unité CTN≤20', 40' = 2 TEU → on suppose mix moyen
-    alg_tarif_ctn = ALG_T3_SIMPLIFIE["CTN ≤20' chargé"]["total"] if evp_t > 0 else 0
-    v_ctn_alg = alg_tarif_ctn * evp_t * t3_reduc * t3_bonif
-    v_t0_alg = ALG_T0_TOTAL_GT * gt  # Aides navigation
-    v_dech_alg = calc_alg_dechets(gt)
-
-    labels = ["Taxe Navire / Droits Port", "Pilotage", "Remorquage*", "Lamanage*", "Marchandises CTN", "T0 Aides Nav. / Déchets"]
-    vtm = [v_naut_tm + v_port_tm + v_stat_tm, v_pil_tm, v_rem_tm, v_lam_tm, v_ctn_tm, 0]
-    vnwm = [v_naut_nwm + v_port_nwm + v_stat_nwm, v_pil_nwm, v_rem_nwm, v_lam_nwm, v_ctn_nwm, 0]
-    valg = [v_t1_alg, v_pil_alg, v_rem_alg, v_lam_alg, v_ctn_alg, v_t0_alg + v_dech_alg]
-    total_tm = sum(vtm)
-    total_nwm = sum(vnwm)
-    total_alg = sum(valg)
+    cout = calc_cout_escale(loa, beam, draft, gt, sejour_h, nb_rem, nb_mvt, terminal_tm=tt_tm, terminal_nwm=tt_nwm,
+                            evp=evp_t, op_ctn=op_t, cat_lam_tm=cat_lam_t, alg_concession=alg_concession,
+                            alg_freq=alg_freq, alg_regulier=alg_regulier)
+    labels = cout["postes"]
+    vtm, vnwm, valg = cout["TM"], cout["NWM"], cout["Algeciras"]
+    total_tm = cout["totaux"]["TM"]
+    total_nwm = cout["totaux"]["NWM"]
+    total_alg = cout["totaux"]["Algeciras"]
 
     c1, c2, c3 = st.columns(3)
     with c1:
@@ -927,13 +977,56 @@ with tabs[11]:
     st.plotly_chart(stacked_bar3(labels, vtm, vnwm, valg), use_container_width=True)
 
     # Tableau récap
-    recap = []
-    for l, a, b, c in zip(labels, vtm, vnwm, valg):
-        recap.append({"Poste": l, "🔵 TM": fmt(a), "🔴 NWM": fmt(b), "🟢 Algeciras": fmt(c),
-                       "Δ ALG vs TM": pct(a, c) if a > 0 else "—", "Δ NWM vs TM": pct(a, b) if a > 0 else "—"})
-    recap.append({"Poste": "🔴 TOTAL", "🔵 TM": fmt(total_tm), "🔴 NWM": fmt(total_nwm), "🟢 Algeciras": fmt(total_alg),
-                   "Δ ALG vs TM": pct(total_tm, total_alg), "Δ NWM vs TM": pct(total_tm, total_nwm)})
-    st.dataframe(pd.DataFrame(recap), use_container_width=True, hide_index=True)
+    afficher_table(grille_recap_cout(cout))
+
+    with st.expander("🧾 Facture détaillée TM / NWM (toutes lignes, majorations des onglets Pilotage / Remorquage / Lamanage)"):
+        esc_fact = {"loa": loa, "beam": beam, "draft": draft, "gt": gt, "sejour_h": sejour_h, "nb_rem": nb_rem, "nb_mvt": nb_mvt,
+                    "sans_propulsion": sans_prop, "dehalage": dehalage, "cat_lamanage": cat_lam_t, "duree_lamanage_h": duree_l,
+                    "evp": evp_t, "op_ctn": op_t}
+        c1, c2 = st.columns(2)
+        for col, port_f, term_f, maj in ((c1, "TM", tt_tm, {"pec": pec, "retard": ret_tm, "desempare": des_tm, "depassement_duree": dur_dep}),
+                                         (c2, "NWM", tt_nwm, {"desempare": des_nwm})):
+            with col:
+                lignes_f = lignes_dataframe(facture_escale({**esc_fact, **maj, "port": port_f, "terminal": term_f}))
+                afficher_table(table(lignes_f.drop(columns="facture"), {"prix_unitaire": "%.4f", "coef": "%.2f", "montant": EUR}))
+                st.metric(f"Total facture {port_f}", fmt(lignes_f["montant"].sum()))
+
+    with st.expander("📈 Balayage des lignes tarifaires (taille navire, séjour, remorqueurs)"):
+        st.caption("Lignes tarifaires calculées en lot sur une grille de l'axe choisi, paramètres d'escale ci-dessus; "
+                   "bornes de tranches placées exactement sur l'axe.")
+        lignes_b = st.multiselect("Lignes tarifaires", list(LIGNES), ["TM · Pilotage E+S", "NWM · Pilotage E+S",
+                                                                      "Algeciras · Pilotage E+S"], key="bal_lignes")
+        if lignes_b:
+            df_bal, _, fig = balayage_ui(lignes_b, "bal", {
+                "loa": loa, "beam": beam, "draft": draft, "gt": gt, "sejour_h": sejour_h, "nb_rem": nb_rem, "nb_mvt": nb_mvt,
+                "terminal_tm": tt_tm, "terminal_nwm": tt_nwm, "cat_lam_tm": cat_lam_t, "alg_concession": alg_concession,
+                "alg_freq": alg_freq, "alg_regulier": alg_regulier}, axes=list(AXES_BALAYAGE))
+            st.plotly_chart(fig, use_container_width=True)
+            st.download_button("⬇️ Balayage (CSV)", df_bal.to_csv(index=False).encode("utf-8"), "balayage.csv",
+                               "text/csv", key="bal_csv")
+
+    with st.expander("🔎 Rapprochement factures réelles TM / NWM (XLSX)"):
+        st.caption("Feuilles 'lignes' (escale, poste, montant) et 'escales' (caractéristiques navire et paramètres d'escale). "
+                   "Classeurs lus en flux; chaque escale est refacturée par le simulateur puis comparée poste par poste.")
+        buf_modele = io.BytesIO()
+        modele_classeur(buf_modele)
+        st.download_button("⬇️ Classeur modèle", buf_modele.getvalue(), "modele_factures.xlsx", key="rap_modele")
+        fich_rap = st.file_uploader("Factures (XLSX)", type="xlsx", accept_multiple_files=True, key="rap_xlsx")
+        c1, c2 = st.columns(2)
+        with c1: tol_eur = st.number_input("Tolérance (€)", 0.0, 10000.0, TOLERANCE_EUR, 0.5, key="rap_tol")
+        with c2: tol_rel = st.number_input("Tolérance relative (%)", 0.0, 100.0, TOLERANCE_REL * 100, 0.1, key="rap_tolr")
+        rap = None
+        if fich_rap:
+            try:
+                rap = rapprocher(fich_rap, tol_eur=tol_eur, tol_rel=tol_rel / 100)
+            except (ValueError, KeyError) as e:
+                st.error(str(e))
+        if rap is not None:
+            afficher_table(table(synthese_rapprochement(rap), {"facture": EUR, "simule": EUR, "ecart": EUR}))
+            ecarts = rap[rap["statut"] != "ok"]
+            afficher_table(table(ecarts, {"facture": EUR, "simule": EUR, "ecart": EUR, "ecart_rel": "%+.2f"}))
+            st.download_button("⬇️ Lignes rapprochées (CSV)", rap.to_csv(index=False).encode("utf-8"),
+                               "rapprochement.csv", "text/csv", key="rap_dl")
 
     # Sensibilité EVP
     with st.expander("📈 Sensibilité par volume EVP (3 ports)"):
@@ -942,10 +1035,11 @@ with tabs[11]:
         base_tm_t = sum(vtm[:4])  # navire + pilotage + rem + lam
         base_nwm_t = sum(vnwm[:4])
         base_alg_t = valg[0] + valg[1] + valg[5]  # T1 + pilotage + T0/déchets
+        alg_ctn_evp = tarif_ctn_alg(op_t) if evp_t > 0 else 0
         for e in evps:
             s_tm.append(base_tm_t + CONTENEURS_TM[op_t] * e)
             s_nwm.append(base_nwm_t + CONTENEURS_NWM[op_t] * e)
-            s_alg.append(base_alg_t + alg_tarif_ctn * e * t3_reduc * t3_bonif)
+            s_alg.append(base_alg_t + alg_ctn_evp * e)
         fig = go.Figure()
         fig.add_trace(go.Scatter(x=evps, y=s_tm, name="Tanger Med", line=dict(color=TM_C, width=3)))
         fig.add_trace(go.Scatter(x=evps, y=s_nwm, name="NWM", line=dict(color=NWM_C, width=3, dash="dash")))
@@ -954,16 +1048,235 @@ with tabs[11]:
         st.plotly_chart(fig, use_container_width=True)
 
 # ═════════════════════════════════════════════════════════════════════════════
-# TAB 12 — PROJECTIONS REVENUS NWM 2026-2035
+# TAB 12 — FLOTTE 3 PORTS
 # ═════════════════════════════════════════════════════════════════════════════
 with tabs[12]:
-    st.header("📈 Projections de Revenus — Nador West Med 2026-2035")
+    st.header("🚢 Comparaison de flotte — TM vs NWM vs Algeciras")
+    st.caption("Une ligne par navire ou par escale (navire, loa, beam, draft, gt + paramètres d'escale optionnels; "
+               "cellule vide = valeur par défaut). Tous les navires sont tarifés en une passe vectorisée.")
+
+    c1, c2 = st.columns([2, 1])
+    with c1:
+        fich_flotte = st.file_uploader("Flotte (XLSX feuille 'flotte', ou CSV)", type=["xlsx", "csv"], key="flotte_fich")
+    with c2:
+        buf_mf = io.BytesIO()
+        modele_flotte(buf_mf)
+        st.download_button("⬇️ Classeur modèle", buf_mf.getvalue(), "modele_flotte.xlsx", key="flotte_modele")
+
+    if fich_flotte is not None:
+        if st.session_state.get("flotte_id") != fich_flotte.file_id:  # lecture une seule fois par fichier
+            try:
+                st.session_state["flotte_src"] = (lire_flotte(fich_flotte) if fich_flotte.name.endswith(".xlsx")
+                                                  else pd.read_csv(fich_flotte))
+                st.session_state["flotte_id"] = fich_flotte.file_id
+            except ValueError as e:
+                st.error(str(e))
+                st.session_state["flotte_src"] = None
+        src_flotte = st.session_state.get("flotte_src")
+    else:
+        flotte_defaut = pd.DataFrame([
+            {"navire": t, "type": t, "loa": float(d["loa"]), "beam": float(d["beam"]), "draft": float(d["draft"]), "gt": d["gt_est"],
+             "sejour_h": float(d["sejour_h"]), "nb_rem": d["nb_rem"],
+             "terminal_tm": ESCALE_DEFAUT["terminal_tm"], "terminal_nwm": ESCALE_DEFAUT["terminal_nwm"],
+             "evp": d.get("teu_par_escale", 0)}
+            for t, d in PROJ_NAVIRES.items()])
+        src_flotte = st.data_editor(flotte_defaut, num_rows="dynamic", use_container_width=True, hide_index=True,
+                                    key="flotte_edit", column_config={
+                                        "terminal_tm": st.column_config.SelectboxColumn("terminal_tm", options=list(DROITS_PORT_NAVIRES_TM)),
+                                        "terminal_nwm": st.column_config.SelectboxColumn("terminal_nwm", options=list(DROITS_PORT_NAVIRES_NWM))})
+        src_flotte = src_flotte.dropna(subset=["loa", "beam", "draft", "gt"], how="all")
+
+    with st.expander("📐 Estimation GT ↔ VG par type de navire (valeurs manquantes)"):
+        st.caption("Lignes sans GT, sans VG ou sans dimensions: valeurs estimées d'après la colonne type (ratios médians "
+                   "GT/VG, loa/beam, draft/beam des navires de référence). Une flotte de référence (type, loa, beam, "
+                   "draft, gt) complète l'index des navires Annexe 7.")
+        fich_ref = st.file_uploader("Flotte de référence (CSV)", type="csv", key="flotte_ref")
+        try:
+            index_flotte = compiler_index(pd.read_csv(fich_ref)) if fich_ref is not None else INDEX_NAVIRES
+        except ValueError as e:
+            st.error(str(e))
+            index_flotte = INDEX_NAVIRES
+        afficher_table(table(table_index(index_flotte), {"ratio_gt_vg": "%.4f", "loa_beam": "%.2f", "draft_beam": "%.3f",
+                                                         "navires": "%.0f"}))
+
+    if src_flotte is not None and len(src_flotte):
+        try:
+            flotte_t = tarifer_flotte(src_flotte, index_flotte)
+        except (ValueError, KeyError) as e:
+            st.error(str(e))
+            flotte_t = None
+    else:
+        flotte_t = None
+
+    if flotte_t is not None:
+        cols = st.columns(4)
+        cols[0].metric("Navires", f"{len(flotte_t):,}",
+                       f"{int((flotte_t['gt_estime'] | flotte_t['dim_estimees']).sum()):,} estimés"
+                       if "gt_estime" in flotte_t else None, delta_color="off")
+        for i, p in enumerate(PORTS):
+            d = f"{(flotte_t[p].sum() / flotte_t['TM'].sum() - 1) * 100:+.1f}% vs TM" if p != "TM" else None
+            cols[i + 1].metric(f"Total {p}", fmt(flotte_t[p].sum()), d, delta_color="inverse")
+
+        c1, c2 = st.columns(2)
+        with c1:
+            st.subheader("Coût total par poste")
+            afficher_table(table(agregat_ports(flotte_t), {p: EUR for p in PORTS}))
+        with c2:
+            axe = st.selectbox("Regrouper par", list(AXES), format_func=AXES.get, key="flotte_axe")
+            ag = agregat(flotte_t, axe)
+            afficher_table(table(ag, {**{c: EUR for c in ag.columns if c in PORTS or c.startswith("moyenne")},
+                                      "ecart_nwm_vs_tm": PCT}))
+
+        c1, c2 = st.columns(2)
+        with c1:
+            fig = go.Figure()
+            for p, coul in zip(PORTS, (TM_C, NWM_C, ALG_C)):
+                fig.add_trace(go.Histogram(x=flotte_t[p], name=p, marker_color=coul, opacity=0.6, nbinsx=50))
+            fig.update_layout(barmode="overlay", height=380, xaxis_title="Coût d'escale (€)", yaxis_title="Navires",
+                              legend=dict(orientation="h", y=1.12))
+            st.plotly_chart(fig, use_container_width=True)
+        with c2:
+            fig = go.Figure()
+            fig.add_trace(go.Histogram(x=flotte_t["ecart_nwm_vs_tm"], name="NWM vs TM", marker_color=NWM_C, opacity=0.6, nbinsx=50))
+            fig.add_trace(go.Histogram(x=flotte_t["ecart_alg_vs_tm"], name="Algeciras vs TM", marker_color=ALG_C, opacity=0.6, nbinsx=50))
+            fig.update_layout(barmode="overlay", height=380, xaxis_title="Écart vs TM (%)", yaxis_title="Navires",
+                              legend=dict(orientation="h", y=1.12))
+            st.plotly_chart(fig, use_container_width=True)
+
+        st.subheader("Détail par navire")
+        cols_vue = ["navire", "loa", "beam", "draft", "gt", "vg"] + PORTS + ["ecart_nwm_vs_tm", "ecart_alg_vs_tm"]
+        c1, c2, c3, c4 = st.columns(4)
+        with c1: tri = st.selectbox("Trier par", cols_vue, index=cols_vue.index("TM"), key="flotte_tri")
+        with c2: croissant = st.radio("Ordre", ["Décroissant", "Croissant"], horizontal=True, key="flotte_ordre") == "Croissant"
+        with c3: taille = st.selectbox("Lignes par page", TAILLES_PAGE, index=1, key="flotte_taille")
+        nb_pages = max(1, -(-len(flotte_t) // taille))
+        with c4: num = st.number_input(f"Page (sur {nb_pages:,})", 1, nb_pages, 1, key="flotte_page")
+        vue, _ = page(flotte_t[cols_vue], tri, croissant, num, taille)
+        afficher_table(table(vue, {"vg": "%.0f", **{p: EUR for p in PORTS}, "ecart_nwm_vs_tm": PCT, "ecart_alg_vs_tm": PCT}))
+
+        c1, c2 = st.columns(2)
+        with c1:
+            st.download_button("⬇️ Flotte tarifée (CSV)", flotte_t.to_csv(index=False).encode("utf-8"),
+                               "flotte_tarifee.csv", "text/csv", key="flotte_csv")
+        with c2:
+            if st.button("📄 Préparer le classeur XLSX", key="flotte_xlsx_prep"):
+                buf_ft = io.BytesIO()
+                ecrire_flotte(flotte_t, buf_ft)
+                st.session_state["flotte_xlsx"] = buf_ft.getvalue()
+            if st.session_state.get("flotte_xlsx"):
+                st.download_button("⬇️ Flotte tarifée (XLSX)", st.session_state["flotte_xlsx"], "flotte_tarifee.xlsx",
+                                   key="flotte_xlsx_dl")
+
+    with st.expander("🗄️ Historique d'escales — retarification aux tarifs courants"):
+        st.caption("Escales passées stockées sur disque par année et par port (Arrow IPC, relu en memory-map): "
+                   "chaque partition est retarifée aux 3 ports sans charger l'historique en mémoire.")
+        c1, c2, c3 = st.columns([2, 1, 1])
+        with c1:
+            fich_hist = st.file_uploader("Escales (CSV: date, loa, beam, draft, gt [+ port, paramètres])", type="csv", key="hist_csv")
+        with c2:
+            port_hist = st.selectbox("Port (si pas de colonne port)", PORTS, key="hist_port")
+        with c3:
+            if fich_hist is not None and st.button("➕ Ajouter à l'historique", key="hist_ajout"):
+                try:
+                    st.success(f"{importer_csv(fich_hist, port_hist):,} escales ajoutées")
+                except (ValueError, KeyError) as e:
+                    st.error(str(e))
+
+        inv = inventaire()
+        if inv.empty:
+            st.caption("Historique vide.")
+        else:
+            afficher_table(table(inv, {"escales": "%.0f", "taille_mo": "%.1f"}))
+            taches_session = st.session_state.setdefault("taches", {})
+            annees_hist = st.multiselect("Années", sorted(inv["annee"].unique()), key="hist_annees")
+            sel = inv[inv["annee"].isin(annees_hist)] if annees_hist else inv
+            cle_hist = json.dumps([annees_hist, sel.to_dict("records")], default=str)
+            annuler_si_perimee(taches_session, "historique", cle_hist)
+            if st.button(f"▶️ Retarifer {sel['escales'].sum():,} escales", key="hist_run"):
+                lancer(taches_session, "historique", cle_hist, iter_retarification, annees=annees_hist or None,
+                       total=sel[["annee", "port"]].drop_duplicates().shape[0])
+            hist_actif = en_cours(taches_session.get("historique"))
+
+            @st.fragment(run_every=1.0 if hist_actif else None)
+            def suivi_historique():
+                t = taches_session.get("historique")
+                if t is None:
+                    return
+                if en_cours(t):
+                    st.progress(t["progression"], text=f"⏳ {len(t['partiels'])}/{t['total']} partitions retarifées…")
+                    if st.button("⏹️ Annuler", key="hist_stop"):
+                        annuler(taches_session, "historique")
+                elif t["etat"] == "erreur":
+                    st.error(t["erreur"])
+                if t["partiels"]:
+                    res_h = pd.DataFrame(t["partiels"])
+                    tm_h = res_h["TM"].where(res_h["TM"] > 0)
+                    res_h["ecart_nwm_vs_tm"] = (res_h["NWM"] / tm_h - 1) * 100
+                    res_h["ecart_alg_vs_tm"] = (res_h["Algeciras"] / tm_h - 1) * 100
+                    afficher_table(table(res_h, {"escales": "%.0f", **{p: EUR for p in PORTS},
+                                                 "ecart_nwm_vs_tm": PCT, "ecart_alg_vs_tm": PCT}))
+                    if t["etat"] == "termine":
+                        st.download_button("⬇️ Retarification (CSV)", res_h.to_csv(index=False).encode("utf-8"),
+                                           "retarification.csv", "text/csv", key="hist_dl")
+                if hist_actif and not en_cours(t):
+                    st.rerun()
+
+            suivi_historique()
+
+    with st.expander("🆚 Révision tarifaire — écarts entre versions et impact"):
+        st.caption("Version tarifaire = structures de tarifs_data en JSON (une version partielle reprend les tarifs en "
+                   "vigueur). Les escales sont retarifées sous les deux versions dans la même passe; impact par poste, "
+                   "terminal et tranche GT.")
+        c1, c2, c3 = st.columns([2, 2, 1])
+        with c1:
+            fich_apres = st.file_uploader("Nouvelle version (JSON)", type="json", key="rev_apres")
+        with c2:
+            fich_avant = st.file_uploader("Version de référence (JSON, défaut: en vigueur)", type="json", key="rev_avant")
+        with c3:
+            st.download_button("⬇️ Version en vigueur", json_version(tarifs_courants()).encode("utf-8"),
+                               "tarifs_en_vigueur.json", "application/json", key="rev_modele")
+        if fich_apres is not None:
+            try:
+                v_avant = charger_version(fich_avant) if fich_avant is not None else version()
+                v_apres = charger_version(fich_apres)
+            except (ValueError, KeyError) as e:
+                st.error(str(e))
+                v_apres = None
+            if v_apres is not None:
+                ecarts = diff_tarifs(v_avant, v_apres)
+                st.subheader(f"{len(ecarts)} paramètre(s) modifié(s)")
+                afficher_table(table(ecarts, {"ecart": "%.4f", "ecart_pct": PCT}))
+                c1, c2 = st.columns(2)
+                with c1:
+                    source_rev = st.radio("Escales", ["Flotte affichée", "Historique d'escales"], horizontal=True, key="rev_source")
+                with c2:
+                    axe_rev = st.selectbox("Regrouper par", ["poste", "terminal", "tranche_gt"], key="rev_axe")
+                res_rev = None
+                if source_rev == "Flotte affichée" and flotte_t is not None:
+                    res_rev = impact(flotte_t, v_avant, v_apres)
+                elif source_rev == "Historique d'escales" and st.button("▶️ Retarifer l'historique", key="rev_hist"):
+                    with st.spinner("Retarification de l'historique sous les deux versions…"):
+                        st.session_state["rev_hist_res"] = impact_historique(v_avant, v_apres)
+                if source_rev == "Historique d'escales":
+                    res_rev = st.session_state.get("rev_hist_res")
+                if res_rev is not None:
+                    synth = synthese_impact(res_rev, axe_rev)
+                    afficher_table(table(synth, {"escales": "%.0f", "escales_touchees": "%.0f", "avant": EUR, "apres": EUR,
+                                                 "impact": EUR, "impact_pct": PCT}))
+                    st.download_button("⬇️ Impact détaillé (CSV)", res_rev.to_csv(index=False).encode("utf-8"),
+                                       "impact_revision.csv", "text/csv", key="rev_dl")
+
+# ═════════════════════════════════════════════════════════════════════════════
+# TAB 13 — PROJECTIONS REVENUS NWM 2026-2035 (HORIZON CONFIGURABLE)
+# ═════════════════════════════════════════════════════════════════════════════
+with tabs[13]:
+    st.header("📈 Projections de Revenus — Nador West Med")
     st.info("Basé sur l'Annexe 7 (Projections de trafic et types de navires). "
             "Les revenus NWM sont calculés avec les tarifs du cahier tarifaire NWM 2025. "
             "Les revenus TM sont calculés en parallèle pour comparaison.")
 
     # ─── PARAMETRES OPERATIONNELS ────────────────────────────────────────────
-    proj_tabs = st.tabs(["🚢 Escales & Trafic","💲 Tarifs","📊 Revenus par Année","🔍 Détail par Catégorie","📋 Tableau Complet"])
+    proj_tabs = st.tabs(["🚢 Escales & Trafic","💲 Tarifs","📊 Revenus par Année","🔍 Détail par Catégorie","📋 Tableau Complet","🧪 Scénarios","🎯 Optimisation NWM","🌐 Parts de marché","⚓ Postes à quai"])
 
     # ═══════ TAB: ESCALES & TRAFIC ══════════════════════════════════════════
     with proj_tabs[0]:
@@ -981,6 +1294,14 @@ with tabs[12]:
             vol_mode = st.radio("Mode volumes trafic", ["🔗 Lié aux escales", "📋 Annexe 7 (indépendant)"],
                                  key="proj_vm", help="Lié: volumes = escales × cargo moyen/navire. Indépendant: volumes fixes Annexe 7.")
         linked = "Lié" in vol_mode
+        c4, c5, _ = st.columns(3)
+        with c4:
+            fin_horizon = st.number_input("Horizon (dernière année)", PROJ_YEARS[-1], ANNEE_MAX, PROJ_YEARS[-1], 1,
+                                          key="proj_fin", help="Au-delà de 2035 (fin de l'Annexe 7): croissance composée "
+                                                               "prolongée, volumes Annexe 7 tenus à leur valeur 2035.")
+        with c5:
+            granularite = st.selectbox("Granularité (projection par période)", list(GRANULARITES), key="proj_gran",
+                                       help="Trimestriel / mensuel: revenus annuels répartis uniformément sur les périodes.")
 
         # Escales saisie par catégorie pour l'année cible
         st.divider()
@@ -988,7 +1309,6 @@ with tabs[12]:
         st.subheader(f"Escales par catégorie — {target_year}")
         st.caption("Valeurs par défaut = Annexe 7. Modifiez librement.")
 
-        ESC_CATS = list(PROJ_ESCALES.keys())
         esc_target = {}
 
         # Display in 2 rows of 4
@@ -1009,83 +1329,24 @@ with tabs[12]:
 
         # ── Compute escales for all years ──
         # 2026 → target: linear interpolation between Annexe 7 2026 and user target
-        # target → 2035: compound growth from target values
-        computed_escales = {}  # {cat: [10 values]}
-        for cat in ESC_CATS:
-            vals = []
-            base_2026 = PROJ_ESCALES[cat][0]  # Annexe 7 first year
-            target_val = esc_target[cat]
-            years_to_target = target_year - 2026
-
-            for yi, year in enumerate(PROJ_YEARS):
-                if year < target_year:
-                    # Linear interpolation 2026 → target
-                    if years_to_target > 0:
-                        frac = (year - 2026) / years_to_target
-                        v = base_2026 + (target_val - base_2026) * frac
-                    else:
-                        v = target_val
-                elif year == target_year:
-                    v = target_val
-                else:
-                    # Compound growth after target
-                    years_after = year - target_year
-                    v = target_val * ((1 + growth_rate / 100) ** years_after)
-                vals.append(max(0, v))
-            computed_escales[cat] = vals
+        # target → horizon: compound growth from target values
+        computed_escales = calc_escales(esc_target, target_year, growth_rate, fin=fin_horizon)
+        annees_proj = annees(computed_escales)
+        x_proj = [str(y) for y in annees_proj]
 
         # Preview escales table
         with st.expander("📋 Prévisualisation escales toutes années", expanded=True):
             preview = {"Catégorie": ESC_CATS}
-            for yi, year in enumerate(PROJ_YEARS):
-                annexe_vals = [int(round(PROJ_ESCALES[cat][yi])) for cat in ESC_CATS]
+            for yi, year in enumerate(annees_proj):
                 custom_vals = [int(round(computed_escales[cat][yi])) for cat in ESC_CATS]
-                preview[f"{year} (A7)"] = annexe_vals
+                if yi < len(PROJ_YEARS):
+                    preview[f"{year} (A7)"] = [int(round(PROJ_ESCALES[cat][yi])) for cat in ESC_CATS]
                 preview[f"{year} ✏️"] = custom_vals
             df_prev = pd.DataFrame(preview)
             st.dataframe(df_prev, use_container_width=True, hide_index=True)
 
-        # Compute volumes if linked mode
-        # Average cargo per call by category (from Annexe 7 reference)
-        AVG_CARGO_PER_CALL = {
-            "Conteneurs TC1": 1750,   # TEU/call
-            "Conteneurs TC2": 1200,   # TEU/call
-            "Hydrocarbures Q1": 26667, # T/call
-            "Hydrocarbures Q2": 27907, # T/call
-            "Hydrocarbures Q3": 26780, # T/call
-            "Marchandises Div.": 14286, # T/call
-            "Vrac Solide": 20588,      # T/call
-            "Roulier": 1280,           # unités/call
-        }
-
-        # Cargo unit labels
-        CARGO_UNITS = {
-            "Conteneurs TC1": "TEU", "Conteneurs TC2": "TEU",
-            "Hydrocarbures Q1": "T", "Hydrocarbures Q2": "T", "Hydrocarbures Q3": "T",
-            "Marchandises Div.": "T", "Vrac Solide": "T", "Roulier": "unités",
-        }
-
         # Computed volumes (linked or Annexe 7)
-        computed_volumes = {}
-        if linked:
-            for cat in ESC_CATS:
-                avg = AVG_CARGO_PER_CALL.get(cat, 0)
-                computed_volumes[cat] = [computed_escales[cat][yi] * avg for yi in range(10)]
-        # We also need aggregate volumes for revenue calc
-        def get_vol(key, yi):
-            """Get volume for a given traffic key and year index"""
-            if linked:
-                # Map PROJ_TRAFIC keys to escale categories
-                vol_map = {
-                    "Total Conteneurs (TEU)": lambda i: computed_volumes.get("Conteneurs TC1",[0]*10)[i] + computed_volumes.get("Conteneurs TC2",[0]*10)[i],
-                    "Total Hydrocarbures (T)": lambda i: computed_volumes.get("Hydrocarbures Q1",[0]*10)[i] + computed_volumes.get("Hydrocarbures Q2",[0]*10)[i] + computed_volumes.get("Hydrocarbures Q3",[0]*10)[i],
-                    "Marchandises Div. (T)": lambda i: computed_volumes.get("Marchandises Div.",[0]*10)[i],
-                    "Vrac Solide (T)": lambda i: computed_volumes.get("Vrac Solide",[0]*10)[i],
-                    "Roulier (unités)": lambda i: computed_volumes.get("Roulier",[0]*10)[i],
-                }
-                if key in vol_map:
-                    return vol_map[key](yi)
-            return PROJ_TRAFIC[key][yi]
+        volumes = calc_volumes(computed_escales, linked)
 
     # ═══════ TAB: TARIFS ═══════════════════════════════════════════════════
     with proj_tabs[1]:
@@ -1123,14 +1384,7 @@ with tabs[12]:
         # Hydrocarbures
         c1, c2 = st.columns(2)
         with c1:
-            if "blancs" in hydro_type.lower():
-                t_hydro_nwm = HYDROCARBURES_NWM["Produits blancs (diesel, kérosène, essence, lubrifiants)"][hydro_op]
-            elif "noirs" in hydro_type.lower():
-                t_hydro_nwm = HYDROCARBURES_NWM["Produits noirs (fuel lourd, bitume)"][hydro_op]
-            else:
-                tb = HYDROCARBURES_NWM["Produits blancs (diesel, kérosène, essence, lubrifiants)"][hydro_op]
-                tn = HYDROCARBURES_NWM["Produits noirs (fuel lourd, bitume)"][hydro_op]
-                t_hydro_nwm = 0.6 * tb + 0.4 * tn
+            t_hydro_nwm = tarif_hydro_nwm(hydro_type, hydro_op)
             t_hydro_nwm = st.number_input("Hydrocarbures NWM (€/T)", 0.0, 10.0, float(t_hydro_nwm), 0.01, key="pt9")
         with c2:
             t_hydro_tm = st.number_input("Hydrocarbures TM (€/T)", 0.0, 10.0, float(t_hydro_nwm * 1.10), 0.01, key="pt10",
@@ -1140,179 +1394,39 @@ with tabs[12]:
         c1, c2 = st.columns(2)
         with c1:
             t_roul_nwm = st.number_input("Roulier NWM (€/unité)", 0.0, 500.0,
-                                          float(MARCHANDISES_ROULIER_NWM_DH["Remorques pleines"] / TAUX_DH_EUR_DEFAULT),
-                                          1.0, key="pt11")
+                                          float(TARIFS_PROJ_DEFAUT["t_roul_nwm"]), 1.0, key="pt11")
         with c2:
-            avg_roul_tm = (MARCHANDISES_ROULIER_TM["1.1 Remorque/ensemble routier plein"]["Import"] +
-                           MARCHANDISES_ROULIER_TM["1.1 Remorque/ensemble routier plein"]["Export"]) / 2
-            t_roul_tm = st.number_input("Roulier TM (€/unité)", 0.0, 500.0, float(avg_roul_tm), 1.0, key="pt12")
+            t_roul_tm = st.number_input("Roulier TM (€/unité)", 0.0, 500.0, float(TARIFS_PROJ_DEFAUT["t_roul_tm"]), 1.0, key="pt12")
 
         # Navires
         st.divider()
         st.subheader("🚢 Paramètres Navires")
+        nav_xlsx = st.file_uploader("Navires (XLSX, feuille 'navires': type, gt, nb_rem, sejour_h, loa, beam, draft)",
+                                    type="xlsx", key="nav_xlsx")
+        nav_import = lire_navires(nav_xlsx) if nav_xlsx is not None else {}
         nav_overrides = {}
         nav_cols = st.columns(4)
-        for i, (ntype, ndata) in enumerate(PROJ_NAVIRES.items()):
+        for i, ntype in enumerate(PROJ_NAVIRES):
+            ndata = nav_import.get(ntype) or get_nav(ntype)
             with nav_cols[i % 4]:
                 with st.expander(f"**{ntype}**", expanded=False):
-                    gt_o = st.number_input("GT", 1000, 300000, ndata["gt_est"], 1000, key=f"nav_gt_{i}")
-                    rem_o = st.number_input("Remorqueurs", 0, 6, ndata["nb_rem"], 1, key=f"nav_rem_{i}")
+                    gt_o = st.number_input("GT", 1000, 300000, int(ndata["gt"]), 1000, key=f"nav_gt_{i}")
+                    rem_o = st.number_input("Remorqueurs", 0, 6, int(ndata["nb_rem"]), 1, key=f"nav_rem_{i}")
                     sej_o = st.number_input("Séjour (h)", 1.0, 120.0, float(ndata["sejour_h"]), 1.0, key=f"nav_sej_{i}")
                     nav_overrides[ntype] = {"gt": gt_o, "nb_rem": rem_o, "sejour_h": sej_o,
                                             "loa": ndata["loa"], "beam": ndata["beam"], "draft": ndata["draft"]}
-
-    # ─── MOTEUR DE CALCUL ────────────────────────────────────────────────────
-    def calc_revenue_per_call(nav, port="NWM"):
-        """Calcul revenu par escale pour un type de navire"""
-        gt = nav["gt"]
-        vg_n = calc_vg(nav["loa"], nav["beam"], nav["draft"])
-        nb_r = nav["nb_rem"]
-        sej = nav["sejour_h"]
-
-        if port == "NWM":
-            # Déterminer terminal NWM
-            term = "Terminal à Conteneurs"  # default
-            r = DROITS_PORT_NAVIRES_NWM[term]
-            dp = vg_n * r["nautique"] + vg_n * r["port"] + calc_stationnement(vg_n, r["stationnement"], sej)
-            pil = calc_pilotage_nwm_entree_sortie(gt) * 2
-            rem = calc_remorquage(gt, REMORQUAGE_NWM, REMORQUAGE_NWM_SUP) * nb_r * 2
-            lam = calc_lamanage_nwm(gt)
-        else:  # TM
-            term = "Terminaux à Conteneurs (TC1-TC4)"
-            r = DROITS_PORT_NAVIRES_TM[term]
-            dp = vg_n * r["nautique"] + vg_n * r["port"] + calc_stationnement(vg_n, r["stationnement"], sej)
-            pil = calc_pilotage_tm(vg_n, "Entrée") + calc_pilotage_tm(vg_n, "Sortie")
-            rem = calc_remorquage(gt, REMORQUAGE_TM, REMORQUAGE_TM_SUP) * nb_r * 2
-            ll = LAMANAGE_TM["Cat B&C – Autres navires"]
-            lam = max(nav["loa"] * ll["tarif_ml"], ll["min"])
-
-        return {"droits_port": dp, "pilotage": pil, "remorquage": rem, "lamanage": lam}
-
-    def calc_revenue_per_call_hydro(nav, port="NWM"):
-        """Idem pour terminal hydrocarbures"""
-        gt = nav["gt"]
-        vg_n = calc_vg(nav["loa"], nav["beam"], nav["draft"])
-        nb_r = nav["nb_rem"]
-        sej = nav["sejour_h"]
-
-        if port == "NWM":
-            r = DROITS_PORT_NAVIRES_NWM["Terminal Hydrocarbures"]
-            dp = vg_n * r["nautique"] + vg_n * r["port"] + calc_stationnement(vg_n, r["stationnement"], sej)
-            pil = calc_pilotage_nwm_entree_sortie(gt) * 2
-            rem = calc_remorquage(gt, REMORQUAGE_NWM, REMORQUAGE_NWM_SUP) * nb_r * 2
-            lam = calc_lamanage_nwm(gt)
-        else:
-            r = DROITS_PORT_NAVIRES_TM["Terminal Hydrocarbures"]
-            dp = vg_n * r["nautique"] + vg_n * r["port"] + calc_stationnement(vg_n, r["stationnement"], sej)
-            pil = calc_pilotage_tm(vg_n, "Entrée") + calc_pilotage_tm(vg_n, "Sortie")
-            rem = calc_remorquage(gt, REMORQUAGE_TM, REMORQUAGE_TM_SUP) * nb_r * 2
-            ll = LAMANAGE_TM["Cat B&C – Autres navires"]
-            lam = max(nav["loa"] * ll["tarif_ml"], ll["min"])
-        return {"droits_port": dp, "pilotage": pil, "remorquage": rem, "lamanage": lam}
-
-    def calc_revenue_per_call_md(nav, port="NWM"):
-        """Idem pour terminal marchandises diverses / vrac"""
-        gt = nav["gt"]
-        vg_n = calc_vg(nav["loa"], nav["beam"], nav["draft"])
-        nb_r = nav["nb_rem"]
-        sej = nav["sejour_h"]
-
-        if port == "NWM":
-            r = DROITS_PORT_NAVIRES_NWM["Terminal Marchandises Div"]
-            dp = vg_n * r["nautique"] + vg_n * r["port"] + calc_stationnement(vg_n, r["stationnement"], sej)
-            pil = calc_pilotage_nwm_entree_sortie(gt) * 2
-            rem = calc_remorquage(gt, REMORQUAGE_NWM, REMORQUAGE_NWM_SUP) * nb_r * 2
-            lam = calc_lamanage_nwm(gt)
-        else:
-            r = DROITS_PORT_NAVIRES_TM["Terminal Vrac & MD"]
-            dp = vg_n * r["nautique"] + vg_n * r["port"] + calc_stationnement(vg_n, r["stationnement"], sej)
-            pil = calc_pilotage_tm(vg_n, "Entrée") + calc_pilotage_tm(vg_n, "Sortie")
-            rem = calc_remorquage(gt, REMORQUAGE_TM, REMORQUAGE_TM_SUP) * nb_r * 2
-            ll = LAMANAGE_TM["Cat B&C – Autres navires"]
-            lam = max(nav["loa"] * ll["tarif_ml"], ll["min"])
-        return {"droits_port": dp, "pilotage": pil, "remorquage": rem, "lamanage": lam}
+        buf_nav = io.BytesIO()
+        ecrire_scenarios([], buf_nav, navires=nav_overrides)
+        st.download_button("⬇️ Navires (XLSX)", buf_nav.getvalue(), "navires.xlsx", key="nav_dl")
 
     # ─── CALCUL ANNUEL ───────────────────────────────────────────────────────
-    # Use overrides if available, otherwise defaults
-    def get_nav(ntype):
-        if ntype in nav_overrides:
-            return nav_overrides[ntype]
-        d = PROJ_NAVIRES[ntype]
-        return {"gt": d["gt_est"], "nb_rem": d["nb_rem"], "sejour_h": d["sejour_h"],
-                "loa": d["loa"], "beam": d["beam"], "draft": d["draft"]}
-
-    results_nwm = []
-    results_tm = []
-
-    for yi, year in enumerate(PROJ_YEARS):
-        rev_nwm = {"year": year, "droits_port": 0, "pilotage": 0, "remorquage": 0, "lamanage": 0,
-                    "ctn": 0, "hydro": 0, "md": 0, "vrac": 0, "roulier": 0, "escales": 0}
-        rev_tm = {"year": year, "droits_port": 0, "pilotage": 0, "remorquage": 0, "lamanage": 0,
-                   "ctn": 0, "hydro": 0, "md": 0, "vrac": 0, "roulier": 0, "escales": 0}
-
-        for cat in ESC_CATS:
-            nb_esc = computed_escales[cat][yi]
-            if nb_esc <= 0:
-                continue
-            rev_nwm["escales"] += nb_esc
-            rev_tm["escales"] += nb_esc
-
-            mapping = PROJ_MAPPING[cat]
-            for ntype, pct_nav in mapping:
-                nav = get_nav(ntype)
-                esc_part = nb_esc * pct_nav
-
-                # Choose calc function based on category
-                if "Hydro" in cat:
-                    c_nwm = calc_revenue_per_call_hydro(nav, "NWM")
-                    c_tm = calc_revenue_per_call_hydro(nav, "TM")
-                elif "Conteneur" in cat:
-                    c_nwm = calc_revenue_per_call(nav, "NWM")
-                    c_tm = calc_revenue_per_call(nav, "TM")
-                else:
-                    c_nwm = calc_revenue_per_call_md(nav, "NWM")
-                    c_tm = calc_revenue_per_call_md(nav, "TM")
-
-                for k in ["droits_port", "pilotage", "remorquage", "lamanage"]:
-                    rev_nwm[k] += c_nwm[k] * esc_part
-                    rev_tm[k] += c_tm[k] * esc_part
-
-        # Cargo revenue - Conteneurs (uses get_vol for linked/independent mode)
-        teu_total = get_vol("Total Conteneurs (TEU)", yi)
-        rev_nwm["ctn"] = teu_total * (pct_ts/100 * t_ctn_ts_nwm + pct_ie/100 * t_ctn_ie_nwm)
-        rev_tm["ctn"] = teu_total * (pct_ts/100 * t_ctn_ts_tm + pct_ie/100 * t_ctn_ie_tm)
-
-        # Cargo revenue - Hydrocarbures
-        hydro_total = get_vol("Total Hydrocarbures (T)", yi)
-        rev_nwm["hydro"] = hydro_total * t_hydro_nwm
-        rev_tm["hydro"] = hydro_total * t_hydro_tm
-
-        # Cargo revenue - Marchandises Diverses
-        md_total = get_vol("Marchandises Div. (T)", yi)
-        rev_nwm["md"] = md_total * t_md_nwm
-        rev_tm["md"] = md_total * t_md_tm
-
-        # Cargo revenue - Vrac Solide
-        vrac_total = get_vol("Vrac Solide (T)", yi)
-        rev_nwm["vrac"] = vrac_total * t_vrac_nwm
-        rev_tm["vrac"] = vrac_total * t_vrac_tm
-
-        # Cargo revenue - Roulier
-        roul_total = get_vol("Roulier (unités)", yi)
-        rev_nwm["roulier"] = roul_total * t_roul_nwm
-        rev_tm["roulier"] = roul_total * t_roul_tm
-
-        # Totals
-        rev_nwm["navire_total"] = rev_nwm["droits_port"] + rev_nwm["pilotage"] + rev_nwm["remorquage"] + rev_nwm["lamanage"]
-        rev_nwm["cargo_total"] = rev_nwm["ctn"] + rev_nwm["hydro"] + rev_nwm["md"] + rev_nwm["vrac"] + rev_nwm["roulier"]
-        rev_nwm["total"] = rev_nwm["navire_total"] + rev_nwm["cargo_total"]
-
-        rev_tm["navire_total"] = rev_tm["droits_port"] + rev_tm["pilotage"] + rev_tm["remorquage"] + rev_tm["lamanage"]
-        rev_tm["cargo_total"] = rev_tm["ctn"] + rev_tm["hydro"] + rev_tm["md"] + rev_tm["vrac"] + rev_tm["roulier"]
-        rev_tm["total"] = rev_tm["navire_total"] + rev_tm["cargo_total"]
-
-        results_nwm.append(rev_nwm)
-        results_tm.append(rev_tm)
+    tarifs_proj = {"pct_ts": pct_ts,
+                   "t_ctn_ts_nwm": t_ctn_ts_nwm, "t_ctn_ie_nwm": t_ctn_ie_nwm,
+                   "t_ctn_ts_tm": t_ctn_ts_tm, "t_ctn_ie_tm": t_ctn_ie_tm,
+                   "t_vrac_nwm": t_vrac_nwm, "t_md_nwm": t_md_nwm, "t_vrac_tm": t_vrac_tm, "t_md_tm": t_md_tm,
+                   "t_hydro_nwm": t_hydro_nwm, "t_hydro_tm": t_hydro_tm,
+                   "t_roul_nwm": t_roul_nwm, "t_roul_tm": t_roul_tm}
+    results_nwm, results_tm = calc_projection_c(computed_escales, volumes, tarifs_proj, nav_overrides)
 
     df_nwm = pd.DataFrame(results_nwm)
     df_tm = pd.DataFrame(results_tm)
@@ -1328,21 +1442,21 @@ with tabs[12]:
         # Escale comparison chart (Annexe 7 vs Custom)
         with st.expander("📊 Escales: Annexe 7 vs Scénario personnalisé", expanded=False):
             fig_esc = go.Figure()
-            a7_totals = [sum(PROJ_ESCALES[cat][yi] for cat in ESC_CATS) for yi in range(10)]
-            custom_totals = [sum(computed_escales[cat][yi] for cat in ESC_CATS) for yi in range(10)]
+            a7_totals = [sum(PROJ_ESCALES[cat][yi] for cat in ESC_CATS) for yi in range(len(PROJ_YEARS))]
+            custom_totals = [sum(computed_escales[cat][yi] for cat in ESC_CATS) for yi in range(len(annees_proj))]
             fig_esc.add_trace(go.Scatter(x=[str(y) for y in PROJ_YEARS], y=a7_totals,
                                           name="Annexe 7", line=dict(color="#95A5A6", dash="dash", width=2)))
-            fig_esc.add_trace(go.Scatter(x=[str(y) for y in PROJ_YEARS], y=custom_totals,
+            fig_esc.add_trace(go.Scatter(x=x_proj, y=custom_totals,
                                           name="Scénario ✏️", line=dict(color=NWM_C, width=3), fill="tozeroy"))
             fig_esc.update_layout(height=300, yaxis_title="Total escales/an")
             st.plotly_chart(fig_esc, use_container_width=True)
 
         # KPI cards for key years
-        key_years = [0, 2, 4, 7, 9]  # 2026, 2028, 2030, 2033, 2035
+        key_years = [round(i * (len(annees_proj) - 1) / 4) for i in range(5)]  # 2026, 2028, 2030, 2033, 2035 par défaut
         cols = st.columns(len(key_years))
         for i, ki in enumerate(key_years):
             with cols[i]:
-                y = PROJ_YEARS[ki]
+                y = annees_proj[ki]
                 tn = results_nwm[ki]["total"]
                 st.metric(f"NWM {y}", f"{tn/1e6:,.1f} M€",
                           delta=f"{results_nwm[ki]['escales']:.0f} escales")
@@ -1359,7 +1473,7 @@ with tabs[12]:
         fig_nwm = go.Figure()
         for ci, (cat_name, cat_key) in enumerate(zip(categories, cat_keys)):
             vals = [r[cat_key]/1e6 for r in results_nwm]
-            fig_nwm.add_trace(go.Bar(name=cat_name, x=[str(y) for y in PROJ_YEARS], y=vals,
+            fig_nwm.add_trace(go.Bar(name=cat_name, x=x_proj, y=vals,
                                       marker_color=colors_proj[ci]))
         fig_nwm.update_layout(barmode="stack", height=500, yaxis_title="Revenus (M€)",
                               legend=dict(orientation="h", y=1.15))
@@ -1369,10 +1483,10 @@ with tabs[12]:
         st.divider()
         st.subheader("Comparaison NWM vs TM — Revenu Total")
         fig_comp = go.Figure()
-        fig_comp.add_trace(go.Scatter(x=[str(y) for y in PROJ_YEARS],
+        fig_comp.add_trace(go.Scatter(x=x_proj,
                                        y=[r["total"]/1e6 for r in results_nwm],
                                        name="NWM", line=dict(color=NWM_C, width=3), fill="tozeroy"))
-        fig_comp.add_trace(go.Scatter(x=[str(y) for y in PROJ_YEARS],
+        fig_comp.add_trace(go.Scatter(x=x_proj,
                                        y=[r["total"]/1e6 for r in results_tm],
                                        name="TM (mêmes volumes)", line=dict(color=TM_C, width=3, dash="dash")))
         fig_comp.update_layout(height=400, yaxis_title="Revenu total annuel (M€)",
@@ -1380,31 +1494,24 @@ with tabs[12]:
         st.plotly_chart(fig_comp, use_container_width=True)
 
         # Revenue comparison table
-        eco_data = []
-        for yi in range(len(PROJ_YEARS)):
-            tn = results_nwm[yi]["total"]
-            tt = results_tm[yi]["total"]
-            eco_data.append({
-                "Année": PROJ_YEARS[yi],
-                "NWM Total (M€)": f"{tn/1e6:,.2f}",
-                "TM Total (M€)": f"{tt/1e6:,.2f}",
-                "Δ NWM vs TM": f"{(tn/tt-1)*100:+.1f}%" if tt > 0 else "—",
-                "Escales": f"{results_nwm[yi]['escales']:.0f}",
-            })
-        st.dataframe(pd.DataFrame(eco_data), use_container_width=True, hide_index=True)
+        afficher_table(grille_ecart_projection(results_nwm, results_tm))
 
     # ─── TAB: DETAIL PAR CATEGORIE ──────────────────────────────────────────
     with proj_tabs[3]:
         st.subheader("Détail par catégorie de revenu")
 
+        with st.expander("🚢 Revenu par escale et type de navire (€)"):
+            df_rev_esc = pd.DataFrame(calc_revenus_par_escale_c(nav_overrides))
+            afficher_table(table(df_rev_esc, {c: EUR for c in ("droits_port", "pilotage", "remorquage", "lamanage", "total")}))
+
         cat_sel = st.selectbox("Catégorie", categories, key="proj_cat")
         cat_key_sel = cat_keys[categories.index(cat_sel)]
 
         fig_detail = go.Figure()
-        fig_detail.add_trace(go.Bar(x=[str(y) for y in PROJ_YEARS],
+        fig_detail.add_trace(go.Bar(x=x_proj,
                                      y=[r[cat_key_sel]/1e6 for r in results_nwm],
                                      name=f"NWM - {cat_sel}", marker_color=NWM_C))
-        fig_detail.add_trace(go.Bar(x=[str(y) for y in PROJ_YEARS],
+        fig_detail.add_trace(go.Bar(x=x_proj,
                                      y=[r[cat_key_sel]/1e6 for r in results_tm],
                                      name=f"TM - {cat_sel}", marker_color=TM_C))
         fig_detail.update_layout(barmode="group", height=420, yaxis_title="Revenus (M€)")
@@ -1414,10 +1521,10 @@ with tabs[12]:
         st.divider()
         st.subheader("Répartition Navire vs Cargo")
         fig_split = go.Figure()
-        fig_split.add_trace(go.Bar(x=[str(y) for y in PROJ_YEARS],
+        fig_split.add_trace(go.Bar(x=x_proj,
                                     y=[r["navire_total"]/1e6 for r in results_nwm],
                                     name="Services Navire (droits+pilotage+rem+lam)", marker_color="#2C3E50"))
-        fig_split.add_trace(go.Bar(x=[str(y) for y in PROJ_YEARS],
+        fig_split.add_trace(go.Bar(x=x_proj,
                                     y=[r["cargo_total"]/1e6 for r in results_nwm],
                                     name="Droits Marchandises (ctn+hydro+md+vrac+roul)", marker_color="#E74C3C"))
         fig_split.update_layout(barmode="stack", height=420, yaxis_title="NWM Revenus (M€)",
@@ -1435,8 +1542,8 @@ with tabs[12]:
         if traf_sel:
             fig_traf = go.Figure()
             for ts in traf_sel:
-                vals = [get_vol(ts, yi) for yi in range(10)]
-                fig_traf.add_trace(go.Scatter(x=[str(y) for y in PROJ_YEARS], y=vals,
+                vals = volumes[ts]
+                fig_traf.add_trace(go.Scatter(x=x_proj, y=vals,
                                               name=ts, mode="lines+markers"))
                 if linked:
                     # Also show Annexe 7 as dashed reference
@@ -1451,57 +1558,312 @@ with tabs[12]:
     with proj_tabs[4]:
         st.subheader("Tableau Complet — NWM")
 
-        full_data = []
-        for r in results_nwm:
-            full_data.append({
-                "Année": r["year"],
-                "Escales": f"{r['escales']:.0f}",
-                "Droits Port": f"{r['droits_port']/1e6:.2f}",
-                "Pilotage": f"{r['pilotage']/1e6:.2f}",
-                "Remorquage": f"{r['remorquage']/1e6:.2f}",
-                "Lamanage": f"{r['lamanage']/1e6:.2f}",
-                "σ Navire": f"{r['navire_total']/1e6:.2f}",
-                "Conteneurs": f"{r['ctn']/1e6:.2f}",
-                "Hydrocarbures": f"{r['hydro']/1e6:.2f}",
-                "March. Div.": f"{r['md']/1e6:.2f}",
-                "Vrac": f"{r['vrac']/1e6:.2f}",
-                "Roulier": f"{r['roulier']/1e6:.2f}",
-                "σ Cargo": f"{r['cargo_total']/1e6:.2f}",
-                "🔴 TOTAL (M€)": f"{r['total']/1e6:.2f}",
-            })
-        st.dataframe(pd.DataFrame(full_data), use_container_width=True, hide_index=True)
+        afficher_table(grille_projection(results_nwm, "🔴 TOTAL (M€)"))
 
         st.divider()
         st.subheader("Tableau Complet — TM (mêmes volumes)")
-        full_tm = []
-        for r in results_tm:
-            full_tm.append({
-                "Année": r["year"],
-                "Escales": f"{r['escales']:.0f}",
-                "Droits Port": f"{r['droits_port']/1e6:.2f}",
-                "Pilotage": f"{r['pilotage']/1e6:.2f}",
-                "Remorquage": f"{r['remorquage']/1e6:.2f}",
-                "Lamanage": f"{r['lamanage']/1e6:.2f}",
-                "σ Navire": f"{r['navire_total']/1e6:.2f}",
-                "Conteneurs": f"{r['ctn']/1e6:.2f}",
-                "Hydrocarbures": f"{r['hydro']/1e6:.2f}",
-                "March. Div.": f"{r['md']/1e6:.2f}",
-                "Vrac": f"{r['vrac']/1e6:.2f}",
-                "Roulier": f"{r['roulier']/1e6:.2f}",
-                "σ Cargo": f"{r['cargo_total']/1e6:.2f}",
-                "🔵 TOTAL (M€)": f"{r['total']/1e6:.2f}",
-            })
-        st.dataframe(pd.DataFrame(full_tm), use_container_width=True, hide_index=True)
-
-        # Cumulé 2026-2035
+        afficher_table(grille_projection(results_tm, "🔵 TOTAL (M€)"))
+
+        # Cumulé sur l'horizon
         st.divider()
         cum_nwm = sum(r["total"] for r in results_nwm)
         cum_tm = sum(r["total"] for r in results_tm)
         c1, c2, c3 = st.columns(3)
-        c1.metric("🔴 NWM Cumulé 2026-2035", f"{cum_nwm/1e6:,.1f} M€")
-        c2.metric("🔵 TM Cumulé 2026-2035", f"{cum_tm/1e6:,.1f} M€")
+        c1.metric(f"🔴 NWM Cumulé {annees_proj[0]}-{annees_proj[-1]}", f"{cum_nwm/1e6:,.1f} M€")
+        c2.metric(f"🔵 TM Cumulé {annees_proj[0]}-{annees_proj[-1]}", f"{cum_tm/1e6:,.1f} M€")
         c3.metric("Δ NWM vs TM", f"{(cum_nwm-cum_tm)/1e6:+,.1f} M€ ({(cum_nwm/cum_tm-1)*100:+.1f}%)")
 
+        with st.expander("⬇️ Export colonnaire (valeurs numériques typées)"):
+            st.caption("Projections NWM/TM, récapitulatif du coût d'escale (onglet Coût Total) et barèmes, "
+                       "en float64 — sans formatage d'affichage. Arrow IPC = lecture zero-copy (memory-map).")
+            fmt_exp = st.radio("Format", list(FORMATS), horizontal=True, key="exp_fmt")
+            st.download_button(f"⬇️ Télécharger ({fmt_exp}, zip)",
+                               archive_zip(tables_export(results_nwm, results_tm, cout), fmt_exp),
+                               f"export_{fmt_exp}.zip", "application/zip", key="exp_dl")
+
+        with st.expander(f"⏱️ Projection par période (flux) — {granularite}, {annees_proj[0]}-{annees_proj[-1]}"):
+            st.caption("Revenus NWM / TM calculés période par période (iter_projection): le graphique et le fichier "
+                       "sont alimentés au fil du calcul, sans matérialiser la projection complète.")
+            fmt_flux = st.radio("Format", list(FORMATS), horizontal=True, key="flux_fmt")
+            if st.button("▶️ Calculer la projection par période", key="flux_go"):
+                n_per = len(annees_proj) * GRANULARITES[granularite]
+                pas = max(1, n_per // 25)
+                barre, graphe = st.progress(0.0), st.empty()
+                lab, tot_nwm, tot_tm = [], [], []
+
+                def flux():
+                    for rn, rt in iter_projection(computed_escales, volumes, tarifs_proj, nav_overrides,
+                                                  granularite=granularite):
+                        lab.append(rn.get("periode", str(rn["year"])))
+                        tot_nwm.append(rn["total"] / 1e6)
+                        tot_tm.append(rt["total"] / 1e6)
+                        if len(lab) % pas == 0 or len(lab) == n_per:
+                            fig_flux = go.Figure()
+                            fig_flux.add_trace(go.Scatter(x=lab, y=tot_nwm, name="NWM", line=dict(color=NWM_C, width=2)))
+                            fig_flux.add_trace(go.Scatter(x=lab, y=tot_tm, name="TM", line=dict(color=TM_C, width=2, dash="dash")))
+                            fig_flux.update_layout(height=350, yaxis_title=f"Revenu par période (M€) — {granularite}",
+                                                   xaxis=dict(range=[0, n_per - 1]), legend=dict(orientation="h", y=1.1))
+                            graphe.plotly_chart(fig_flux, use_container_width=True)
+                            barre.progress(len(lab) / n_per, text=f"⏳ {lab[-1]} — {len(lab)}/{n_per} périodes")
+                        yield rn, rt
+
+                buf = io.BytesIO()
+                n_lignes = exporter_projection_flux(flux(), buf, fmt_flux)
+                st.session_state["flux_res"] = (buf.getvalue(), fmt_flux, f"{granularite}_{annees_proj[0]}_{annees_proj[-1]}",
+                                                n_lignes)
+            if "flux_res" in st.session_state:
+                data_flux, fmt_f, nom_f, n_f = st.session_state["flux_res"]
+                st.download_button(f"⬇️ Projection {nom_f} ({n_f:,} lignes, {fmt_f})", data_flux,
+                                   f"projection_{nom_f}.{fmt_f}", key="flux_dl")
+
+    # ─── TAB: SCENARIOS ──────────────────────────────────────────────────────
+    with proj_tabs[5]:
+        st.subheader("🧪 Comparaison de scénarios")
+        st.caption("Chaque ligne = un scénario. Les paramètres non renseignés reprennent les valeurs par défaut (Annexe 7). "
+                   "Les scénarios sont calculés en parallèle et mis en cache: seuls les scénarios modifiés sont recalculés.")
+
+        sc_defaut = pd.DataFrame([
+            {"nom": "Annexe 7", "target_year": 2030, "growth_rate": 3.0, "pct_ts": 70,
+             "t_ctn_ts_nwm": 0.55, "t_ctn_ie_nwm": 38.25, "t_ctn_ts_tm": 0.583, "t_ctn_ie_tm": 38.63},
+            {"nom": "Croissance 5%", "target_year": 2030, "growth_rate": 5.0, "pct_ts": 70,
+             "t_ctn_ts_nwm": 0.55, "t_ctn_ie_nwm": 38.25, "t_ctn_ts_tm": 0.583, "t_ctn_ie_tm": 38.63},
+            {"nom": "Transbordement 90%", "target_year": 2030, "growth_rate": 3.0, "pct_ts": 90,
+             "t_ctn_ts_nwm": 0.55, "t_ctn_ie_nwm": 38.25, "t_ctn_ts_tm": 0.583, "t_ctn_ie_tm": 38.63},
+        ])
+        sc_edit = st.data_editor(sc_defaut, num_rows="dynamic", use_container_width=True, hide_index=True, key="sc_edit",
+                                 column_config={"target_year": st.column_config.SelectboxColumn("target_year", options=PROJ_YEARS)})
+        c1, c2 = st.columns(2)
+        with c1:
+            sc_json = st.file_uploader("Scénarios complets (JSON: liste de dicts, avec 'escales' / 'navires')", type="json", key="sc_json")
+        with c2:
+            sc_xlsx = st.file_uploader("Scénarios (XLSX: feuilles scenarios / escales / navires)", type="xlsx", key="sc_xlsx")
+        buf_sc = io.BytesIO()
+        ecrire_scenarios([{k: v for k, v in row.items() if pd.notna(v)} for row in sc_edit.to_dict("records")], buf_sc)
+        st.download_button("⬇️ Scénarios (XLSX)", buf_sc.getvalue(), "scenarios.xlsx", key="sc_xlsx_dl")
+
+        taches_session = st.session_state.setdefault("taches", {})
+        scenarios = [{k: v for k, v in row.items() if pd.notna(v)} for row in sc_edit.to_dict("records")]
+        try:
+            if sc_json is not None:
+                scenarios += json.loads(sc_json.getvalue())
+            if sc_xlsx is not None:
+                scenarios += lire_scenarios(sc_xlsx)
+        except ValueError as e:
+            st.error(str(e))
+        cle_sc = json.dumps(scenarios, sort_keys=True, ensure_ascii=False, default=str)
+        if annuler_si_perimee(taches_session, "scenarios", cle_sc):
+            st.caption("⏹️ Paramètres modifiés: le calcul en cours a été annulé.")
+
+        c1, c2 = st.columns([1, 4])
+        with c1:
+            if st.button("▶️ Lancer les scénarios", key="sc_run"):
+                lancer(taches_session, "scenarios", cle_sc, iter_scenarios, scenarios, total=len(scenarios))
+        suivi_actif = en_cours(taches_session.get("scenarios"))  # état au dernier rendu complet
+
+        @st.fragment(run_every=1.0 if suivi_actif else None)
+        def suivi_scenarios():
+            t = taches_session.get("scenarios")
+            if t is None:
+                return
+            if en_cours(t):
+                st.progress(t["progression"], text=f"⏳ {len(t['partiels'])}/{t['total']} scénarios calculés…")
+                if st.button("⏹️ Annuler", key="sc_stop"):
+                    annuler(taches_session, "scenarios")
+            elif t["etat"] == "erreur":
+                st.error(t["erreur"])
+            elif t["etat"] == "annule":
+                st.caption(f"Calcul annulé — {len(t['partiels'])}/{t['total']} scénarios disponibles.")
+            df_sc = table_scenarios(t["partiels"])
+            if df_sc.empty:
+                return
+            port_sc = st.radio("Port", ["NWM", "TM"], horizontal=True, key="sc_port")
+            tot_sc = df_sc[(df_sc["port"] == port_sc) & (df_sc["poste"] == "total")]
+            fig_sc = go.Figure()
+            for nom_sc, g in tot_sc.groupby("scenario", sort=False):
+                fig_sc.add_trace(go.Scatter(x=[str(y) for y in g["year"]], y=g["valeur"] / 1e6, name=nom_sc, mode="lines+markers"))
+            fig_sc.update_layout(height=420, yaxis_title=f"Revenu total {port_sc} (M€)", legend=dict(orientation="h", y=1.1))
+            st.plotly_chart(fig_sc, use_container_width=True)
+            piv = tot_sc.pivot(index="scenario", columns="year", values="valeur") / 1e6
+            piv.columns = [str(c) for c in piv.columns]
+            piv["Cumulé"] = piv.sum(axis=1)
+            piv.attrs["formats"] = {c: "%.2f" for c in piv.columns}
+            afficher_table(piv, hide_index=False)
+            if t["etat"] == "termine":
+                st.download_button("⬇️ Résultats (CSV long)", df_sc.to_csv(index=False).encode("utf-8"),
+                                   "scenarios.csv", "text/csv", key="sc_dl")
+            if suivi_actif and not en_cours(t):
+                st.rerun()  # fin du calcul: arrêt du suivi périodique
+
+        suivi_scenarios()
+
+    # ─── TAB: OPTIMISATION NWM ───────────────────────────────────────────────
+    with proj_tabs[6]:
+        st.subheader("🎯 Grille NWM sous-cotant TM à revenus projetés maximaux")
+        st.caption("Multiplicateurs des droits de port NWM (par terminal), des tranches de remorquage et des tarifs "
+                   "conteneurs: coût d'escale NWM ≤ TM − X% sur la flotte cible, revenus NWM 2026-2035 du scénario "
+                   "ci-dessus maximaux (programme linéaire, HiGHS). Pilotage et lamanage NWM inchangés.")
+        c1, c2, c3, c4 = st.columns(4)
+        with c1:
+            opt_x = st.slider("Sous-cotation vs TM (%)", 0.0, 30.0, 10.0, 0.5, key="opt_x")
+        with c2:
+            opt_mode = st.radio("Contrainte", list(MODES), format_func=MODES.get, key="opt_mode")
+        with c3:
+            opt_bornes = st.slider("Multiplicateurs (min, max)", 0.0, 3.0, BORNES_DEFAUT, 0.05, key="opt_bornes")
+        with c4:
+            opt_act = st.number_input("Actualisation (%/an)", 0.0, 20.0, 0.0, 0.5, key="opt_act")
+        sources_opt = ["Navires de référence (Annexe 7)"] + (["Flotte de l'onglet Flotte"] if flotte_t is not None else [])
+        opt_src = st.radio("Flotte cible", sources_opt, horizontal=True, key="opt_src")
+        fl_opt = flotte_t if opt_src == "Flotte de l'onglet Flotte" else flotte_reference(nav_overrides)
+        proj_opt = {"escales": computed_escales, "volumes": volumes, "tarifs": {**TARIFS_PROJ_DEFAUT, **tarifs_proj},
+                    "nav_overrides": nav_overrides or None}
+        try:
+            opt = optimiser(fl_opt, opt_x, proj=proj_opt, mode=opt_mode, bornes=tuple(opt_bornes), actualisation=opt_act)
+        except ValueError as e:
+            st.error(str(e))
+            opt = None
+        if opt is not None:
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Revenu NWM cumulé actuel", f"{opt['revenu_actuel'] / 1e6:,.1f} M€")
+            c2.metric("Revenu NWM cumulé proposé", f"{opt['revenu_propose'] / 1e6:,.1f} M€",
+                      f"{(opt['revenu_propose'] / opt['revenu_actuel'] - 1) * 100:+.1f}%")
+            c3.metric("Écart max vs TM (flotte cible)", f"{opt['flotte']['ecart_vs_tm'].max():+.1f}%")
+            traj = opt["trajectoire"]
+            fig_opt = go.Figure()
+            for col, nom, coul, tiret in (("nwm_actuel", "NWM actuel", NWM_C, "dot"), ("nwm_propose", "NWM proposé", NWM_C, None),
+                                          ("tm", "TM", TM_C, None)):
+                fig_opt.add_trace(go.Scatter(x=[str(y) for y in traj["year"]], y=traj[col] / 1e6, name=nom, mode="lines+markers",
+                                             line=dict(color=coul, dash=tiret)))
+            fig_opt.update_layout(height=380, yaxis_title="Revenu total (M€)", legend=dict(orientation="h", y=1.12))
+            st.plotly_chart(fig_opt, use_container_width=True)
+            c1, c2 = st.columns(2)
+            with c1:
+                afficher_table(table(opt["multiplicateurs"], {"multiplicateur": "%.3f"}))
+            with c2:
+                afficher_table(table(diff_tarifs(version(), version(opt["grille"])), {"ecart": "%.4f", "ecart_pct": PCT}))
+            afficher_table(table(traj, {"nwm_actuel": EUR, "nwm_propose": EUR, "tm": EUR, "ecart": EUR, "ecart_pct": PCT}))
+            st.download_button("⬇️ Grille proposée (version tarifaire JSON)", json_version(opt["grille"]).encode("utf-8"),
+                               "grille_nwm.json", "application/json", key="opt_dl")
+
+    # ─── TAB: PARTS DE MARCHÉ ────────────────────────────────────────────────
+    with proj_tabs[7]:
+        st.subheader("🌐 Parts de marché TM / NWM / Algeciras (choix logit sur le coût d'escale)")
+        st.caption("Marché de chaque classe (catégorie × navire) calé sur les escales NWM du scénario aux tarifs en "
+                   "vigueur; répartition logit sur le coût d'escale relatif, congestion au-delà des capacités (BPR). "
+                   "Les revenus NWM sont recalculés sur les escales NWM à l'équilibre.")
+        c1, c2 = st.columns(2)
+        with c1:
+            pm_theta = st.slider("Sensibilité au coût θ", 0.5, 15.0, ELASTICITE_DEFAUT, 0.5, key="pm_theta")
+            pm_ref = st.checkbox("Parts de référence observées (sinon: coût seul)", key="pm_ref")
+            parts_pm = None
+            if pm_ref:
+                cols = st.columns(3)
+                parts_pm = {p: cols[i].number_input(f"Part {p} (%)", 1.0, 98.0, v, 1.0, key=f"pm_part_{p}")
+                            for i, (p, v) in enumerate(zip(PORTS, (55.0, 15.0, 30.0)))}
+        with c2:
+            st.caption("Capacités (escales/an, 0 = sans congestion)")
+            cols = st.columns(3)
+            cap_pm = {p: cols[i].number_input(p, 0, 100_000, 0, 100, key=f"pm_cap_{p}") for i, p in enumerate(PORTS)}
+            versions_pm = ["Tarifs en vigueur"] + (["Grille optimisée (onglet Optimisation NWM)"] if opt is not None else [])
+            pm_version = st.radio("Tarifs", versions_pm + ["Version JSON"], horizontal=True, key="pm_version")
+            tarifs_pm = opt["grille"] if pm_version.startswith("Grille") else None
+            if pm_version == "Version JSON":
+                fich_pm = st.file_uploader("Version tarifaire (JSON)", type="json", key="pm_json")
+                try:
+                    tarifs_pm = charger_version(fich_pm) if fich_pm is not None else None
+                except (ValueError, KeyError) as e:
+                    st.error(str(e))
+        try:
+            mod_pm = compiler_marche(proj_opt, pm_theta, parts_pm, cap_pm)
+            eq_ref, eq_pm = equilibre(mod_pm), equilibre(mod_pm, tarifs_pm)
+        except ValueError as e:
+            st.error(str(e))
+            eq_pm = None
+        non_conv = [e for e in (eq_ref, eq_pm) if eq_pm is not None and not e["converge"]]
+        if non_conv:
+            st.warning(f"Équilibre non atteint après {non_conv[0]['iterations']} itérations (résidu "
+                       f"{non_conv[0]['residu']:.1e}): parts et revenus non affichés — revoir capacités ou θ")
+            eq_pm = None
+        if eq_pm is not None:
+            rev_ref = sum(r["total"] for r in projection_equilibre(mod_pm, eq_ref)[0])
+            rev_pm = sum(r["total"] for r in projection_equilibre(mod_pm, eq_pm, tarifs_pm)[0])
+            i_nwm = PORTS.index("NWM")
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Escales NWM cumulées", f"{eq_pm['escales_ports'][:, i_nwm].sum():,.0f}",
+                      f"{eq_pm['escales_ports'][:, i_nwm].sum() - eq_ref['escales_ports'][:, i_nwm].sum():+,.0f} vs tarifs en vigueur")
+            c2.metric("Part NWM (dernière année)", f"{eq_pm['escales_ports'][-1, i_nwm] / eq_pm['escales_ports'][-1].sum() * 100:.1f}%")
+            c3.metric("Revenu NWM cumulé", f"{rev_pm / 1e6:,.1f} M€", f"{(rev_pm / rev_ref - 1) * 100:+.1f}% vs tarifs en vigueur")
+            ports_pm = table_ports(mod_pm, eq_pm)
+            fig_pm = go.Figure()
+            for p, coul in zip(PORTS, (TM_C, NWM_C, ALG_C)):
+                g = ports_pm[ports_pm["port"] == p]
+                fig_pm.add_trace(go.Scatter(x=[str(y) for y in g["year"]], y=g["part"], name=p, stackgroup="parts",
+                                            line=dict(color=coul)))
+            fig_pm.update_layout(height=380, yaxis_title="Part des escales (%)", legend=dict(orientation="h", y=1.12))
+            st.plotly_chart(fig_pm, use_container_width=True)
+            afficher_table(table(ports_pm, {"escales": "%.0f", "part": "%.1f", "utilisation": "%.1f"}))
+            parts_cl = table_parts(mod_pm, eq_pm)
+            st.download_button("⬇️ Parts par classe (CSV)", parts_cl.to_csv(index=False).encode("utf-8"),
+                               "parts_marche.csv", "text/csv", key="pm_dl")
+
+    # ─── TAB: POSTES A QUAI ──────────────────────────────────────────────────
+    with proj_tabs[8]:
+        st.subheader("⚓ Saisonnalité et occupation des postes à quai NWM")
+        st.caption("Escales du scénario réparties sur l'année selon un profil saisonnier par catégorie, servies par "
+                   "terminal dans l'ordre d'arrivée (simulation à événements discrets). L'attente postes pleins est "
+                   "facturée en stationnement en rade (franchise 24h, 50% dès le 5ème jour).")
+        c1, c2 = st.columns(2)
+        with c1:
+            pq_annee = st.selectbox("Année", annees_proj, index=min(len(PROJ_YEARS), len(annees_proj)) - 1, key="pq_annee")
+            cols = st.columns(len(POSTES_NWM))
+            postes_pq = {t: cols[i].number_input(t.replace("Terminal ", ""), 1, 100, n, 1, key=f"pq_postes_{i}")
+                         for i, (t, n) in enumerate(POSTES_NWM.items())}
+            c3, c4 = st.columns(2)
+            pq_cv = c3.slider("Dispersion des séjours (CV)", 0.0, 1.0, CV_SEJOUR, 0.05, key="pq_cv")
+            pq_graine = c4.number_input("Graine aléatoire", 0, 1_000_000, 0, 1, key="pq_graine")
+        with c2:
+            df_prof = st.data_editor(pd.DataFrame({"categorie": ESC_CATS,
+                                                   "profil": [PROFIL_CATEGORIE.get(c, "uniforme") for c in ESC_CATS]}),
+                                     hide_index=True, use_container_width=True, key="pq_profils", disabled=["categorie"],
+                                     column_config={"profil": st.column_config.SelectboxColumn("profil", options=list(PROFILS_SAISON))})
+            profils_pq = dict(zip(df_prof["categorie"], df_prof["profil"].fillna("uniforme")))
+            struct_pq = opt["grille"] if opt is not None and st.checkbox("Tarifs de la grille optimisée (onglet Optimisation NWM)",
+                                                                         key="pq_opt") else None
+        esc_pq = simuler(computed_escales, pq_annee, postes_pq, profils_pq, nav_overrides, struct_pq, pq_cv, pq_graine)
+        synth_pq = synthese_postes(esc_pq, postes_pq, pq_annee)
+        c1, c2, c3 = st.columns(3)
+        c1.metric(f"Escales NWM {pq_annee}", f"{len(esc_pq):,}")
+        c2.metric("Attente moyenne en rade", f"{esc_pq['attente_h'].mean():.1f} h",
+                  f"{(esc_pq['attente_h'] > 0).mean() * 100:.0f}% des navires attendent", delta_color="off")
+        c3.metric("Stationnement en rade", f"{esc_pq['stationnement_rade'].sum() / 1e6:,.2f} M€")
+        afficher_table(table(synth_pq, {"occupation": "%.1f", "attente_moy_h": "%.1f", "attente_p95_h": "%.1f",
+                                        "attente_max_h": "%.1f", "en_rade": "%.1f", "stationnement_rade": EUR}))
+        mens_pq = synthese_mensuelle(esc_pq)
+        fig_pq = go.Figure()
+        for terminal, g in mens_pq.groupby("terminal", sort=False):
+            fig_pq.add_trace(go.Bar(x=g["mois"], y=g["escales"], name=f"{terminal} — escales", opacity=0.45))
+            fig_pq.add_trace(go.Scatter(x=g["mois"], y=g["attente_moy_h"], name=f"{terminal} — attente (h)",
+                                        yaxis="y2", mode="lines+markers"))
+        fig_pq.update_layout(height=420, barmode="group", xaxis=dict(title="Mois", dtick=1), yaxis_title="Escales",
+                             yaxis2=dict(title="Attente moyenne (h)", overlaying="y", side="right"),
+                             legend=dict(orientation="h", y=1.2))
+        st.plotly_chart(fig_pq, use_container_width=True)
+        st.download_button("⬇️ Escales simulées (CSV)", esc_pq.to_csv(index=False).encode("utf-8"),
+                           f"escales_simulees_{pq_annee}.csv", "text/csv", key="pq_dl")
+
+        if st.button(f"📈 Simuler l'horizon {annees_proj[0]}-{annees_proj[-1]}", key="pq_horizon"):
+            st.session_state["pq_horizon_res"] = simulation_horizon(computed_escales, postes_pq, profils_pq, nav_overrides,
+                                                                    struct_pq, pq_cv, pq_graine)
+        hor_pq = st.session_state.get("pq_horizon_res")
+        if hor_pq is not None:
+            fig_hpq = go.Figure()
+            for terminal, g in hor_pq.groupby("terminal", sort=False):
+                fig_hpq.add_trace(go.Bar(x=[str(y) for y in g["year"]], y=g["stationnement_rade"] / 1e6, name=terminal))
+            fig_hpq.update_layout(barmode="stack", height=360, yaxis_title="Stationnement en rade (M€)",
+                                  legend=dict(orientation="h", y=1.12))
+            st.plotly_chart(fig_hpq, use_container_width=True)
+            afficher_table(table(hor_pq, {"occupation": "%.1f", "attente_moy_h": "%.1f", "attente_p95_h": "%.1f",
+                                          "attente_max_h": "%.1f", "en_rade": "%.1f", "stationnement_rade": EUR}))
+
 # ─── FOOTER ──────────────────────────────────────────────────────────────────
 st.divider()
 st.caption("📌 Simulateur basé sur les cahiers tarifaires 2025 (TM & NWM) et résolution tarifaire 2024 (Algeciras) | Données extraites fév. 2026 | Tous tarifs HT")
@@ -0,0 +1,209 @@
+"""
+balayage.py — Balayage d'une ligne tarifaire (ou de plusieurs) selon la taille du navire ou les paramètres d'escale
+
+Axes: gt, vg, loa (taille: le navire est mis à l'échelle à proportions constantes loa/beam, draft/beam et
+GT/VG, cf. estimation.py), sejour_h, nb_rem (navire de base fixe). Chaque ligne de LIGNES est un calcul
+vectorisé sur son assiette (vg, gt, loa, sejour_h, nb_rem) et déclare ses seuils de tranche:
+ils sont convertis dans l'unité de l'axe et ajoutés à la grille en couple (fin de tranche, début de la
+suivante), l'assiette y étant forcée à la valeur exacte du barème. Les discontinuités (ex. pilotage TM
+à VG 180 000 m³) apparaissent donc exactement, sans sur-échantillonner la grille.
+"""
+import numpy as np
+import pandas as pd
+
+from cout_escale import (ESCALE_DEFAUT, _REM_TM, _REM_NWM, _pilotage_tm, _pilotage_nwm, _remorquage, _stationnement,
+                         _coef_dechets)
+from estimation import _vg
+from tarifs_data import (
+    DROITS_PORT_NAVIRES_TM, DROITS_PORT_NAVIRES_NWM, PILOTAGE_TM, REMORQUAGE_TM, REMORQUAGE_TM_SUP, REMORQUAGE_NWM,
+    REMORQUAGE_NWM_SUP, LAMANAGE_TM, PILOTAGE_NWM, LAMANAGE_NWM, ALG_DECHETS_COEF,
+    ALG_T1_COEF_UTILISATION, ALG_T1_REDUCTION_FREQUENCE, ALG_T1_BASE_B, ALG_T1_MIN_HEURES, ALG_T1_MAX_HEURES_24H,
+    ALG_T1_COEF_CORRECTEUR, ALG_PILOTAGE_TARIFS, ALG_T0_TOTAL_GT, ALG_DECHETS_BASE_R1,
+)
+
+AXES_BALAYAGE = {"gt": "GT", "vg": "VG (m³)", "loa": "LOA (m)", "sejour_h": "Séjour (h)", "nb_rem": "Remorqueurs"}
+PLAGES_BALAYAGE = {"gt": (5000, 150000), "vg": (10000, 450000), "loa": (80, 400), "sejour_h": (1, 120), "nb_rem": (0, 6)}
+TAILLES = ("loa", "beam", "draft", "vg", "gt")
+BASE_DEFAUT = {"loa": 190.94, "beam": 32.2, "draft": 6.5, "gt": 22341, **ESCALE_DEFAUT, "alg_pil_tranche": "T+2"}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SEUILS DE TRANCHES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _apres(v):
+    return np.nextafter(v, np.inf)
+
+
+def _bornes(tranches):
+    """Barème [(lo, hi, tarif)] → couples (hi, lo suivant)"""
+    return [(a[1], b[0]) for a, b in zip(tranches, tranches[1:])]
+
+
+def _pas(debut, pas, vmin, vmax):
+    """Sauts d'un supplément par pas entamé (ceil) au-delà de debut, dans [vmin, vmax]"""
+    k0 = max(1, int(np.ceil((vmin - debut) / pas)))
+    return [(debut + k * pas, _apres(debut + k * pas)) for k in range(k0, int((vmax - debut) // pas) + 1)]
+
+
+def _seuils_pilotage_tm(vmin, vmax, o):
+    d = PILOTAGE_TM["Entrée"]  # bornes identiques en sortie
+    return (_bornes(d["tranches"]) + [(110000, _apres(110000))] + _pas(110000, 10000, vmin, 179999)
+            + [(180000, d["tranches2"][0][0])] + _bornes(d["tranches2"]) + [(260000, _apres(260000))]
+            + _pas(260000, 10000, vmin, vmax))
+
+
+def _seuils_remorquage(bareme):
+    return lambda vmin, vmax, o: _bornes(bareme) + [(50000, _apres(50000))] + _pas(50000, 5000, vmin, vmax)
+
+
+def _seuils_stationnement(vmin, vmax, o):
+    return [(24, _apres(24)), (32, _apres(32))] + _pas(24, 24, vmin, vmax)
+
+
+def _seuils_t1(vmin, vmax, o):
+    return ([(ALG_T1_MIN_HEURES, ALG_T1_MIN_HEURES)] + _pas(0, 24, vmin, vmax)
+            + [(v, v) for v, _ in _pas(0, ALG_T1_MAX_HEURES_24H, vmin, vmax)])
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LIGNES TARIFAIRES (VECTORISÉES)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _droits(grille, taux_terminal):
+    return lambda e, o: (e["vg"] * (taux_terminal[o[grille]]["nautique"] + taux_terminal[o[grille]]["port"])
+                         + _stationnement(e["vg"], taux_terminal[o[grille]]["stationnement"], e["sejour_h"]))
+
+
+def _t1(e, o):
+    sej = e["sejour_h"]
+    h = np.maximum(sej, ALG_T1_MIN_HEURES)
+    h = np.where(h > ALG_T1_MAX_HEURES_24H, np.minimum(h, ALG_T1_MAX_HEURES_24H * np.ceil(sej / 24)), h)
+    freq = ALG_T1_REDUCTION_FREQUENCE[o["alg_freq"]]
+    freq = max(freq - 0.05, 0.10) if o["alg_regulier"] else freq
+    return (e["gt"] / 100) * h * ALG_T1_BASE_B * ALG_T1_COEF_CORRECTEUR * ALG_T1_COEF_UTILISATION[o["alg_concession"]] * freq
+
+
+def _pilotage_alg(e, o):
+    t = ALG_PILOTAGE_TARIFS[o["alg_pil_tranche"]]
+    return sum(t[m]["fixe"] + t[m]["variable"] * e["gt"] for m in ("Entrée", "Sortie"))
+
+
+def _lamanage_tm(e, o):
+    ll = LAMANAGE_TM[o["cat_lam_tm"]]
+    return np.maximum(e["loa"] * ll["tarif_ml"], ll["min"])
+
+
+_PIL_NWM = PILOTAGE_NWM["Entrée/Sortie"]
+_NWM_PIL_MIN = (_PIL_NWM["min"] - _PIL_NWM["fixe"]) / _PIL_NWM["variable"]  # GT du plancher de pilotage
+_DECHETS = [(m, _apres(m)) for m, _, _ in ALG_DECHETS_COEF["tranches"]]
+
+# nom → port, assiettes, calcul f(état, options), seuils {assiette: f(vmin, vmax, options) → [(fin, début suivant)]}
+LIGNES = {
+    "TM · Pilotage E+S": {"port": "TM", "assiettes": ("vg",),
+                          "fn": lambda e, o: _pilotage_tm(e["vg"], "Entrée") + _pilotage_tm(e["vg"], "Sortie"),
+                          "seuils": {"vg": _seuils_pilotage_tm}},
+    "NWM · Pilotage E+S": {"port": "NWM", "assiettes": ("gt",),
+                           "fn": lambda e, o: _pilotage_nwm(e["gt"], PILOTAGE_NWM) * 2,
+                           "seuils": {"gt": lambda vmin, vmax, o: [(_NWM_PIL_MIN, _NWM_PIL_MIN)]}},
+    "Algeciras · Pilotage E+S": {"port": "Algeciras", "assiettes": ("gt",), "fn": _pilotage_alg, "seuils": {}},
+    "TM · Remorquage": {"port": "TM", "assiettes": ("gt", "nb_rem"),
+                        "fn": lambda e, o: _remorquage(e["gt"], _REM_TM, REMORQUAGE_TM_SUP) * e["nb_rem"] * o["nb_mvt"],
+                        "seuils": {"gt": _seuils_remorquage(REMORQUAGE_TM)}},
+    "NWM · Remorquage": {"port": "NWM", "assiettes": ("gt", "nb_rem"),
+                         "fn": lambda e, o: _remorquage(e["gt"], _REM_NWM, REMORQUAGE_NWM_SUP) * e["nb_rem"] * o["nb_mvt"],
+                         "seuils": {"gt": _seuils_remorquage(REMORQUAGE_NWM)}},
+    "TM · Lamanage": {"port": "TM", "assiettes": ("loa",), "fn": _lamanage_tm,
+                      "seuils": {"loa": lambda vmin, vmax, o: [(LAMANAGE_TM[o["cat_lam_tm"]]["min"]
+                                                                / LAMANAGE_TM[o["cat_lam_tm"]]["tarif_ml"],) * 2]}},
+    "NWM · Lamanage": {"port": "NWM", "assiettes": ("gt",),
+                       "fn": lambda e, o: LAMANAGE_NWM["variable"] * e["gt"] + LAMANAGE_NWM["fixe"], "seuils": {}},
+    "TM · Droits de port": {"port": "TM", "assiettes": ("vg", "sejour_h"), "fn": _droits("terminal_tm", DROITS_PORT_NAVIRES_TM),
+                            "seuils": {"sejour_h": _seuils_stationnement}},
+    "NWM · Droits de port": {"port": "NWM", "assiettes": ("vg", "sejour_h"),
+                             "fn": _droits("terminal_nwm", DROITS_PORT_NAVIRES_NWM),
+                             "seuils": {"sejour_h": _seuils_stationnement}},
+    "Algeciras · T1 Navire": {"port": "Algeciras", "assiettes": ("gt", "sejour_h"), "fn": _t1,
+                              "seuils": {"sejour_h": _seuils_t1}},
+    "Algeciras · T0 Aides Nav.": {"port": "Algeciras", "assiettes": ("gt",), "fn": lambda e, o: ALG_T0_TOTAL_GT * e["gt"],
+                                  "seuils": {}},
+    "Algeciras · Déchets": {"port": "Algeciras", "assiettes": ("gt",),
+                            "fn": lambda e, o: ALG_DECHETS_BASE_R1 * _coef_dechets(e["gt"], ALG_DECHETS_COEF),
+                            "seuils": {"gt": lambda vmin, vmax, o: _DECHETS}},
+}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# MOTEUR
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _coefs(prop):
+    """Taille = coef × beam^puissance, à proportions constantes"""
+    lb, db, r = prop["loa_beam"], prop["draft_beam"], prop["ratio_gt_vg"]
+    k = lb * max(db, 0.14 * np.sqrt(lb))
+    return {"loa": (lb, 1), "beam": (1.0, 1), "draft": (db, 1), "vg": (k, 3), "gt": (r * k, 3)}
+
+
+def _convertir(valeurs, de, vers, coefs):
+    """Valeur d'une grandeur de taille → valeur d'une autre (via la largeur)"""
+    (ca, pa), (cb, pb) = coefs[de], coefs[vers]
+    return cb * (np.asarray(valeurs, dtype="float64") / ca) ** (pb / pa)
+
+
+def _etat(axe, x, base, coefs):
+    """Grille de l'axe → assiettes {loa, beam, draft, vg, gt, sejour_h, nb_rem} (tableaux)"""
+    n = len(x)
+    if axe in TAILLES:
+        e = {t: _convertir(x, axe, t, coefs) if t != axe else x.copy() for t in TAILLES}
+    else:
+        e = {t: np.full(n, float(base[t])) for t in ("loa", "beam", "draft", "gt")}
+        e["vg"] = _vg(e["loa"], e["beam"], e["draft"])
+    for p in ("sejour_h", "nb_rem"):
+        e[p] = x.copy() if axe == p else np.full(n, float(base[p]))
+    return e
+
+
+def balayer(lignes, axe="gt", debut=5000, fin=150000, pas=None, nb_points=200, base=None, proportions=None):
+    """Balaye les lignes tarifaires (clés de LIGNES) sur l'axe → DataFrame: axe, seuil, assiettes, une colonne par ligne
+
+    pas: pas de la grille régulière (sinon nb_points points); base: paramètres du navire et de l'escale
+    (BASE_DEFAUT pour les clés absentes); proportions: {ratio_gt_vg, loa_beam, draft_beam} pour les axes de taille
+    (par défaut celles du navire de base). Les lignes seuil=True sont les bornes de tranches, en couples.
+    """
+    if axe not in AXES_BALAYAGE:
+        raise ValueError(f"Axe inconnu: {axe!r} (attendu: {', '.join(AXES_BALAYAGE)})")
+    inconnues = [l for l in lignes if l not in LIGNES]
+    if inconnues:
+        raise ValueError(f"Ligne(s) tarifaire(s) inconnue(s): {inconnues}")
+    o = {**BASE_DEFAUT, **(base or {})}
+    prop = proportions or {"ratio_gt_vg": o["gt"] / _vg(o["loa"], o["beam"], o["draft"]),
+                           "loa_beam": o["loa"] / o["beam"], "draft_beam": o["draft"] / o["beam"]}
+    coefs = _coefs(prop)
+    x = np.arange(debut, fin + pas / 2, pas, dtype="float64") if pas else np.linspace(debut, fin, nb_points)
+
+    # seuils des lignes dans l'unité de l'axe, assiette forcée à la valeur exacte du barème
+    xs, forces = [x], []
+    for nom in lignes:
+        for assiette, seuils in LIGNES[nom]["seuils"].items():
+            if assiette == axe or (axe in TAILLES and assiette in TAILLES):
+                vmin, vmax = (_convertir([debut, fin], axe, assiette, coefs) if assiette != axe else (debut, fin))
+                for fin_tranche, suivante in seuils(vmin, vmax, o):
+                    if vmin <= fin_tranche <= vmax:
+                        for v in (fin_tranche, suivante):
+                            xv = v if assiette == axe else float(_convertir(v, assiette, axe, coefs))
+                            xs.append(np.array([xv]))
+                            forces.append((len(forces), assiette, v))
+    nb_reg = len(x)
+    x = np.concatenate(xs)
+    seuil = np.arange(len(x)) >= nb_reg
+    e = _etat(axe, x, o, coefs)
+    for i, assiette, v in forces:
+        e[assiette][nb_reg + i] = v
+    ordre = np.lexsort((np.arange(len(x)), x))  # stable: fin de tranche avant début de la suivante
+
+    out = {AXES_BALAYAGE[axe]: x, "seuil": seuil, **{t: e[t] for t in ("gt", "vg", "loa", "sejour_h", "nb_rem")}}
+    for nom in lignes:
+        v = LIGNES[nom]["fn"](e, o)
+        out[nom] = np.broadcast_to(v, x.shape).astype("float64")
+    df = pd.DataFrame(out).iloc[ordre].reset_index(drop=True)
+    return df.drop_duplicates(subset=[AXES_BALAYAGE[axe]] + list(lignes), ignore_index=True)
@@ -0,0 +1,162 @@
+"""
+cache_disque.py — Cache disque adressé par contenu, partagé entre sessions et processus
+
+Clé = SHA-256(espace de noms + empreinte des données tarifaires + source du module calculant + entrées).
+Valeurs sérialisées en pickle, écritures atomiques (os.replace) pour que plusieurs workers
+puissent lire/écrire simultanément. Éviction LRU (date d'accès = mtime) au-delà de la taille max, déclenchée
+d'après la taille cumulée des écritures (le répertoire n'est pas parcouru à chaque écriture).
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sys
+import tempfile
+
+CACHE_DIR = os.environ.get("SIMULATEUR_CACHE_DIR",
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "objets"))
+TAILLE_MAX_MO = float(os.environ.get("SIMULATEUR_CACHE_MO", 256))
+EVICTION_TOUS = 200  # rescan complet au plus toutes les N écritures (autres processus)
+
+_MANQUANT = object()
+_ESTIME = {}  # cache_dir → {"octets": taille estimée, "ecritures": depuis le dernier scan}
+
+
+@functools.lru_cache(maxsize=None)
+def empreinte_fichier(path):
+    """SHA-256 du contenu d'un fichier source"""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def empreinte_tarifs():
+    """Empreinte des données tarifaires: change dès que tarifs_data.py est modifié"""
+    import tarifs_data
+    return empreinte_fichier(tarifs_data.__file__)
+
+
+def _canon(obj):
+    """Forme JSON canonique des entrées (dicts triés, tuples → listes, objets → repr)"""
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False, default=repr)
+
+
+def cle(namespace, *parts):
+    """Clé de cache adressée par contenu"""
+    h = hashlib.sha256()
+    for p in (namespace, empreinte_tarifs()) + parts:
+        h.update(_canon(p).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _path(k, cache_dir):
+    return os.path.join(cache_dir, k[:2], k + ".pkl")
+
+
+def lire(k, defaut=None, cache_dir=CACHE_DIR):
+    """Lit une valeur; marque l'entrée comme récemment utilisée"""
+    path = _path(k, cache_dir)
+    try:
+        with open(path, "rb") as f:
+            val = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return defaut
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return val
+
+
+def ecrire(k, val, cache_dir=CACHE_DIR, taille_max_mo=TAILLE_MAX_MO):
+    """Écrit une valeur (atomiquement) puis applique l'éviction LRU → False si l'écriture a échoué
+
+    Fichier temporaire propre à chaque écriture (mkstemp): plusieurs threads ou processus peuvent écrire
+    la même clé; un échec (disque, course perdue) laisse simplement l'entrée absente du cache.
+    """
+    path = _path(k, cache_dir)
+    tmp = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(val, f, protocol=pickle.HIGHEST_PROTOCOL)
+            taille = f.tell()
+        os.replace(tmp, path)
+    except OSError:
+        if tmp is not None:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+        return False
+    _compter(cache_dir, taille_max_mo, taille)
+    return True
+
+
+def _compter(cache_dir, taille_max_mo, taille):
+    """Cumule la taille écrite; n'évince (scan du répertoire) que si l'estimation dépasse la limite"""
+    est = _ESTIME.get(cache_dir)
+    if est is None or est["ecritures"] >= EVICTION_TOUS:
+        est = _ESTIME[cache_dir] = {"octets": evincer(cache_dir, taille_max_mo), "ecritures": 0}
+        return
+    est["octets"] += taille
+    est["ecritures"] += 1
+    if est["octets"] > taille_max_mo * 1024 * 1024:
+        est["octets"], est["ecritures"] = evincer(cache_dir, taille_max_mo), 0
+
+
+def evincer(cache_dir=CACHE_DIR, taille_max_mo=TAILLE_MAX_MO):
+    """Supprime les entrées les moins récemment utilisées jusqu'à 90% de la taille max → taille restante"""
+    entrees = []
+    total = 0
+    for racine, _, fichiers in os.walk(cache_dir):
+        for nom in fichiers:
+            if not nom.endswith(".pkl"):
+                continue
+            p = os.path.join(racine, nom)
+            try:
+                st = os.stat(p)
+            except FileNotFoundError:
+                continue  # évincé par un autre processus
+            entrees.append((st.st_mtime, st.st_size, p))
+            total += st.st_size
+    limite = taille_max_mo * 1024 * 1024
+    if total <= limite:
+        return total
+    for _, taille, p in sorted(entrees):
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            pass
+        total -= taille
+        if total <= 0.9 * limite:
+            break
+    return max(total, 0)
+
+
+def vider(cache_dir=CACHE_DIR):
+    """Vide entièrement le cache"""
+    evincer(cache_dir, 0)
+    _ESTIME.pop(cache_dir, None)
+
+
+def en_cache(namespace):
+    """Décorateur: mémoïse une fonction pure sur disque (arguments sérialisables en JSON)"""
+    def deco(fn):
+        module = sys.modules.get(fn.__module__)
+        source = empreinte_fichier(inspect.getsourcefile(module)) if module else ""
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            k = cle(namespace, fn.__qualname__, source, args, kwargs)
+            val = lire(k, _MANQUANT)
+            if val is _MANQUANT:
+                val = fn(*args, **kwargs)
+                ecrire(k, val)
+            return val
+        wrapper.sans_cache = fn
+        return wrapper
+    return deco
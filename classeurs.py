@@ -0,0 +1,203 @@
+"""
+classeurs.py — Import / export XLSX des flottes de navires et des jeux de scénarios de projection
+
+Les classeurs sont lus ligne à ligne (openpyxl read_only) et écrits en flux (write_only):
+une flotte de 100 000 navires se charge et s'enregistre sans monter le classeur en mémoire.
+
+Classeur flotte, feuille "flotte" (une ligne par navire / escale type):
+    navire, loa, beam, draft, gt [+ paramètres de ESCALE_DEFAUT: sejour_h, nb_rem, evp, op_ctn, ...]
+    (type, vg optionnels: dimensions / GT manquants estimés par type, voir estimation.py)
+    → tarifée en une passe par flotte.tarifer_flotte (coût par poste et par port)
+Classeur scénarios:
+    feuille "scenarios" : nom + paramètres de SCENARIO_DEFAUT / TARIFS_PROJ_DEFAUT (vide = défaut)
+    feuille "escales"   : nom + une colonne par catégorie ESC_CATS (escales de l'année cible)
+    feuille "navires"   : nom, type (PROJ_NAVIRES) + gt, nb_rem, sejour_h, loa, beam, draft
+                          (nom vide = surcharge commune à tous les scénarios)
+
+Usage en ligne de commande:
+    python classeurs.py flotte.xlsx --sortie flotte_tarifee.xlsx
+    python classeurs.py --modele-flotte modele_flotte.xlsx --modele-scenarios modele_scenarios.xlsx
+"""
+import argparse
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from cout_escale import PORTS, ESCALE_DEFAUT
+from flotte import COLONNES_FLOTTE, tarifer_flotte
+from projections import ESC_CATS, TARIFS_PROJ_DEFAUT, get_nav
+from scenarios import SCENARIO_DEFAUT
+from tarifs_data import PROJ_NAVIRES
+
+COLONNES_SCENARIO = ["nom"] + list(SCENARIO_DEFAUT) + list(TARIFS_PROJ_DEFAUT)
+COLONNES_NAVIRE = ["gt", "nb_rem", "sejour_h", "loa", "beam", "draft"]
+COLONNES_ESTIMATION = ["type", "vg"]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LECTURE / ÉCRITURE EN FLUX
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def lignes_feuille(wb, feuille):
+    """Lignes d'une feuille d'un classeur ouvert en dicts {en-tête: valeur} (cellules vides omises)"""
+    if feuille not in wb.sheetnames:
+        return
+    rows = wb[feuille].iter_rows(values_only=True)
+    entetes = [str(h).strip() if h is not None else None for h in next(rows, ())]
+    for row in rows:
+        if any(v is not None for v in row):
+            yield {h: v for h, v in zip(entetes, row) if h is not None and v is not None}
+
+
+def ouvrir(source):
+    """Classeur en lecture seule (valeurs calculées, pas de formules)"""
+    return load_workbook(source, read_only=True, data_only=True)
+
+
+def ecrire_classeur(feuilles, dest):
+    """{nom de feuille: (en-têtes, lignes itérables)} → classeur XLSX écrit en flux (write_only)"""
+    wb = Workbook(write_only=True)
+    for nom, (entetes, lignes) in feuilles.items():
+        ws = wb.create_sheet(nom)
+        ws.append(list(entetes))
+        for row in lignes:
+            ws.append([None if pd.isna(v) else v for v in row])
+    wb.save(dest)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# FLOTTES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _escale(row, n):
+    """Ligne de la feuille flotte → (nom du navire, paramètres d'escale)"""
+    inconnus = set(row) - set(COLONNES_FLOTTE + COLONNES_ESTIMATION)
+    if inconnus:
+        raise ValueError(f"Ligne {n}: colonnes inconnues {sorted(inconnus)} "
+                         f"(attendu: {', '.join(COLONNES_FLOTTE + COLONNES_ESTIMATION)})")
+    if not {"loa", "beam", "draft", "gt", "vg"} & set(row):
+        raise ValueError(f"Ligne {n}: ni dimensions, ni GT, ni VG")
+    e = {k: v for k, v in row.items() if k != "navire"}
+    if "alg_regulier" in e:
+        e["alg_regulier"] = str(e["alg_regulier"]).strip().lower() not in ("0", "false", "faux", "non")
+    return str(row.get("navire", f"Navire {n}")), e
+
+
+def lire_flotte(source, feuille="flotte"):
+    """Classeur flotte → DataFrame de paramètres (navire + colonnes renseignées; vide = défaut)"""
+    wb = ouvrir(source)
+    try:
+        rows = []
+        for n, r in enumerate(lignes_feuille(wb, feuille), 2):
+            nom, e = _escale(r, n)
+            rows.append({"navire": nom, **e})
+    finally:
+        wb.close()
+    df = pd.DataFrame(rows)
+    return df[[c for c in COLONNES_FLOTTE + COLONNES_ESTIMATION if c in df]]
+
+
+def tarifer_classeur(source, feuille="flotte"):
+    """Classeur flotte → flotte tarifée (paramètres + coûts par port et par poste)"""
+    return tarifer_flotte(lire_flotte(source, feuille))
+
+
+def ecrire_flotte(df, dest, feuille="flotte"):
+    """DataFrame (flotte ou flotte tarifée) → classeur XLSX"""
+    ecrire_classeur({feuille: (df.columns, df.itertuples(index=False, name=None))}, dest)
+
+
+def modele_flotte(dest):
+    """Classeur flotte modèle: en-têtes complets et un navire aux valeurs par défaut de l'interface"""
+    ecrire_classeur({"flotte": (COLONNES_FLOTTE, [["Navire 1", 190.94, 32.2, 6.5, 22341] + list(ESCALE_DEFAUT.values())])},
+                    dest)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SCÉNARIOS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _surcharge_navire(r):
+    ntype = str(r.get("type", ""))
+    if ntype not in PROJ_NAVIRES:
+        raise ValueError(f"Type de navire inconnu: {ntype!r} (attendu: {', '.join(PROJ_NAVIRES)})")
+    return ntype, {k: r[k] for k in COLONNES_NAVIRE if k in r}
+
+
+def lire_navires(source, feuille="navires"):
+    """Surcharges navires communes (lignes sans nom) → {type: paramètres complets} pour calc_projection"""
+    wb = ouvrir(source)
+    try:
+        navs = dict(_surcharge_navire(r) for r in lignes_feuille(wb, feuille) if not r.get("nom"))
+    finally:
+        wb.close()
+    return {t: {**get_nav(t), **ov} for t, ov in navs.items()}
+
+
+def lire_scenarios(source):
+    """Classeur scénarios → liste de scénarios (dicts au format de scenarios.run_scenarios)"""
+    wb = ouvrir(source)
+    try:
+        scenarios = {}
+        for r in lignes_feuille(wb, "scenarios"):
+            nom = str(r.get("nom") or f"Scénario {len(scenarios) + 1}")
+            scenarios[nom] = {"nom": nom, **{k: v for k, v in r.items() if k != "nom"}}
+        for r in lignes_feuille(wb, "escales"):
+            nom = str(r.get("nom"))
+            if nom not in scenarios:
+                raise ValueError(f"Feuille escales: scénario inconnu {nom!r}")
+            scenarios[nom]["escales"] = {k: v for k, v in r.items() if k != "nom"}
+        communs = {}
+        for r in lignes_feuille(wb, "navires"):
+            ntype, ov = _surcharge_navire(r)
+            nom = r.get("nom")
+            if not nom:
+                communs[ntype] = ov
+            elif str(nom) not in scenarios:
+                raise ValueError(f"Feuille navires: scénario inconnu {nom!r}")
+            else:
+                scenarios[str(nom)].setdefault("navires", {})[ntype] = ov
+    finally:
+        wb.close()
+    out = list(scenarios.values())
+    if communs:
+        for sc in out:
+            sc["navires"] = {**communs, **sc.get("navires", {})}
+    return out
+
+
+def ecrire_scenarios(scenarios, dest, navires=None):
+    """Scénarios (dicts) → classeur scénarios / escales / navires; navires = surcharges communes {type: params}"""
+    sc = [{"nom": s.get("nom") or f"Scénario {i + 1}", **s} for i, s in enumerate(scenarios)]
+    esc = [[s["nom"]] + [s["escales"].get(c) for c in ESC_CATS] for s in sc if s.get("escales")]
+    navs = [[None, t] + [ov.get(k) for k in COLONNES_NAVIRE] for t, ov in (navires or {}).items()]
+    navs += [[s["nom"], t] + [ov.get(k) for k in COLONNES_NAVIRE] for s in sc for t, ov in (s.get("navires") or {}).items()]
+    ecrire_classeur({
+        "scenarios": (COLONNES_SCENARIO, ([s.get(k) for k in COLONNES_SCENARIO] for s in sc)),
+        "escales": (["nom"] + ESC_CATS, esc),
+        "navires": (["nom", "type"] + COLONNES_NAVIRE, navs),
+    }, dest)
+
+
+def modele_scenarios(dest):
+    """Classeur scénarios modèle: scénario par défaut et paramètres Annexe 7 des navires"""
+    ecrire_scenarios([{"nom": "Annexe 7", **SCENARIO_DEFAUT, **TARIFS_PROJ_DEFAUT}], dest,
+                     navires={t: get_nav(t) for t in PROJ_NAVIRES})
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Tarification en lot d'une flotte XLSX / classeurs modèles")
+    p.add_argument("flotte", nargs="?")
+    p.add_argument("--sortie", help="classeur XLSX de la flotte tarifée (sinon récapitulatif seul)")
+    p.add_argument("--modele-flotte")
+    p.add_argument("--modele-scenarios")
+    args = p.parse_args()
+    if args.modele_flotte:
+        modele_flotte(args.modele_flotte)
+    if args.modele_scenarios:
+        modele_scenarios(args.modele_scenarios)
+    if args.flotte:
+        res = tarifer_classeur(args.flotte)
+        print(res[["vg"] + PORTS].describe().to_string())
+        if args.sortie:
+            ecrire_flotte(res, args.sortie)
@@ -0,0 +1,236 @@
+"""
+cout_escale.py — Assemblage du coût total d'une escale (TM / NWM / Algeciras)
+Indépendant de Streamlit: utilisé par l'onglet Coût Total et par le service HTTP (api.py).
+
+calc_cout_flotte() calcule les mêmes postes pour toute une flotte en une passe numpy
+(barèmes par tranches compilés en tableaux, paramètres texte en codes catégoriels):
+calc_cout_escale_lot() et l'onglet Flotte s'appuient dessus. Il accepte une autre version des
+structures tarifaires (STRUCTURES_TARIFS, voir revision_tarifs.py), par défaut celles de tarifs_data.
+"""
+import numpy as np
+import pandas as pd
+
+import tarifs_data
+from tarifs_data import (
+    DROITS_PORT_NAVIRES_TM, DROITS_PORT_NAVIRES_NWM, PILOTAGE_TM, REMORQUAGE_TM, REMORQUAGE_TM_SUP,
+    REMORQUAGE_NWM, REMORQUAGE_NWM_SUP, LAMANAGE_TM, CONTENEURS_TM, CONTENEURS_NWM,
+    ALG_T1_COEF_UTILISATION, ALG_T1_REDUCTION_FREQUENCE, ALG_T3_SIMPLIFIE, ALG_T3_BONIF_CTN, ALG_T0_TOTAL_GT,
+    calc_vg, calc_stationnement, calc_pilotage_tm, calc_pilotage_nwm_entree_sortie, calc_remorquage,
+    calc_lamanage_nwm, calc_alg_t1, calc_alg_pilotage, calc_alg_dechets,
+)
+from navires import ESCALE_DEFAUT, CHOIX, LotEscales  # ESCALE_DEFAUT: paramètres d'escale par défaut de l'interface
+
+PORTS = ["TM", "NWM", "Algeciras"]
+POSTES_COUT = ["Taxe Navire / Droits Port", "Pilotage", "Remorquage*", "Lamanage*", "Marchandises CTN", "T0 Aides Nav. / Déchets"]
+# structures de tarifs_data utilisées par calc_cout_flotte (paramètres d'une version tarifaire)
+STRUCTURES_TARIFS = [
+    "DROITS_PORT_NAVIRES_TM", "DROITS_PORT_NAVIRES_NWM", "PILOTAGE_TM", "PILOTAGE_NWM", "REMORQUAGE_TM", "REMORQUAGE_TM_SUP",
+    "REMORQUAGE_NWM", "REMORQUAGE_NWM_SUP", "LAMANAGE_TM", "LAMANAGE_NWM", "CONTENEURS_TM", "CONTENEURS_NWM",
+    "ALG_T1_COEF_UTILISATION", "ALG_T1_REDUCTION_FREQUENCE", "ALG_T1_BASE_B", "ALG_T1_MIN_HEURES", "ALG_T1_MAX_HEURES_24H",
+    "ALG_T1_COEF_CORRECTEUR", "ALG_PILOTAGE_TARIFS", "ALG_T0_TOTAL_GT", "ALG_DECHETS_BASE_R1", "ALG_DECHETS_COEF",
+    "ALG_T3_SIMPLIFIE", "ALG_T3_BONIF_CTN",
+]
+
+
+def tarifs_courants():
+    """Version tarifaire en vigueur: {structure: valeur} lue dans tarifs_data"""
+    return {n: getattr(tarifs_data, n) for n in STRUCTURES_TARIFS}
+
+
+def tarif_ctn_alg(op_ctn, t3_simplifie=ALG_T3_SIMPLIFIE, bonif_ctn=ALG_T3_BONIF_CTN):
+    """T3 Algeciras par EVP (CTN ≤20' chargé) avec réduction transbordement ou bonification I/E"""
+    if "Transshipment" in op_ctn or "transbordement" in op_ctn.lower():
+        t3_reduc = 0.30  # transbordement accostés
+        t3_bonif = 1.00
+    else:
+        t3_reduc = 1.00
+        t3_bonif = bonif_ctn  # 0.70 pour CTN I/E
+    return t3_simplifie["CTN ≤20' chargé"]["total"] * t3_reduc * t3_bonif
+
+
+def calc_cout_escale(loa, beam, draft, gt, sejour_h=12.0, nb_rem=2, nb_mvt=2,
+                     terminal_tm="Terminaux à Conteneurs (TC1-TC4)", terminal_nwm="Terminal à Conteneurs",
+                     evp=500, op_ctn="Transbordement", cat_lam_tm="Cat A – Ferry >1 escale/jour",
+                     alg_concession="Quai/Jetée sans concession", alg_freq="53-104 escales/an", alg_regulier=True):
+    """Coût d'escale par poste (POSTES_COUT) pour les 3 ports, avec totaux"""
+    vg = calc_vg(loa, beam, draft)
+
+    # === CALCULS TM ===
+    r_tm = DROITS_PORT_NAVIRES_TM[terminal_tm]
+    v_naut_tm = vg * r_tm["nautique"]
+    v_port_tm = vg * r_tm["port"]
+    v_stat_tm = calc_stationnement(vg, r_tm["stationnement"], sejour_h)
+    v_pil_tm = calc_pilotage_tm(vg, "Entrée") + calc_pilotage_tm(vg, "Sortie")
+    v_rem_tm = calc_remorquage(gt, REMORQUAGE_TM, REMORQUAGE_TM_SUP) * nb_rem * nb_mvt
+    ll = LAMANAGE_TM[cat_lam_tm]
+    v_lam_tm = max(loa * ll["tarif_ml"], ll["min"])
+    v_ctn_tm = CONTENEURS_TM[op_ctn] * evp
+
+    # === CALCULS NWM ===
+    r_nwm = DROITS_PORT_NAVIRES_NWM[terminal_nwm]
+    v_naut_nwm = vg * r_nwm["nautique"]
+    v_port_nwm = vg * r_nwm["port"]
+    v_stat_nwm = calc_stationnement(vg, r_nwm["stationnement"], sejour_h)
+    v_pil_nwm = calc_pilotage_nwm_entree_sortie(gt) * 2
+    v_rem_nwm = calc_remorquage(gt, REMORQUAGE_NWM, REMORQUAGE_NWM_SUP) * nb_rem * nb_mvt
+    v_lam_nwm = calc_lamanage_nwm(gt)
+    v_ctn_nwm = CONTENEURS_NWM[op_ctn] * evp
+
+    # === CALCULS ALGECIRAS ===
+    coef_u = ALG_T1_COEF_UTILISATION[alg_concession]
+    freq_r = ALG_T1_REDUCTION_FREQUENCE[alg_freq]
+    v_t1_alg = calc_alg_t1(gt, sejour_h, coef_util=coef_u, reduc_freq=freq_r, regulier=alg_regulier)
+    v_pil_alg = calc_alg_pilotage(gt, "Entrée") + calc_alg_pilotage(gt, "Sortie")
+    v_rem_alg = 0  # Non publié — service privé
+    v_lam_alg = 0  # Non publié — service privé
+    # 20' = 1 TEU → 1 unité CTN≤20', 40' = 2 TEU → on suppose mix moyen
+    v_ctn_alg = tarif_ctn_alg(op_ctn) * evp if evp > 0 else 0
+    v_t0_alg = ALG_T0_TOTAL_GT * gt  # Aides navigation
+    v_dech_alg = calc_alg_dechets(gt)
+
+    vtm = [v_naut_tm + v_port_tm + v_stat_tm, v_pil_tm, v_rem_tm, v_lam_tm, v_ctn_tm, 0]
+    vnwm = [v_naut_nwm + v_port_nwm + v_stat_nwm, v_pil_nwm, v_rem_nwm, v_lam_nwm, v_ctn_nwm, 0]
+    valg = [v_t1_alg, v_pil_alg, v_rem_alg, v_lam_alg, v_ctn_alg, v_t0_alg + v_dech_alg]
+    return {"postes": POSTES_COUT, "vg": vg, "TM": vtm, "NWM": vnwm, "Algeciras": valg,
+            "totaux": {"TM": sum(vtm), "NWM": sum(vnwm), "Algeciras": sum(valg)}}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# FLOTTE — CALCUL VECTORISÉ
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _bareme(tranches):
+    """[(lo, hi, tarif), ...] → tableaux lo / hi / tarif"""
+    lo, hi, t = zip(*tranches)
+    return np.array(lo, dtype="float64"), np.array(hi, dtype="float64"), np.array(t, dtype="float64")
+
+
+def _tranche(x, bareme, defaut):
+    """Tarif de la tranche lo ≤ x ≤ hi (recherche dichotomique), defaut hors tranches"""
+    lo, hi, t = bareme
+    i = np.searchsorted(lo, x, side="right") - 1
+    j = np.clip(i, 0, None)
+    return np.where((i >= 0) & (x <= hi[j]), t[j], defaut)
+
+
+_PIL_TM = {m: (_bareme(d["tranches"]), _bareme(d["tranches2"])) for m, d in PILOTAGE_TM.items()}
+_REM_TM, _REM_NWM = _bareme(REMORQUAGE_TM), _bareme(REMORQUAGE_NWM)
+
+
+def _pilotage_tm(vg, mouvement, pilotage=None):
+    """calc_pilotage_tm sur un tableau de VG (pilotage: autre version de PILOTAGE_TM)"""
+    d = (pilotage or PILOTAGE_TM)[mouvement]
+    b1, b2 = _PIL_TM[mouvement] if pilotage is None else (_bareme(d["tranches"]), _bareme(d["tranches2"]))
+    t1 = _tranche(vg, b1, b1[2][0])
+    t_mid = b1[2][-1] + d["supplement_10k"] * np.ceil((vg - 110000) / 10000)
+    t2 = _tranche(vg, b2, b2[2][-1])
+    t_sup = b2[2][-1] + d["supplement2_10k"] * np.ceil((vg - 260000) / 10000)
+    return np.where(vg <= 110000, t1, np.where(vg <= 180000, t_mid, np.where(vg > 260000, t_sup, t2)))
+
+
+def _remorquage(gt, bareme, supplement, seuil=50000):
+    """calc_remorquage sur un tableau de GT"""
+    t = _tranche(gt, bareme, np.nan)
+    return np.where(np.isnan(t), np.where(gt > seuil, bareme[2][-1] + supplement * np.ceil((gt - seuil) / 5000),
+                                          bareme[2][0]), t)
+
+
+def _pilotage_nwm(gt, pilotage, mouvement="Entrée/Sortie"):
+    """calc_pilotage_nwm_entree_sortie / calc_pilotage_nwm_chg_quai sur un tableau de GT"""
+    p = pilotage[mouvement]
+    return np.maximum(p["variable"] * gt + p["fixe"], p["min"])
+
+
+def _coef_dechets(gt, coef_dechets):
+    """Coefficient R1 de calc_alg_dechets sur un tableau de GT"""
+    tr = coef_dechets["tranches"]
+    return np.select([gt <= m for m, _, _ in tr], [v * gt + f for _, v, f in tr], coef_dechets["max"])
+
+
+def _stationnement(vg, taux, sejour_h):
+    """calc_stationnement (hors rade) sur des tableaux"""
+    h = sejour_h - 24
+    return np.where(sejour_h <= 24, 0.0, np.where(h <= 8, vg * taux / 3, vg * taux * np.ceil(h / 24)))
+
+
+def _table(d, col, cle=None):
+    """Tarifs alignés sur les codes CHOIX[col] (NaN pour un libellé absent de la version)"""
+    return np.array([(d[k][cle] if cle else d[k]) if k in d else np.nan for k in CHOIX[col]], dtype="float64")
+
+
+def calc_cout_flotte(flotte, tarifs=None):
+    """Flotte (LotEscales, ou DataFrame: loa, beam, draft, gt + paramètres de ESCALE_DEFAUT optionnels) → DataFrame
+    vg, coût "port · poste" pour chaque port × POSTES_COUT et total par port (mêmes règles que calc_cout_escale)
+
+    tarifs: {structure de STRUCTURES_TARIFS: valeur} remplaçant celles de tarifs_data (autre version tarifaire).
+    """
+    t = tarifs_courants() if tarifs is None else {**tarifs_courants(), **tarifs}
+    rem_tm = _REM_TM if t["REMORQUAGE_TM"] is REMORQUAGE_TM else _bareme(t["REMORQUAGE_TM"])
+    rem_nwm = _REM_NWM if t["REMORQUAGE_NWM"] is REMORQUAGE_NWM else _bareme(t["REMORQUAGE_NWM"])
+    pilotage = None if t["PILOTAGE_TM"] is PILOTAGE_TM else t["PILOTAGE_TM"]
+    lot = flotte if isinstance(flotte, LotEscales) else LotEscales.depuis_table(flotte)
+    loa, beam, draft, gt, sej, evp = lot.loa, lot.beam, lot.draft, lot.gt, lot.sejour_h, lot.evp
+    nb_rem, nb_mvt = lot.nb_rem.astype("f8"), lot.nb_mvt.astype("f8")
+    c = {col: getattr(lot, col) for col in CHOIX}
+    regulier = lot.alg_regulier
+    n = len(lot)
+
+    vg = lot.vg
+    dp_tm = {k: _table(t["DROITS_PORT_NAVIRES_TM"], "terminal_tm", k)[c["terminal_tm"]] for k in ("nautique", "port", "stationnement")}
+    dp_nwm = {k: _table(t["DROITS_PORT_NAVIRES_NWM"], "terminal_nwm", k)[c["terminal_nwm"]]
+              for k in ("nautique", "port", "stationnement")}
+    lam = {k: _table(t["LAMANAGE_TM"], "cat_lam_tm", k)[c["cat_lam_tm"]] for k in ("tarif_ml", "min")}
+
+    # === TM ===
+    tm = [vg * dp_tm["nautique"] + vg * dp_tm["port"] + _stationnement(vg, dp_tm["stationnement"], sej),
+          _pilotage_tm(vg, "Entrée", pilotage) + _pilotage_tm(vg, "Sortie", pilotage),
+          _remorquage(gt, rem_tm, t["REMORQUAGE_TM_SUP"]) * nb_rem * nb_mvt,
+          np.maximum(loa * lam["tarif_ml"], lam["min"]),
+          _table(t["CONTENEURS_TM"], "op_ctn")[c["op_ctn"]] * evp,
+          np.zeros(n)]
+
+    # === NWM ===
+    nwm = [vg * dp_nwm["nautique"] + vg * dp_nwm["port"] + _stationnement(vg, dp_nwm["stationnement"], sej),
+           _pilotage_nwm(gt, t["PILOTAGE_NWM"]) * 2,
+           _remorquage(gt, rem_nwm, t["REMORQUAGE_NWM_SUP"]) * nb_rem * nb_mvt,
+           t["LAMANAGE_NWM"]["variable"] * gt + t["LAMANAGE_NWM"]["fixe"],
+           _table(t["CONTENEURS_NWM"], "op_ctn")[c["op_ctn"]] * evp,
+           np.zeros(n)]
+
+    # === ALGECIRAS ===
+    h = np.maximum(sej, t["ALG_T1_MIN_HEURES"])
+    h = np.where(h > t["ALG_T1_MAX_HEURES_24H"], np.minimum(h, t["ALG_T1_MAX_HEURES_24H"] * np.ceil(sej / 24)), h)
+    freq = _table(t["ALG_T1_REDUCTION_FREQUENCE"], "alg_freq")[c["alg_freq"]]
+    freq = np.where(regulier, np.maximum(freq - 0.05, 0.10), freq)
+    t1 = ((gt / 100) * h * t["ALG_T1_BASE_B"] * t["ALG_T1_COEF_CORRECTEUR"]
+          * _table(t["ALG_T1_COEF_UTILISATION"], "alg_concession")[c["alg_concession"]] * freq)
+    pil = {m: t["ALG_PILOTAGE_TARIFS"]["T+2"][m] for m in ("Entrée", "Sortie")}
+    coef_dech = _coef_dechets(gt, t["ALG_DECHETS_COEF"])
+    ctn_alg = np.array([tarif_ctn_alg(op, t["ALG_T3_SIMPLIFIE"], t["ALG_T3_BONIF_CTN"]) for op in CHOIX["op_ctn"]])[c["op_ctn"]]
+    alg = [t1,
+           (pil["Entrée"]["fixe"] + pil["Entrée"]["variable"] * gt) + (pil["Sortie"]["fixe"] + pil["Sortie"]["variable"] * gt),
+           np.zeros(n), np.zeros(n),
+           np.where(evp > 0, ctn_alg * evp, 0.0),
+           t["ALG_T0_TOTAL_GT"] * gt + t["ALG_DECHETS_BASE_R1"] * coef_dech]
+
+    out = {"vg": vg}
+    for port, postes in zip(PORTS, (tm, nwm, alg)):
+        total = np.zeros(n)
+        for p, v in zip(POSTES_COUT, postes):
+            out[f"{port} · {p}"] = v
+            total = total + v
+        out[port] = total
+    return pd.DataFrame(out, index=flotte.index if isinstance(flotte, pd.DataFrame) else None)
+
+
+def calc_cout_escale_lot(escales):
+    """Coût d'escale pour un LotEscales ou une liste d'Escale / de dicts (ESCALE_DEFAUT pour les clés absentes)"""
+    lot = escales if isinstance(escales, LotEscales) else LotEscales.depuis_escales(escales)
+    if not len(lot):
+        return []
+    res = calc_cout_flotte(lot)
+    lignes = {port: res[[f"{port} · {p}" for p in POSTES_COUT]].to_numpy().tolist() for port in PORTS}
+    totaux = res[PORTS].to_numpy().tolist()
+    return [{"postes": POSTES_COUT, "vg": v, "TM": tm, "NWM": nwm, "Algeciras": alg,
+             "totaux": dict(zip(PORTS, tot))}
+            for v, tm, nwm, alg, tot in zip(res["vg"].tolist(), lignes["TM"], lignes["NWM"], lignes["Algeciras"], totaux)]
@@ -0,0 +1,154 @@
+"""
+estimation.py — Estimation GT ↔ VG et dimensions des navires incomplets, par type de navire
+
+TM tarife sur le VG (loa × beam × max(draft, 0,14·√(loa·beam))), NWM et Algeciras sur le GT: les relevés
+d'escales n'ont souvent que l'un des deux. L'index par type est précompilé à partir des navires de
+référence (PROJ_NAVIRES) et de flottes de référence fournies (type, loa, beam, draft, gt):
+    ratio_gt_vg — GT / VG médian du type
+    loa_beam    — loa / beam médian        draft_beam — draft / beam médian
+Une ligne "*" (toutes références confondues) sert aux types inconnus ou absents.
+À proportions fixes, VG = beam³ × loa_beam × max(draft_beam, 0,14·√loa_beam): les dimensions manquantes
+se déduisent du VG (ou d'une dimension connue) en forme close, vectorisée sur toute la table. Avec un VG
+fourni et des dimensions partielles, les dimensions manquantes sont mises à l'échelle pour reproduire ce VG.
+"""
+import numpy as np
+import pandas as pd
+
+from tarifs_data import PROJ_NAVIRES
+
+TOUS_TYPES = "*"
+DIMENSIONS = ["loa", "beam", "draft"]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# INDEX PAR TYPE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _vg(loa, beam, draft):
+    return loa * beam * np.maximum(draft, 0.14 * np.sqrt(loa * beam))
+
+
+def compiler_index(reference=None):
+    """Index {types, ratio_gt_vg, loa_beam, draft_beam, navires} (tableaux alignés, "*" en dernier)
+
+    reference: DataFrame (type, loa, beam, draft, gt) complétant les navires de PROJ_NAVIRES.
+    """
+    ref = pd.DataFrame([{"type": t, "loa": d["loa"], "beam": d["beam"], "draft": d["draft"], "gt": d["gt_est"]}
+                        for t, d in PROJ_NAVIRES.items()])
+    if reference is not None and len(reference):
+        manquantes = {"type", "loa", "beam", "draft", "gt"} - set(reference)
+        if manquantes:
+            raise ValueError(f"Flotte de référence: colonnes manquantes {sorted(manquantes)}")
+        ref = pd.concat([ref, reference[["type", "loa", "beam", "draft", "gt"]].dropna()], ignore_index=True)
+    ref = ref.assign(type=ref["type"].astype(str), ratio_gt_vg=ref["gt"] / _vg(ref["loa"], ref["beam"], ref["draft"]),
+                     loa_beam=ref["loa"] / ref["beam"], draft_beam=ref["draft"] / ref["beam"])
+    cols = ["ratio_gt_vg", "loa_beam", "draft_beam"]
+    g = ref.groupby("type", sort=False)
+    par_type = g[cols].median().assign(navires=g.size())
+    tous = ref[cols].median().to_frame(TOUS_TYPES).T.assign(navires=len(ref))
+    idx = pd.concat([par_type, tous])
+    return {"types": list(idx.index), **{c: idx[c].to_numpy(dtype="float64") for c in cols + ["navires"]}}
+
+
+INDEX_NAVIRES = compiler_index()
+
+
+def table_index(index=INDEX_NAVIRES):
+    """Index → DataFrame (une ligne par type)"""
+    return pd.DataFrame({"type": index["types"], **{c: index[c] for c in ("ratio_gt_vg", "loa_beam", "draft_beam", "navires")}})
+
+
+def proportions_type(ntype, index=INDEX_NAVIRES):
+    """{ratio_gt_vg, loa_beam, draft_beam} de référence d'un type de navire ("*" si inconnu)"""
+    i = index["types"].index(ntype) if ntype in index["types"] else -1
+    return {c: float(index[c][i]) for c in ("ratio_gt_vg", "loa_beam", "draft_beam")}
+
+
+def proportions_navire(loa, beam, draft, gt):
+    """Proportions d'un navire donné (même format que proportions_type)"""
+    return {"ratio_gt_vg": gt / _vg(loa, beam, draft), "loa_beam": loa / beam, "draft_beam": draft / beam}
+
+
+def ratio_gt_vg_type(ntype, index=INDEX_NAVIRES):
+    """GT / VG de référence d'un type de navire ("*" si inconnu)"""
+    return proportions_type(ntype, index)["ratio_gt_vg"]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# COMPLÉTION EN LOT
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _colonne(df, c):
+    return pd.to_numeric(df[c], errors="coerce").to_numpy(dtype="float64") if c in df else np.full(len(df), np.nan)
+
+
+def _echelle_vg(vg, loa, beam, draft, lb, db):
+    """Échelle s (beam équivalent) des dimensions manquantes (loa = lb·s, beam = s, draft = db·s) reproduisant le VG
+
+    VG = max(a1·s^p1, a2·s^p2) (deux branches de max(draft, 0,14·√(loa·beam)), lois de puissance croissantes):
+    s = plus petite racine des branches non constantes; NaN si les dimensions connues dépassent déjà le VG.
+    """
+    kl, kb, kd = ~np.isnan(loa), ~np.isnan(beam), ~np.isnan(draft)
+    cl, cb, cd = np.where(kl, loa, lb), np.where(kb, beam, 1.0), np.where(kd, draft, db)
+    pl, pb, pd_ = (~kl).astype("float64"), (~kb).astype("float64"), (~kd).astype("float64")
+    branches = ((cl * cb * cd, pl + pb + pd_), (0.14 * (cl * cb) ** 1.5, 1.5 * (pl + pb)))
+    s = np.full(len(vg), np.inf)
+    possible = np.ones(len(vg), dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for a, p in branches:
+            s = np.where(p > 0, np.minimum(s, (vg / a) ** (1 / p)), s)
+            possible &= (p > 0) | (a <= vg * (1 + 1e-9))
+    return np.where(possible & np.isfinite(s), s, np.nan)
+
+
+def completer(df, index=INDEX_NAVIRES):
+    """Complète loa, beam, draft, gt et vg manquants (colonnes absentes ou NaN) d'après le type de chaque ligne
+
+    Ordre de priorité: VG des dimensions complètes, sinon du GT (ratio du type); VG fourni et dimensions
+    partielles: dimensions manquantes à l'échelle du VG (_echelle_vg); sinon beam depuis beam, loa, draft
+    ou VG (proportions du type), puis loa et draft manquants depuis beam; enfin VG des dimensions
+    estimées et GT manquant depuis le VG. Un VG fourni reste la valeur de la colonne vg; les dimensions
+    estimées (entièrement ou en partie) le reproduisent exactement.
+    Ajoute gt_estime et dim_estimees (booléens). ValueError si une ligne n'a ni dimension, ni GT, ni VG,
+    ou si ses dimensions connues donnent déjà un VG supérieur au VG fourni.
+    """
+    out = df.reset_index(drop=True).copy()
+    t = pd.Categorical(out["type"].astype(str) if "type" in out else np.full(len(out), TOUS_TYPES),
+                       categories=index["types"]).codes
+    t = np.where(t < 0, len(index["types"]) - 1, t)
+    ratio, lb, db = index["ratio_gt_vg"][t], index["loa_beam"][t], index["draft_beam"][t]
+    loa, beam, draft, gt, vg = (_colonne(out, c) for c in ("loa", "beam", "draft", "gt", "vg"))
+
+    dims_ok = ~(np.isnan(loa) | np.isnan(beam) | np.isnan(draft))
+    partiel = ~dims_ok & ~np.isnan(vg) & ~(np.isnan(loa) & np.isnan(beam) & np.isnan(draft))
+    if partiel.any():
+        s = np.where(partiel, _echelle_vg(vg, loa, beam, draft, lb, db), np.nan)
+        if np.isnan(s[partiel]).any():
+            lignes = np.flatnonzero(partiel & np.isnan(s))
+            raise ValueError(f"VG inférieur au volume des dimensions connues (lignes {lignes[:10].tolist()})")
+        loa = np.where(partiel & np.isnan(loa), lb * s, loa)
+        beam = np.where(partiel & np.isnan(beam), s, beam)
+        draft = np.where(partiel & np.isnan(draft), db * s, draft)
+    vg = np.where(np.isnan(vg) & dims_ok, _vg(loa, beam, draft), vg)
+    vg = np.where(np.isnan(vg), gt / ratio, vg)
+
+    b = beam.copy()
+    for source in (loa / lb, draft / db, np.cbrt(vg / (lb * np.maximum(db, 0.14 * np.sqrt(lb))))):
+        b = np.where(np.isnan(b), source, b)
+    if np.isnan(b).any():
+        raise ValueError(f"Navires sans dimension, GT ni VG (lignes {np.flatnonzero(np.isnan(b))[:10].tolist()})")
+    loa = np.where(np.isnan(loa), lb * b, loa)
+    draft = np.where(np.isnan(draft), db * b, draft)
+    vg = np.where(np.isnan(vg), _vg(loa, b, draft), vg)
+    gt_estime = np.isnan(gt)
+    gt = np.where(gt_estime, ratio * vg, gt)
+    for c, v in (("loa", loa), ("beam", b), ("draft", draft), ("gt", gt), ("vg", vg)):
+        out[c] = v
+    out["gt_estime"] = gt_estime
+    out["dim_estimees"] = ~dims_ok
+    return out
+
+
+def incomplet(df):
+    """Vrai si loa, beam, draft ou gt manque (colonne absente ou valeur vide)"""
+    return any(c not in df or df[c].isna().any() for c in DIMENSIONS + ["gt"])
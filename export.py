@@ -0,0 +1,243 @@
+"""
+export.py — Export colonnaire typé (Parquet, Arrow IPC, CSV en flux) des résultats et barèmes
+
+Les tables sont construites à partir des valeurs numériques (float64 / int64), jamais des chaînes
+formatées de l'interface. Les fichiers Arrow IPC peuvent être relus sans copie (memory-map):
+    pyarrow.ipc.open_file(pyarrow.memory_map("projection_nwm.arrow")).read_all()
+
+Usage en ligne de commande (scénario par défaut):
+    python export.py exports/ --format parquet
+    python export.py exports/ --format arrow --fin 2075 --granularite mensuel   # projection écrite en flux
+"""
+import argparse
+import csv
+import io
+import os
+import zipfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from tarifs_data import (
+    PILOTAGE_TM, REMORQUAGE_TM, REMORQUAGE_TM_SUP, REMORQUAGE_NWM, REMORQUAGE_NWM_SUP,
+    DROITS_PORT_NAVIRES_TM, DROITS_PORT_NAVIRES_NWM, LAMANAGE_TM, CONTENEURS_TM, CONTENEURS_NWM,
+    MANUTENTION_CTN_TM, STOCKAGE_CTN_TM, MARCHANDISES_DIV_TM, MARCHANDISES_DIV_NWM, HYDROCARBURES_NWM,
+    ALG_PILOTAGE_TARIFS, ALG_T3_SIMPLIFIE, ALG_T6_COEF,
+)
+from projections import REV_KEYS
+
+FORMATS = ("parquet", "arrow", "csv")
+COLONNES_PROJECTION = ["year", "escales"] + REV_KEYS + ["navire_total", "cargo_total", "total"]
+COLONNES_PERIODE = ["port", "periode"] + COLONNES_PROJECTION
+SCHEMA_PERIODE = pa.schema([("port", pa.string()), ("periode", pa.string()), ("year", pa.int64())]
+                           + [(c, pa.float64()) for c in COLONNES_PROJECTION[1:]])
+TAILLE_LOT_PERIODES = 1200
+COLONNES_TEXTE = {"mouvement", "bloc", "port", "terminal", "categorie", "operation", "type", "marchandise",
+                  "produit", "tranche", "equipement", "periode"}
+COLONNES_ENTIERES = {"vg_min", "vg_max", "gt_min", "gt_max", "franchise_j"}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TABLES TYPÉES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def table_projection(results):
+    """Résultats annuels d'un port (liste de dicts) → DataFrame typé (€)"""
+    df = pd.DataFrame(results, columns=COLONNES_PROJECTION)
+    return df.astype({c: "float64" for c in COLONNES_PROJECTION[1:]}).astype({"year": "int64"})
+
+
+def table_recap(cout):
+    """Récapitulatif coût d'escale (sortie de calc_cout_escale) → DataFrame typé avec ligne TOTAL"""
+    df = pd.DataFrame({"poste": list(cout["postes"]) + ["TOTAL"]})
+    for port in ("TM", "NWM", "Algeciras"):
+        df[port] = pd.Series(list(cout[port]) + [cout["totaux"][port]], dtype="float64")
+    tm = df["TM"].where(df["TM"] > 0)
+    df["ecart_nwm_vs_tm"] = df["NWM"] / tm - 1
+    df["ecart_alg_vs_tm"] = df["Algeciras"] / tm - 1
+    return df
+
+
+def tables_baremes():
+    """Barèmes tarifaires en format long, une table par structure de tarifs_data"""
+    pil = []
+    for mvt, d in PILOTAGE_TM.items():
+        for bloc, sup in (("tranches", "supplement_10k"), ("tranches2", "supplement2_10k")):
+            for lo, hi, t in d.get(bloc, []):
+                pil.append({"mouvement": mvt, "bloc": bloc, "vg_min": lo, "vg_max": hi, "tarif": t,
+                            "supplement_10k": d.get(sup)})
+    rem = [{"port": port, "gt_min": lo, "gt_max": hi, "tarif": t, "supplement_5k": sup}
+           for port, bareme, sup in (("TM", REMORQUAGE_TM, REMORQUAGE_TM_SUP), ("NWM", REMORQUAGE_NWM, REMORQUAGE_NWM_SUP))
+           for lo, hi, t in bareme]
+    droits = [{"port": port, "terminal": term, "nautique": r["nautique"], "droit_port": r["port"],
+               "stationnement": r["stationnement"]}
+              for port, d in (("TM", DROITS_PORT_NAVIRES_TM), ("NWM", DROITS_PORT_NAVIRES_NWM)) for term, r in d.items()]
+    md = sorted(set(MARCHANDISES_DIV_TM) | set(MARCHANDISES_DIV_NWM))
+    tables = {
+        "pilotage_tm": pd.DataFrame(pil),
+        "remorquage": pd.DataFrame(rem),
+        "droits_port_navires": pd.DataFrame(droits),
+        "lamanage_tm": pd.DataFrame([{"categorie": k, **v} for k, v in LAMANAGE_TM.items()]),
+        "conteneurs": pd.DataFrame({"operation": list(CONTENEURS_TM),
+                                    "TM": [CONTENEURS_TM[k] for k in CONTENEURS_TM],
+                                    "NWM": [CONTENEURS_NWM.get(k) for k in CONTENEURS_TM]}),
+        "manutention_ctn_tm": pd.DataFrame([{"terminal": k, **v} for k, v in MANUTENTION_CTN_TM.items()]),
+        "stockage_ctn_tm": pd.DataFrame([{"terminal": tc, "type": ty, "franchise_j": v["franchise"],
+                                          "j3_7": v["j3_7"], "j8_plus": v["j8+"]}
+                                         for tc, types in STOCKAGE_CTN_TM.items() for ty, v in types.items()]),
+        "marchandises_div": pd.DataFrame({"marchandise": md,
+                                          "TM": [MARCHANDISES_DIV_TM.get(k) for k in md],
+                                          "NWM": [MARCHANDISES_DIV_NWM.get(k) for k in md]}),
+        "hydrocarbures_nwm": pd.DataFrame([{"produit": p, "operation": o, "tarif": t}
+                                           for p, ops in HYDROCARBURES_NWM.items() for o, t in ops.items()]),
+        "alg_pilotage": pd.DataFrame([{"tranche": tr, "mouvement": m, "fixe": v["fixe"], "variable": v["variable"]}
+                                      for tr, mouvs in ALG_PILOTAGE_TARIFS.items() for m, v in mouvs.items()]),
+        "alg_t3_simplifie": pd.DataFrame([{"equipement": k, **v} for k, v in ALG_T3_SIMPLIFIE.items()]),
+        "alg_t6": pd.DataFrame([{"periode": k, **v} for k, v in ALG_T6_COEF.items()]),
+    }
+    # Libellés en texte, bornes de tranches en int64, montants en float64 (les None deviennent NaN)
+    for df in tables.values():
+        for c in df.columns:
+            if c in COLONNES_ENTIERES:
+                df[c] = df[c].astype("int64")
+            elif c not in COLONNES_TEXTE:
+                df[c] = df[c].astype("float64")
+    return tables
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ÉCRITURE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def csv_flux(df, taille_bloc=10000):
+    """CSV par blocs d'octets (UTF-8), sans matérialiser le fichier complet"""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(df.columns)
+    for i in range(0, len(df), taille_bloc):
+        writer.writerows(df.iloc[i:i + taille_bloc].itertuples(index=False, name=None))
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def ecrire_table(df, dest, fmt="parquet"):
+    """Écrit une table typée au format demandé (dest = chemin ou fichier binaire ouvert)"""
+    if fmt == "parquet":
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), dest)
+    elif fmt == "arrow":
+        feather.write_feather(df.reset_index(drop=True), dest, compression="uncompressed")  # relisible en memory-map
+    elif fmt == "csv":
+        f = open(dest, "wb") if isinstance(dest, (str, os.PathLike)) else dest
+        try:
+            for bloc in csv_flux(df):
+                f.write(bloc)
+        finally:
+            if f is not dest:
+                f.close()
+    else:
+        raise ValueError(f"Format inconnu: {fmt} (attendu: {', '.join(FORMATS)})")
+
+
+def exporter_projection_flux(periodes, dest, fmt="parquet", taille_lot=TAILLE_LOT_PERIODES):
+    """Projection par période (rev_nwm, rev_tm) d'iter_projection écrite au fil du calcul → lignes écrites
+
+    Une ligne par port et par période (colonnes COLONNES_PERIODE), écrite par lots de taille_lot lignes
+    (row groups Parquet, record batches Arrow IPC, blocs CSV): la mémoire ne dépend pas de l'horizon.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Format inconnu: {fmt} (attendu: {', '.join(FORMATS)})")
+    f = open(dest, "wb") if isinstance(dest, (str, os.PathLike)) else dest
+    try:
+        if fmt == "parquet":
+            w = pq.ParquetWriter(f, SCHEMA_PERIODE)
+        elif fmt == "arrow":
+            w = ipc.new_file(f, SCHEMA_PERIODE)
+        else:
+            w = None
+            f.write((",".join(COLONNES_PERIODE) + "\n").encode("utf-8"))
+
+        def ecrire(lignes):
+            if w is not None:
+                w.write_batch(pa.RecordBatch.from_pylist(lignes, schema=SCHEMA_PERIODE))
+            else:
+                buf = io.StringIO()
+                csv.writer(buf, lineterminator="\n").writerows([l[c] for c in COLONNES_PERIODE] for l in lignes)
+                f.write(buf.getvalue().encode("utf-8"))
+
+        n, lignes = 0, []
+        for rev_nwm, rev_tm in periodes:
+            for port, r in (("NWM", rev_nwm), ("TM", rev_tm)):
+                lignes.append({"port": port, "periode": r.get("periode", str(r["year"])),
+                               **{c: r[c] for c in COLONNES_PROJECTION}})
+            if len(lignes) >= taille_lot:
+                ecrire(lignes)
+                n, lignes = n + len(lignes), []
+        if lignes:
+            ecrire(lignes)
+            n += len(lignes)
+        if w is not None:
+            w.close()
+    finally:
+        if f is not dest:
+            f.close()
+    return n
+
+
+def exporter(tables, dossier, fmt="parquet"):
+    """Écrit chaque table {nom: DataFrame} dans le dossier; renvoie les chemins créés"""
+    os.makedirs(dossier, exist_ok=True)
+    paths = []
+    for nom, df in tables.items():
+        path = os.path.join(dossier, f"{nom}.{fmt}")
+        ecrire_table(df, path, fmt)
+        paths.append(path)
+    return paths
+
+
+def archive_zip(tables, fmt="parquet"):
+    """Archive ZIP en mémoire des tables (téléchargement depuis l'interface)"""
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+        for nom, df in tables.items():
+            with zf.open(f"{nom}.{fmt}", "w") as f:
+                ecrire_table(df, f, fmt)
+    return out.getvalue()
+
+
+def tables_export(results_nwm, results_tm, cout=None):
+    """Jeu complet: projections NWM/TM, récap coût d'escale (optionnel) et barèmes"""
+    tables = {"projection_nwm": table_projection(results_nwm), "projection_tm": table_projection(results_tm)}
+    if cout is not None:
+        tables["recap_cout_escale"] = table_recap(cout)
+    tables.update({f"bareme_{k}": v for k, v in tables_baremes().items()})
+    return tables
+
+
+if __name__ == "__main__":
+    from scenarios import calc_scenario, projection_scenario
+    from cout_escale import ESCALE_DEFAUT, calc_cout_escale
+    from projections import GRANULARITES, iter_projection
+    from tarifs_data import PROJ_YEARS
+
+    p = argparse.ArgumentParser(description="Export colonnaire du scénario par défaut et des barèmes")
+    p.add_argument("dossier")
+    p.add_argument("--format", choices=FORMATS, default="parquet")
+    p.add_argument("--fin", type=int, default=PROJ_YEARS[-1], help="dernière année de la projection par période")
+    p.add_argument("--granularite", choices=list(GRANULARITES), default="annuel")
+    args = p.parse_args()
+    nwm, tm = calc_scenario({})
+    cout = calc_cout_escale(190.94, 32.20, 6.50, 22341, **ESCALE_DEFAUT)
+    for path in exporter(tables_export(nwm, tm, cout), args.dossier, args.format):
+        print(path)
+    if args.fin != PROJ_YEARS[-1] or args.granularite != "annuel":
+        pr = projection_scenario({}, args.fin)
+        path = os.path.join(args.dossier, f"projection_{args.granularite}_{args.fin}.{args.format}")
+        n = exporter_projection_flux(iter_projection(pr["escales"], pr["volumes"], pr["tarifs"], pr["nav_overrides"],
+                                                     granularite=args.granularite), path, args.format)
+        print(f"{path} ({n:,} lignes)")
@@ -0,0 +1,147 @@
+"""
+facture.py — Facture détaillée d'une escale (TM / NWM), ligne par ligne
+
+Une escale est décrite par un seul dict (FACTURE_DEFAUT pour les clés absentes). Toutes les lignes
+applicables sont composées: droits navire ou forfait roulier, pilotage par mouvement avec majorations
+(PEC, retard, désemparé, dépassement), remorquage (sans propulsion, déhalage), lamanage avec
+supplément de durée, droits sur conteneurs (marchandises dangereuses).
+
+Les lignes sont renvoyées dans un tableau numpy structuré (LIGNE_DTYPE):
+    facture  — numéro de facture dans le lot
+    poste    — index dans POSTES_FACTURE
+    quantite, prix_unitaire, coef (majorations cumulées), montant = quantite × prix_unitaire × coef
+factures_lot() traite des dizaines de milliers d'escales par seconde (rapprochement nocturne).
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from tarifs_data import (
+    DROITS_PORT_NAVIRES_TM, DROITS_PORT_NAVIRES_NWM, REMORQUAGE_TM, REMORQUAGE_TM_SUP, REMORQUAGE_NWM,
+    REMORQUAGE_NWM_SUP, LAMANAGE_TM, CONTENEURS_TM, CONTENEURS_NWM, ROULIERS_TM, ROULIERS_TM_NAUTIQUE,
+    ROULIERS_NWM, ROULIERS_NWM_NAUTIQUE,
+    calc_vg, calc_stationnement, calc_pilotage_tm, calc_pilotage_nwm_entree_sortie, calc_pilotage_nwm_chg_quai,
+    calc_remorquage, calc_lamanage_nwm,
+)
+
+POSTES_FACTURE = [
+    "Droit nautique", "Droit de port", "Stationnement",
+    "Forfait roulier", "Supplément roulier (30 min)",
+    "Pilotage Entrée", "Pilotage Sortie", "Pilotage Changement de Quai", "Pilotage Changement de Bassin",
+    "Remorquage", "Lamanage", "Supplément lamanage (durée)", "Conteneurs",
+]
+_P = {p: i for i, p in enumerate(POSTES_FACTURE)}
+
+LIGNE_DTYPE = np.dtype([("facture", "i8"), ("poste", "i2"), ("quantite", "f8"), ("prix_unitaire", "f8"),
+                        ("coef", "f8"), ("montant", "f8")])
+
+FACTURE_DEFAUT = {
+    "port": "TM", "sejour_h": 12.0, "terminal": None, "roulier": None, "duree_roulier_h": 0.0,
+    "mouvements_pilotage": ("Entrée", "Sortie"), "pec": False, "retard": False, "desempare": False,
+    "depassement_duree": False,
+    "nb_rem": 2, "nb_mvt": 2, "sans_propulsion": False, "dehalage": False,
+    "cat_lamanage": "Cat B&C – Autres navires", "duree_lamanage_h": 1.0,
+    "evp": 0, "op_ctn": "Transbordement", "marchandises_dangereuses": False,
+}
+TERMINAL_DEFAUT = {"TM": "Terminaux à Conteneurs (TC1-TC4)", "NWM": "Terminal à Conteneurs"}
+
+
+def _lignes_escale(e, n, out):
+    """Ajoute à out les lignes (tuples LIGNE_DTYPE) de l'escale e, facture n"""
+    port = e["port"]
+    vg = calc_vg(e["loa"], e["beam"], e["draft"])
+    gt = e["gt"]
+    tm = port == "TM"
+    if port not in TERMINAL_DEFAUT:
+        raise ValueError(f"Port non facturable: {port} (attendu: TM, NWM)")
+
+    # Droits navire — forfait roulier + nautique pour les rouliers, sinon nautique + port + stationnement
+    if e["roulier"]:
+        r = (ROULIERS_TM if tm else ROULIERS_NWM)[e["roulier"]]
+        out.append((n, _P["Forfait roulier"], 1.0, r["forfait"], 1.0, r["forfait"]))
+        if e["duree_roulier_h"] > r["duree_h"]:
+            sup30 = math.ceil((e["duree_roulier_h"] - r["duree_h"]) * 2)
+            out.append((n, _P["Supplément roulier (30 min)"], sup30, r["suppl_30min"], 1.0, sup30 * r["suppl_30min"]))
+        taux = ROULIERS_TM_NAUTIQUE if tm else ROULIERS_NWM_NAUTIQUE
+        out.append((n, _P["Droit nautique"], vg, taux, 1.0, vg * taux))
+    else:
+        r = (DROITS_PORT_NAVIRES_TM if tm else DROITS_PORT_NAVIRES_NWM)[e["terminal"] or TERMINAL_DEFAUT[port]]
+        out.append((n, _P["Droit nautique"], vg, r["nautique"], 1.0, vg * r["nautique"]))
+        out.append((n, _P["Droit de port"], vg, r["port"], 1.0, vg * r["port"]))
+        st = calc_stationnement(vg, r["stationnement"], e["sejour_h"])
+        if st > 0:
+            out.append((n, _P["Stationnement"], 1.0, st, 1.0, st))
+
+    # Pilotage — majorations cumulées dans coef (mêmes règles que l'onglet Pilotage)
+    for m in e["mouvements_pilotage"]:
+        if tm:
+            base = calc_pilotage_tm(vg, m)
+            coef = (0.5 if m == "Sortie" else 0.0) if e["pec"] else 1.0
+            if e["retard"]: coef *= 2
+            if e["desempare"]: coef *= 2
+            if e["depassement_duree"]: coef *= 1.5
+        else:
+            base = calc_pilotage_nwm_entree_sortie(gt) if m in ("Entrée", "Sortie") else calc_pilotage_nwm_chg_quai(gt)
+            coef = 2.0 if e["desempare"] else 1.0
+        out.append((n, _P[f"Pilotage {m}"], 1.0, base, coef, base * coef))
+
+    # Remorquage
+    q = e["nb_rem"] * e["nb_mvt"]
+    if q > 0:
+        base = calc_remorquage(gt, REMORQUAGE_TM, REMORQUAGE_TM_SUP) if tm else calc_remorquage(gt, REMORQUAGE_NWM, REMORQUAGE_NWM_SUP)
+        coef = (1.25 if e["sans_propulsion"] else 1.0) * (0.25 if e["dehalage"] else 1.0)
+        out.append((n, _P["Remorquage"], q, base, coef, q * base * coef))
+
+    # Lamanage — TM: LOA avec minimum et +30 %/h entamée au-delà de la durée max; NWM: formule GT
+    if tm:
+        ll = LAMANAGE_TM[e["cat_lamanage"]]
+        base = max(e["loa"] * ll["tarif_ml"], ll["min"])
+        out.append((n, _P["Lamanage"], 1.0, base, 1.0, base))
+        h_sup = e["duree_lamanage_h"] - ll["duree_max_h"]
+        if h_sup > 0:
+            q = math.ceil(h_sup)
+            out.append((n, _P["Supplément lamanage (durée)"], q, base, 0.30, q * base * 0.30))
+    else:
+        base = calc_lamanage_nwm(gt)
+        out.append((n, _P["Lamanage"], 1.0, base, 1.0, base))
+
+    # Conteneurs
+    if e["evp"] > 0:
+        base = (CONTENEURS_TM if tm else CONTENEURS_NWM)[e["op_ctn"]]
+        coef = 1.5 if e["marchandises_dangereuses"] else 1.0
+        out.append((n, _P["Conteneurs"], e["evp"], base, coef, e["evp"] * base * coef))
+
+
+def _complet(e):
+    inconnus = set(e) - set(FACTURE_DEFAUT) - {"loa", "beam", "draft", "gt"}
+    if inconnus:
+        raise ValueError(f"Paramètres d'escale inconnus: {sorted(inconnus)}")
+    return {**FACTURE_DEFAUT, **e}
+
+
+def facture_escale(escale):
+    """Lignes de facture d'une escale (tableau structuré LIGNE_DTYPE)"""
+    out = []
+    _lignes_escale(_complet(escale), 0, out)
+    return np.array(out, dtype=LIGNE_DTYPE)
+
+
+def factures_lot(escales):
+    """Lignes de facture d'un lot d'escales, numérotées par position dans le lot"""
+    out = []
+    for n, e in enumerate(escales):
+        _lignes_escale(_complet(e), n, out)
+    return np.array(out, dtype=LIGNE_DTYPE)
+
+
+def totaux_factures(lignes, nb_factures=None):
+    """Total par facture (indexé par numéro de facture)"""
+    return np.bincount(lignes["facture"], weights=lignes["montant"], minlength=nb_factures or 0)
+
+
+def lignes_dataframe(lignes):
+    """Tableau de lignes → DataFrame avec libellé de poste catégoriel"""
+    df = pd.DataFrame(lignes)
+    df["poste"] = pd.Categorical.from_codes(df["poste"], categories=POSTES_FACTURE)
+    return df
@@ -0,0 +1,77 @@
+"""
+flotte.py — Comparaison d'une flotte (navires ou escales) sur les 3 ports: TM / NWM / Algeciras
+
+Une flotte est une table avec une ligne par navire ou par escale:
+    navire, loa, beam, draft, gt [+ sejour_h, nb_rem, nb_mvt, terminal_tm, terminal_nwm, evp, op_ctn, ...]
+Les colonnes absentes ou vides reprennent ESCALE_DEFAUT; GT, VG ou dimensions manquants sont estimés
+d'après le type de navire (estimation.completer, colonnes type / vg optionnelles). Les coûts sont calculés en une passe
+vectorisée (cout_escale.calc_cout_flotte); agrégats, tri et pagination se font côté serveur,
+seule la page affichée est envoyée au navigateur.
+"""
+import numpy as np
+import pandas as pd
+
+from cout_escale import PORTS, POSTES_COUT, ESCALE_DEFAUT, calc_cout_flotte
+from estimation import INDEX_NAVIRES, completer, incomplet
+
+COLONNES_FLOTTE = ["navire", "loa", "beam", "draft", "gt"] + list(ESCALE_DEFAUT)
+TRANCHES_GT = [0, 5000, 15000, 30000, 50000, 80000, 120000, 200000, np.inf]
+LIBELLES_TRANCHES_GT = [f"{a/1000:g}k–{b/1000:g}k GT" if np.isfinite(b) else f">{a/1000:g}k GT"
+                        for a, b in zip(TRANCHES_GT[:-1], TRANCHES_GT[1:])]
+AXES = {"tranche_gt": "Tranche GT", "terminal_tm": "Terminal TM", "terminal_nwm": "Terminal NWM", "op_ctn": "Opération CTN"}
+TAILLES_PAGE = [50, 100, 250, 500]
+
+
+def tarifer_flotte(flotte, index=INDEX_NAVIRES):
+    """Paramètres de flotte → paramètres + vg + coût "port · poste", total par port et écarts vs TM (%)"""
+    df = flotte.reset_index(drop=True)
+    vg_fourni = pd.to_numeric(df["vg"], errors="coerce").to_numpy(dtype="float64") if "vg" in df else None
+    if incomplet(df):
+        df = completer(df, index)
+    df = df.drop(columns="vg", errors="ignore")  # recalculé depuis les dimensions
+    if "navire" not in df:
+        df.insert(0, "navire", [f"Navire {i + 1}" for i in range(len(df))])
+    res = pd.concat([df, calc_cout_flotte(df)], axis=1)
+    if vg_fourni is not None and "dim_estimees" in res:
+        m = res["dim_estimees"].to_numpy() & ~np.isnan(vg_fourni)
+        ecart = ~np.isclose(res["vg"].to_numpy()[m], vg_fourni[m], rtol=1e-9)
+        if ecart.any():
+            raise ValueError(f"VG tarifé différent du VG fourni (lignes {np.flatnonzero(m)[ecart][:10].tolist()})")
+    tm = res["TM"].where(res["TM"] > 0)
+    res["ecart_nwm_vs_tm"] = (res["NWM"] / tm - 1) * 100
+    res["ecart_alg_vs_tm"] = (res["Algeciras"] / tm - 1) * 100
+    return res
+
+
+def tranche_gt(gt):
+    """GT → libellé de tranche (catégoriel ordonné)"""
+    return pd.cut(gt, TRANCHES_GT, labels=LIBELLES_TRANCHES_GT, right=True, include_lowest=True)
+
+
+def agregat_ports(tarifee):
+    """Coût total de la flotte par poste (lignes) × port (colonnes), ligne TOTAL comprise"""
+    df = pd.DataFrame({port: [tarifee[f"{port} · {p}"].sum() for p in POSTES_COUT] + [tarifee[port].sum()]
+                       for port in PORTS})
+    df.insert(0, "poste", POSTES_COUT + ["TOTAL"])
+    return df
+
+
+def agregat(tarifee, axe="tranche_gt"):
+    """Navires, coût total et coût moyen par port, regroupés selon un axe de AXES"""
+    cle = tranche_gt(tarifee["gt"]) if axe == "tranche_gt" else tarifee.get(axe, ESCALE_DEFAUT.get(axe))
+    g = tarifee.assign(_axe=cle).groupby("_axe", observed=True, sort=True)
+    out = g.size().rename("navires").to_frame()
+    for port in PORTS:
+        out[port] = g[port].sum()
+        out[f"moyenne {port}"] = g[port].mean()
+    out["ecart_nwm_vs_tm"] = (out["NWM"] / out["TM"].where(out["TM"] > 0) - 1) * 100
+    return out.rename_axis(AXES[axe]).reset_index()
+
+
+def page(df, tri=None, croissant=True, numero=1, taille=100):
+    """Tri côté serveur puis tranche [numero] de taille lignes → (page, nombre de pages)"""
+    nb_pages = max(1, -(-len(df) // taille))
+    numero = min(max(1, numero), nb_pages)
+    ordre = (df[tri].reset_index(drop=True).sort_values(ascending=croissant, na_position="last", kind="stable").index
+             if tri else pd.RangeIndex(len(df)))
+    return df.iloc[ordre[(numero - 1) * taille:numero * taille]], nb_pages
@@ -0,0 +1,234 @@
+"""
+historique.py — Historique d'escales sur disque (Arrow IPC en colonnes, partitionné par année et par port)
+
+Arborescence:
+    <racine>/annee=2024/port=TM/part-<horodatage>-<pid>.arrow
+Chaque fichier contient des lots (record batches) de TAILLE_LOT escales au schéma de LotEscales
+(paramètres texte en codes int8, CHOIX enregistré dans les métadonnées) + date d'escale.
+ajouter() écrit de nouveaux fichiers (atomiquement, jamais de réécriture); lire() mappe les fichiers
+en mémoire et construit des LotEscales sans copie: la retarification d'années d'historique démarre
+immédiatement et sa mémoire est bornée par la taille d'un lot, pas par celle de l'historique.
+
+Usage en ligne de commande:
+    python historique.py importer escales_2024.csv --port TM
+    python historique.py retarifer --annees 2023 2024 --sortie retarification.csv
+    python historique.py inventaire
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from cout_escale import PORTS, calc_cout_flotte
+from estimation import completer, incomplet
+from navires import CHOIX, DTYPES_LOT, LotEscales
+
+RACINE_HISTORIQUE = os.environ.get("SIMULATEUR_HISTORIQUE_DIR",
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), ".historique"))
+TAILLE_LOT = 262_144      # escales par record batch (~17 Mo): borne mémoire de la retarification
+TAILLE_BLOC_CSV = 500_000
+
+# booléens stockés en uint8 (les booléens Arrow sont des bits: pas de vue numpy sans copie)
+_ARROW = {"f8": pa.float64(), "i2": pa.int16(), "i1": pa.int8(), "?": pa.uint8()}
+SCHEMA = pa.schema([("date", pa.timestamp("s"))] + [(c, _ARROW[dt]) for c, dt in DTYPES_LOT.items()],
+                   metadata={"choix": json.dumps(CHOIX, ensure_ascii=False)})
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ÉCRITURE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _dossier(racine, annee, port):
+    return os.path.join(racine, f"annee={annee}", f"port={port}")
+
+
+def _ecrire_part(lot, dates, dest):
+    """Escales (LotEscales + dates) → fichier Arrow IPC écrit atomiquement, par lots de TAILLE_LOT"""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    cols = [pa.array(dates.astype("datetime64[s]"))]
+    cols += [pa.array(getattr(lot, c).view("u1") if dt == "?" else getattr(lot, c)) for c, dt in DTYPES_LOT.items()]
+    table = pa.Table.from_arrays(cols, schema=SCHEMA)
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp, "wb") as f, ipc.new_file(f, SCHEMA) as w:
+        w.write_table(table, max_chunksize=TAILLE_LOT)
+    os.replace(tmp, dest)
+
+
+def ajouter(escales, port, dates=None, racine=RACINE_HISTORIQUE):
+    """Ajoute des escales à l'historique d'un port → nombre d'escales écrites
+
+    escales: LotEscales (dates obligatoires) ou DataFrame au format flotte avec colonne date
+    (GT, VG ou dimensions manquants estimés d'après la colonne type).
+    """
+    if port not in PORTS:
+        raise ValueError(f"Port inconnu: {port!r} (attendu: {', '.join(PORTS)})")
+    if isinstance(escales, LotEscales):
+        lot = escales
+    else:
+        dates = escales["date"] if dates is None else dates
+        lot = LotEscales.depuis_table(completer(escales) if incomplet(escales) else escales)
+    if dates is None:
+        raise ValueError("Dates d'escale manquantes")
+    dates = pd.to_datetime(pd.Series(dates).reset_index(drop=True), errors="raise")
+    if len(dates) != len(lot):
+        raise ValueError(f"{len(dates)} dates pour {len(lot)} escales")
+    if dates.isna().any():
+        raise ValueError(f"Dates manquantes ou invalides: {int(dates.isna().sum())} escale(s)")
+    annees = dates.dt.year.to_numpy()
+    dates = dates.to_numpy()
+    horodatage = time.time_ns()
+    for annee in np.unique(annees):
+        idx = np.flatnonzero(annees == annee)
+        part = lot if len(idx) == len(lot) else LotEscales(**{c: getattr(lot, c)[idx] for c in DTYPES_LOT})
+        _ecrire_part(part, dates[idx], os.path.join(_dossier(racine, annee, port), f"part-{horodatage}-{os.getpid()}.arrow"))
+    return len(lot)
+
+
+def importer_csv(source, port=None, racine=RACINE_HISTORIQUE, taille_bloc=TAILLE_BLOC_CSV):
+    """CSV d'escales (date, loa, beam, draft, gt [+ port, paramètres]) → historique, lu par blocs → escales écrites
+
+    Sans colonne port, toutes les escales sont rangées sous port.
+    """
+    n = 0
+    for bloc in pd.read_csv(source, chunksize=taille_bloc):
+        if "port" in bloc:
+            for p, g in bloc.groupby("port", sort=False):
+                n += ajouter(g.drop(columns="port"), str(p), racine=racine)
+        elif port is not None:
+            n += ajouter(bloc, port, racine=racine)
+        else:
+            raise ValueError("Colonne port absente: préciser le port de l'historique")
+    return n
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LECTURE (MEMORY-MAP, SANS COPIE)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def fichiers(racine=RACINE_HISTORIQUE, annees=None, ports=None):
+    """(année, port, chemin) des fichiers de l'historique, filtrés sur les partitions"""
+    if not os.path.isdir(racine):
+        return
+    for da in sorted(os.listdir(racine)):
+        if not da.startswith("annee="):
+            continue
+        annee = int(da.split("=", 1)[1])
+        if annees is not None and annee not in annees:
+            continue
+        for dp in sorted(os.listdir(os.path.join(racine, da))):
+            if not dp.startswith("port="):
+                continue
+            port = dp.split("=", 1)[1]
+            if ports is not None and port not in ports:
+                continue
+            dossier = os.path.join(racine, da, dp)
+            for nom in sorted(os.listdir(dossier)):
+                if nom.endswith(".arrow"):
+                    yield annee, port, os.path.join(dossier, nom)
+
+
+def _recodage(choix):
+    """CHOIX enregistré → {colonne: table ancien code → code courant} (colonnes dont les libellés ont changé)"""
+    out = {}
+    for c, valeurs in choix.items():
+        if valeurs != CHOIX[c]:
+            out[c] = np.array([CHOIX[c].index(v) if v in CHOIX[c] else -1 for v in valeurs], dtype="i1")
+    return out
+
+
+def _lot(batch, recodage):
+    """Record batch mappé → (dates, LotEscales) en vues sur le fichier (copie des seules colonnes recodées)"""
+    cols = {}
+    for c, dt in DTYPES_LOT.items():
+        v = batch.column(c).to_numpy(zero_copy_only=True)
+        if dt == "?":
+            v = v.view("?")
+        elif c in recodage:
+            v = recodage[c][v]
+            if (v < 0).any():
+                raise ValueError(f"{c}: valeur(s) de l'historique absente(s) des tarifs courants")
+        cols[c] = v
+    return batch.column("date").to_numpy(zero_copy_only=True), LotEscales(**cols)
+
+
+def lire(racine=RACINE_HISTORIQUE, annees=None, ports=None):
+    """Itère l'historique → (année, port, dates, LotEscales) par lot de TAILLE_LOT escales au plus, sans copie"""
+    for annee, port, path in fichiers(racine, annees, ports):
+        reader = ipc.open_file(pa.memory_map(path, "r"))  # mapping libéré avec la dernière vue
+        recodage = _recodage(json.loads(reader.schema.metadata[b"choix"]))
+        for i in range(reader.num_record_batches):
+            yield (annee, port, *_lot(reader.get_batch(i), recodage))
+
+
+def inventaire(racine=RACINE_HISTORIQUE):
+    """Escales, fichiers et taille sur disque par (année, port)"""
+    rows = {}
+    for annee, port, path in fichiers(racine):
+        with pa.memory_map(path, "r") as source:
+            n = ipc.open_file(source).count_rows()
+        r = rows.setdefault((annee, port), {"annee": annee, "port": port, "escales": 0, "fichiers": 0, "taille_mo": 0.0})
+        r["escales"] += n
+        r["fichiers"] += 1
+        r["taille_mo"] += os.path.getsize(path) / 1024 / 1024
+    return pd.DataFrame(list(rows.values()), columns=["annee", "port", "escales", "fichiers", "taille_mo"])
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# RETARIFICATION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def iter_retarification(racine=RACINE_HISTORIQUE, annees=None, ports=None):
+    """Retarifie l'historique aux tarifs courants des 3 ports → partiels par (année, port d'escale)
+
+    Chaque partiel: annee, port, escales, TM, NWM, Algeciras (coût total des escales de la partition
+    si elles avaient été facturées à chacun des ports). Compatible avec taches.lancer.
+    """
+    courant, acc = None, None
+    for annee, port, _, lot in lire(racine, annees, ports):
+        if (annee, port) != courant:
+            if acc is not None:
+                yield acc
+            courant = (annee, port)
+            acc = {"annee": annee, "port": port, "escales": 0, **{p: 0.0 for p in PORTS}}
+        couts = calc_cout_flotte(lot)
+        acc["escales"] += len(lot)
+        for p in PORTS:
+            acc[p] += float(couts[p].sum())
+    if acc is not None:
+        yield acc
+
+
+def retarifer(racine=RACINE_HISTORIQUE, annees=None, ports=None):
+    """Historique retarifé → DataFrame par (année, port d'escale) et écarts vs TM (%)"""
+    df = pd.DataFrame(list(iter_retarification(racine, annees, ports)),
+                      columns=["annee", "port", "escales"] + PORTS)
+    tm = df["TM"].where(df["TM"] > 0)
+    df["ecart_nwm_vs_tm"] = (df["NWM"] / tm - 1) * 100
+    df["ecart_alg_vs_tm"] = (df["Algeciras"] / tm - 1) * 100
+    return df
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Historique d'escales sur disque (Arrow IPC) et retarification")
+    p.add_argument("commande", choices=["importer", "retarifer", "inventaire"])
+    p.add_argument("csv", nargs="*", help="CSV d'escales à importer")
+    p.add_argument("--port", choices=PORTS, help="port des escales importées (si pas de colonne port)")
+    p.add_argument("--annees", type=int, nargs="*")
+    p.add_argument("--ports", choices=PORTS, nargs="*")
+    p.add_argument("--racine", default=RACINE_HISTORIQUE)
+    p.add_argument("--sortie", help="CSV de la retarification")
+    args = p.parse_args()
+    if args.commande == "importer":
+        for src in args.csv:
+            print(f"{src}: {importer_csv(src, args.port, args.racine):,} escales")
+    elif args.commande == "retarifer":
+        res = retarifer(args.racine, args.annees, args.ports)
+        print(res.to_string(index=False))
+        if args.sortie:
+            res.to_csv(args.sortie, index=False)
+    print(inventaire(args.racine).to_string(index=False))
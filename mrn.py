@@ -0,0 +1,59 @@
+"""
+mrn.py — Facturation des déclarations MRN (Tanger Med) par agent et par mois
+
+Deux lectures du barème MRN_TM (1-50 … >500 MRN):
+    progressif — chaque tranche facture les MRN qui y tombent (tarif marginal)
+    tranche    — tout le volume du mois au tarif de la tranche atteinte
+Les déclarations sont agrégées par agent × mois en une passe groupby, puis les deux modes
+sont calculés sur les volumes par recherche vectorisée des tranches (pas de boucle par déclaration).
+"""
+import numpy as np
+import pandas as pd
+
+from tarifs_data import MRN_TM
+
+MODES_MRN = ("progressif", "tranche")
+
+
+def compiler_mrn(bareme=MRN_TM):
+    """Tranches "A-B MRN" / ">B MRN" → débuts de tranche, tarifs et coûts progressifs cumulés"""
+    tranches = []
+    for k, prix in bareme.items():
+        borne = k.split()[0]
+        debut = int(borne[1:]) + 1 if borne.startswith(">") else int(borne.split("-")[0])
+        tranches.append((debut, prix))
+    tranches.sort()
+    debuts = np.array([d for d, _ in tranches], dtype="int64")
+    prix = np.array([p for _, p in tranches], dtype="float64")
+    # cumul[k] = coût progressif des MRN avant la tranche k
+    cumul = np.concatenate(([0.0], np.cumsum(np.diff(debuts) * prix[:-1])))
+    return {"debuts": debuts, "prix": prix, "cumul": cumul}
+
+
+BAREME_MRN = compiler_mrn()
+
+
+def cout_mrn(nb, mode="progressif", bareme=BAREME_MRN):
+    """Coût (€) de nb MRN sur la période; nb scalaire ou tableau"""
+    nb = np.asarray(nb, dtype="int64")
+    k = np.clip(np.searchsorted(bareme["debuts"], nb, side="right") - 1, 0, None)
+    if mode == "progressif":
+        cout = bareme["cumul"][k] + (nb - bareme["debuts"][k] + 1) * bareme["prix"][k]
+    elif mode == "tranche":
+        cout = nb * bareme["prix"][k]
+    else:
+        raise ValueError(f"Mode inconnu: {mode} (attendu: {', '.join(MODES_MRN)})")
+    cout = np.where(nb > 0, cout, 0.0)
+    return float(cout) if cout.ndim == 0 else cout
+
+
+def facturer_mrn(declarations, col_agent="agent", col_date="date"):
+    """Table de déclarations (une ligne par MRN) → factures agent × mois dans les deux modes"""
+    mois = pd.to_datetime(declarations[col_date]).dt.to_period("M")
+    lots = (declarations.groupby([declarations[col_agent], mois.rename("mois")], sort=True)
+            .size().rename("nb_mrn").reset_index())
+    for mode in MODES_MRN:
+        lots[f"cout_{mode}"] = cout_mrn(lots["nb_mrn"].to_numpy(), mode)
+    lots["ecart"] = lots["cout_tranche"] - lots["cout_progressif"]
+    lots["mois"] = lots["mois"].astype(str)
+    return lots
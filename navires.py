@@ -0,0 +1,191 @@
+"""
+navires.py — Enregistrements compacts des navires et des escales
+
+    Navire      — navire de référence des projections (dimensions, GT, remorqueurs, séjour)
+    Escale      — escale complète pour le coût 3 ports (navire + paramètres d'escale)
+    LotEscales  — lot d'escales en colonnes numpy (struct-of-arrays): ~60 octets par escale,
+                  paramètres texte stockés en codes int8 dans CHOIX; des millions d'escales tiennent en mémoire
+
+Navire et Escale sont des dataclasses à __slots__ (usage unitaire); les fonctions de calcul acceptent
+indifféremment ces objets ou les dicts historiques (navire(), escale()). ESCALE_DEFAUT est dérivé
+des valeurs par défaut d'Escale.
+"""
+from dataclasses import dataclass, asdict, fields
+
+import numpy as np
+import pandas as pd
+
+from tarifs_data import (
+    DROITS_PORT_NAVIRES_TM, DROITS_PORT_NAVIRES_NWM, CONTENEURS_TM, LAMANAGE_TM,
+    ALG_T1_COEF_UTILISATION, ALG_T1_REDUCTION_FREQUENCE, calc_vg,
+)
+
+
+@dataclass(slots=True)
+class Navire:
+    loa: float
+    beam: float
+    draft: float
+    gt: float
+    nb_rem: int = 2
+    sejour_h: float = 12.0
+
+    @property
+    def vg(self):
+        return calc_vg(self.loa, self.beam, self.draft)
+
+
+@dataclass(slots=True)
+class Escale:
+    loa: float
+    beam: float
+    draft: float
+    gt: float
+    sejour_h: float = 12.0
+    nb_rem: int = 2
+    nb_mvt: int = 2
+    terminal_tm: str = "Terminaux à Conteneurs (TC1-TC4)"
+    terminal_nwm: str = "Terminal à Conteneurs"
+    evp: float = 500
+    op_ctn: str = "Transbordement"
+    cat_lam_tm: str = "Cat A – Ferry >1 escale/jour"
+    alg_concession: str = "Quai/Jetée sans concession"
+    alg_freq: str = "53-104 escales/an"
+    alg_regulier: bool = True
+
+    @property
+    def vg(self):
+        return calc_vg(self.loa, self.beam, self.draft)
+
+    def parametres(self):
+        """Paramètres nommés de calc_cout_escale"""
+        return asdict(self)
+
+
+DIMENSIONS = ("loa", "beam", "draft", "gt")
+# Paramètres d'escale par défaut (identiques aux valeurs initiales de l'interface)
+ESCALE_DEFAUT = {f.name: f.default for f in fields(Escale) if f.name not in DIMENSIONS}
+# paramètre texte → valeurs admises (ordre = codes catégoriels de LotEscales)
+CHOIX = {
+    "terminal_tm": list(DROITS_PORT_NAVIRES_TM), "terminal_nwm": list(DROITS_PORT_NAVIRES_NWM),
+    "op_ctn": list(CONTENEURS_TM), "cat_lam_tm": list(LAMANAGE_TM),
+    "alg_concession": list(ALG_T1_COEF_UTILISATION), "alg_freq": list(ALG_T1_REDUCTION_FREQUENCE),
+}
+
+
+def navire(obj):
+    """Navire ou dict {gt, nb_rem, sejour_h, loa, beam, draft} → Navire"""
+    return obj if isinstance(obj, Navire) else Navire(**obj)
+
+
+def escale(obj):
+    """Escale ou dict (ESCALE_DEFAUT pour les clés absentes) → Escale; TypeError sur clé inconnue"""
+    return obj if isinstance(obj, Escale) else Escale(**obj)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LOT D'ESCALES (STRUCT-OF-ARRAYS)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# colonne → dtype de stockage (codes int8 pour les paramètres texte)
+DTYPES_LOT = {"loa": "f8", "beam": "f8", "draft": "f8", "gt": "f8", "sejour_h": "f8", "nb_rem": "i2", "nb_mvt": "i2",
+              "evp": "f8", **{c: "i1" for c in CHOIX}, "alg_regulier": "?"}
+
+
+def _codes(valeurs, col):
+    codes = pd.Categorical(valeurs, categories=CHOIX[col]).codes
+    if (codes < 0).any():
+        inconnus = sorted({str(v) for v, c in zip(valeurs, codes) if c < 0})
+        raise ValueError(f"{col}: valeur(s) inconnue(s) {inconnus} (attendu: {', '.join(CHOIX[col])})")
+    return codes.astype("i1")
+
+
+def _entiers(valeurs, col):
+    v = np.asarray(valeurs, dtype="f8")
+    out = v.astype(DTYPES_LOT[col])
+    if not np.array_equal(out, v):
+        raise ValueError(f"{col}: valeurs entières attendues")
+    return out
+
+
+@dataclass(slots=True)
+class LotEscales:
+    loa: np.ndarray
+    beam: np.ndarray
+    draft: np.ndarray
+    gt: np.ndarray
+    sejour_h: np.ndarray
+    nb_rem: np.ndarray
+    nb_mvt: np.ndarray
+    evp: np.ndarray
+    terminal_tm: np.ndarray
+    terminal_nwm: np.ndarray
+    op_ctn: np.ndarray
+    cat_lam_tm: np.ndarray
+    alg_concession: np.ndarray
+    alg_freq: np.ndarray
+    alg_regulier: np.ndarray
+
+    @classmethod
+    def depuis_colonnes(cls, cols, n):
+        """{colonne: valeurs} (colonnes absentes = ESCALE_DEFAUT, texte en clair) → LotEscales de n escales"""
+        manquantes = set(DIMENSIONS) - set(cols)
+        if manquantes:
+            raise ValueError(f"Colonnes obligatoires manquantes: {sorted(manquantes)}")
+        out = {}
+        for c, dt in DTYPES_LOT.items():
+            if c not in cols:  # colonne constante: valeur (ou code) par défaut directement typée
+                defaut = CHOIX[c].index(ESCALE_DEFAUT[c]) if c in CHOIX else ESCALE_DEFAUT[c]
+                out[c] = np.full(n, defaut, dtype=dt)
+                continue
+            v = cols[c]
+            if isinstance(v, pd.Series):
+                v = v.where(v.notna(), ESCALE_DEFAUT.get(c)).to_numpy() if c in ESCALE_DEFAUT else v.to_numpy()
+            if c in CHOIX:
+                out[c] = _codes(v, c)
+            elif dt.startswith("i"):
+                out[c] = _entiers(v, c)
+            else:
+                out[c] = np.asarray(v, dtype=dt)
+        return cls(**out)
+
+    @classmethod
+    def depuis_table(cls, df):
+        """DataFrame (loa, beam, draft, gt + paramètres optionnels, NaN = défaut) → LotEscales"""
+        return cls.depuis_colonnes({c: df[c] for c in DTYPES_LOT if c in df}, len(df))
+
+    @classmethod
+    def depuis_escales(cls, escales):
+        """Itérable d'Escale ou de dicts → LotEscales (une seule passe, sans DataFrame intermédiaire)"""
+        cols = {c: [] for c in DTYPES_LOT}
+        for e in escales:
+            e = escale(e)
+            for c, lst in cols.items():
+                lst.append(getattr(e, c))
+        return cls.depuis_colonnes(cols, len(cols["loa"]))
+
+    def __len__(self):
+        return len(self.loa)
+
+    def __getitem__(self, i):
+        """Escale i (texte décodé)"""
+        return Escale(**{c: (CHOIX[c][getattr(self, c)[i]] if c in CHOIX else getattr(self, c)[i].item())
+                         for c in DTYPES_LOT})
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, c).nbytes for c in DTYPES_LOT)
+
+    @property
+    def vg(self):
+        """Volume géométrique (m³), vectorisé"""
+        return self.loa * self.beam * np.maximum(self.draft, 0.14 * np.sqrt(self.loa * self.beam))
+
+    def valeurs(self, col):
+        """Colonne décodée (libellés pour les paramètres texte)"""
+        v = getattr(self, col)
+        return pd.Categorical.from_codes(v, categories=CHOIX[col]) if col in CHOIX else v
+
+    def tableau(self):
+        """LotEscales → DataFrame (paramètres texte en catégoriel)"""
+        return pd.DataFrame({c: self.valeurs(c) for c in DTYPES_LOT})
@@ -0,0 +1,233 @@
+"""
+optimisation_nwm.py — Grille tarifaire NWM sous-cotant TM de X% sur une flotte cible, à revenus projetés maximaux
+
+Paramètres optimisés (multiplicateurs des tarifs en vigueur, bornés):
+    dp · <terminal>   — DROITS_PORT_NAVIRES_NWM du terminal (nautique, port, stationnement)
+    rem · <tranche>   — REMORQUAGE_NWM, une variable par tranche GT, + REMORQUAGE_NWM_SUP
+    ctn · <opération> — CONTENEURS_NWM (appliqués aussi aux tarifs t_ctn_*_nwm du scénario de projection)
+Coût d'escale NWM (calc_cout_flotte) et revenus NWM projetés (calc_projection) sont affines en ces
+multiplicateurs: chaque modèle est relevé par une évaluation vectorisée par paramètre (base + vecteurs
+unitaires), puis le programme linéaire est résolu par scipy.optimize.linprog (HiGHS). À revenu optimal,
+une seconde passe retient la grille la plus proche des tarifs en vigueur. La grille proposée est
+réévaluée par les moteurs eux-mêmes (trajectoire exacte, contrainte vérifiée navire par navire).
+
+Usage en ligne de commande:
+    python optimisation_nwm.py --sous-cotation 10 --sortie grille_nwm.json
+    python optimisation_nwm.py flotte.xlsx --sous-cotation 5 --mode flotte --bornes 0.7 1.3
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linprog
+
+from cout_escale import ESCALE_DEFAUT, calc_cout_flotte
+from navires import LotEscales
+from projections import annees, calc_projection, terminaux_categorie
+from scenarios import projection_scenario
+from tarifs_data import (PROJ_NAVIRES, PROJ_MAPPING, DROITS_PORT_NAVIRES_NWM, REMORQUAGE_NWM, REMORQUAGE_NWM_SUP,
+                         CONTENEURS_NWM)
+
+MODES = {"navire": "chaque navire de la flotte", "flotte": "coût total de la flotte"}
+BORNES_DEFAUT = (0.5, 1.5)
+CTN_PROJ = {"Transbordement": "t_ctn_ts_nwm", "Import/Export": "t_ctn_ie_nwm"}
+
+# (nom, structure, clé) dans l'ordre du vecteur de multiplicateurs
+PARAMETRES = ([(f"dp · {t}", "DROITS_PORT_NAVIRES_NWM", t) for t in DROITS_PORT_NAVIRES_NWM]
+              + [(f"rem · {lo:,}–{hi:,} GT", "REMORQUAGE_NWM", i) for i, (lo, hi, _) in enumerate(REMORQUAGE_NWM)]
+              + [("rem · supplément / 5 000 GT > 50 000", "REMORQUAGE_NWM_SUP", None)]
+              + [(f"ctn · {op}", "CONTENEURS_NWM", op) for op in CONTENEURS_NWM])
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# GRILLE ↔ MULTIPLICATEURS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def grille(x):
+    """Multiplicateurs → structures NWM (version tarifaire partielle, cf. revision_tarifs)"""
+    dp = dict(DROITS_PORT_NAVIRES_NWM)
+    rem = list(REMORQUAGE_NWM)
+    sup = REMORQUAGE_NWM_SUP
+    ctn = dict(CONTENEURS_NWM)
+    for (_, s, k), m in zip(PARAMETRES, x):
+        m = float(m)
+        if s == "DROITS_PORT_NAVIRES_NWM":
+            dp[k] = {c: v * m for c, v in DROITS_PORT_NAVIRES_NWM[k].items()}
+        elif s == "REMORQUAGE_NWM":
+            lo, hi, t = REMORQUAGE_NWM[k]
+            rem[k] = (lo, hi, t * m)
+        elif s == "REMORQUAGE_NWM_SUP":
+            sup = REMORQUAGE_NWM_SUP * m
+        else:
+            ctn[k] = CONTENEURS_NWM[k] * m
+    return {"DROITS_PORT_NAVIRES_NWM": dp, "REMORQUAGE_NWM": rem, "REMORQUAGE_NWM_SUP": sup, "CONTENEURS_NWM": ctn}
+
+
+def _tarifs_proj(tarifs, x):
+    """Tarifs marchandises du scénario avec les multiplicateurs CTN appliqués"""
+    t = dict(tarifs)
+    for (_, s, k), m in zip(PARAMETRES, x):
+        if s == "CONTENEURS_NWM" and k in CTN_PROJ:
+            t[CTN_PROJ[k]] = tarifs[CTN_PROJ[k]] * float(m)
+    return t
+
+
+def flotte_reference(nav_overrides=None):
+    """Navires de référence Annexe 7 (un par type, surcharges de l'onglet Projections, terminal de sa catégorie)
+    → DataFrame flotte"""
+    terminaux = {}
+    for cat, navs in PROJ_MAPPING.items():
+        for t, _ in navs:
+            terminaux.setdefault(t, terminaux_categorie(cat))
+    rows = []
+    for t, d in PROJ_NAVIRES.items():
+        ov = (nav_overrides or {}).get(t, {})
+        term_tm, term_nwm = terminaux.get(t, (ESCALE_DEFAUT["terminal_tm"], ESCALE_DEFAUT["terminal_nwm"]))
+        rows.append({"navire": t, "type": t, "loa": float(ov.get("loa", d["loa"])), "beam": float(ov.get("beam", d["beam"])),
+                     "draft": float(ov.get("draft", d["draft"])), "gt": float(ov.get("gt", d["gt_est"])),
+                     "sejour_h": float(ov.get("sejour_h", d["sejour_h"])), "nb_rem": ov.get("nb_rem", d["nb_rem"]),
+                     "terminal_tm": term_tm, "terminal_nwm": term_nwm, "evp": d.get("teu_par_escale", 0)})
+    return pd.DataFrame(rows)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# MODÈLES AFFINES (ÉVALUATION EN LOT)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _base_unitaires(n):
+    return [np.zeros(n)] + list(np.eye(n))
+
+
+def modele_flotte(lot):
+    """Coût d'escale NWM de chaque navire = c0 + A·x (une passe calc_cout_flotte par paramètre) → (c0, A, coût TM)"""
+    cols = [calc_cout_flotte(lot, grille(x))["NWM"].to_numpy() for x in _base_unitaires(len(PARAMETRES))]
+    c0 = cols[0]
+    return c0, np.column_stack([c - c0 for c in cols[1:]]), calc_cout_flotte(lot)["TM"].to_numpy()
+
+
+def _revenus(proj, x):
+    res_nwm, res_tm = calc_projection(proj["escales"], proj["volumes"], _tarifs_proj(proj["tarifs"], x),
+                                      proj["nav_overrides"], grille(x))
+    return np.array([r["total"] for r in res_nwm]), np.array([r["total"] for r in res_tm])
+
+
+def modele_projection(proj):
+    """Revenu NWM total de chaque année de l'horizon = r0 + R·x → (r0, R)"""
+    cols = [_revenus(proj, x)[0] for x in _base_unitaires(len(PARAMETRES))]
+    r0 = cols[0]
+    return r0, np.column_stack([c - r0 for c in cols[1:]])
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# OPTIMISATION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _contraintes(flotte_m, sous_cotation, mode):
+    """A_ub·x ≤ b_ub: sous-cotation TM (navire par navire ou flotte) + tranches de remorquage croissantes"""
+    c0, a, tm = flotte_m
+    cible = (1 - sous_cotation / 100) * tm
+    if mode == "flotte":
+        a_ub, b_ub = a.sum(axis=0, keepdims=True), np.array([cible.sum() - c0.sum()])
+    else:
+        lignes = np.unique(np.column_stack([a, cible - c0]).round(9), axis=0)  # navires identiques: une contrainte
+        a_ub, b_ub = lignes[:, :-1], lignes[:, -1]
+    idx = [i for i, (_, s, _) in enumerate(PARAMETRES) if s == "REMORQUAGE_NWM"]
+    mono = np.zeros((len(idx) - 1, len(PARAMETRES)))
+    for j, (i, k) in enumerate(zip(idx, idx[1:])):
+        mono[j, i], mono[j, k] = REMORQUAGE_NWM[i - idx[0]][2], -REMORQUAGE_NWM[k - idx[0]][2]
+    return np.vstack([a_ub, mono]), np.concatenate([b_ub, np.zeros(len(mono))])
+
+
+def sous_cotation_max(flotte_m, bornes=BORNES_DEFAUT, mode="navire"):
+    """Sous-cotation maximale atteignable (%) aux bornes basses (coûts croissants en chaque multiplicateur)"""
+    c0, a, tm = flotte_m
+    nwm = c0 + a @ np.full(len(PARAMETRES), bornes[0])
+    if mode == "flotte":
+        return float((1 - nwm.sum() / tm.sum()) * 100)
+    return float(np.min(1 - nwm / tm) * 100)
+
+
+def optimiser(flotte=None, sous_cotation=10.0, scenario=None, proj=None, mode="navire", bornes=BORNES_DEFAUT,
+              actualisation=0.0):
+    """Grille NWM maximisant les revenus NWM cumulés (actualisés) de l'horizon sous contrainte de sous-cotation TM
+
+    flotte: DataFrame ou LotEscales (défaut: navires de référence); scenario: dict de scénario de projection
+    (ou proj: scenarios.projection_scenario déjà calculée); mode: "navire" (chaque navire ≤ TM − X%) ou "flotte" (coût total).
+    → {grille, multiplicateurs, trajectoire, flotte, revenu_actuel, revenu_propose}. ValueError si infaisable.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Mode inconnu: {mode!r} (attendu: {', '.join(MODES)})")
+    if not bornes[0] <= 1 <= bornes[1] or bornes[0] < 0:
+        raise ValueError(f"Bornes des multiplicateurs invalides: {bornes} (attendu: 0 ≤ min ≤ 1 ≤ max)")
+    proj = proj or projection_scenario(scenario)
+    if flotte is None:
+        flotte = flotte_reference(proj["nav_overrides"])
+    lot = flotte if isinstance(flotte, LotEscales) else LotEscales.depuis_table(flotte)
+    if not len(lot):
+        raise ValueError("Flotte cible vide")
+
+    flotte_m = modele_flotte(lot)
+    r0, r = modele_projection(proj)
+    poids = (1 + actualisation / 100) ** -np.arange(len(annees(proj["escales"])))
+    obj = poids @ r
+    a_ub, b_ub = _contraintes(flotte_m, sous_cotation, mode)
+    n = len(PARAMETRES)
+    res = linprog(-obj, A_ub=a_ub, b_ub=b_ub, bounds=[bornes] * n, method="highs")
+    if res.status == 2:
+        raise ValueError(f"Sous-cotation de {sous_cotation:g}% infaisable dans les bornes {bornes}: maximum atteignable "
+                         f"{sous_cotation_max(flotte_m, bornes, mode):.2f}% (pilotage et lamanage NWM non optimisés)")
+    if not res.success:
+        raise ValueError(f"Optimisation: {res.message}")
+
+    # À revenu optimal, grille la plus proche des tarifs en vigueur: min Σ|x − 1| (variables d'écart d ≥ |x − 1|)
+    opt = float(obj @ res.x)
+    eye = np.eye(n)
+    a2 = np.block([[a_ub, np.zeros((len(a_ub), n))], [eye, -eye], [-eye, -eye], [-obj[None, :], np.zeros((1, n))]])
+    b2 = np.concatenate([b_ub, np.ones(n), -np.ones(n), [-(opt - 1e-9 * max(abs(opt), 1.0))]])
+    res2 = linprog(np.concatenate([np.zeros(n), np.ones(n)]), A_ub=a2, b_ub=b2,
+                   bounds=[bornes] * n + [(0, None)] * n, method="highs")
+    x = res2.x[:n] if res2.success else res.x
+    return resultat(x, lot, proj, flotte_m, actualisation)
+
+
+def resultat(x, lot, proj, flotte_m=None, actualisation=0.0):
+    """Grille de multiplicateurs x réévaluée par les moteurs (calc_cout_flotte, calc_projection)"""
+    g = grille(x)
+    _, _, tm = flotte_m or modele_flotte(lot)
+    nwm_avant = calc_cout_flotte(lot)["NWM"].to_numpy()
+    nwm_apres = calc_cout_flotte(lot, g)["NWM"].to_numpy()
+    rev_avant, rev_tm = _revenus(proj, np.ones(len(PARAMETRES)))
+    rev_apres, _ = _revenus(proj, x)
+    poids = (1 + actualisation / 100) ** -np.arange(len(annees(proj["escales"])))
+    mult = pd.DataFrame([{"parametre": nom, "structure": s, "multiplicateur": float(m)} for (nom, s, _), m in zip(PARAMETRES, x)])
+    traj = pd.DataFrame({"year": annees(proj["escales"]), "nwm_actuel": rev_avant, "nwm_propose": rev_apres, "tm": rev_tm})
+    traj["ecart"] = traj["nwm_propose"] - traj["nwm_actuel"]
+    traj["ecart_pct"] = traj["ecart"] / traj["nwm_actuel"].where(traj["nwm_actuel"] != 0) * 100
+    fl = pd.DataFrame({"vg": lot.vg, "gt": lot.gt, "nwm_actuel": nwm_avant, "nwm_propose": nwm_apres, "tm": tm})
+    fl["ecart_vs_tm"] = (fl["nwm_propose"] / pd.Series(tm).where(tm > 0) - 1) * 100
+    return {"grille": g, "multiplicateurs": mult, "trajectoire": traj, "flotte": fl,
+            "revenu_actuel": float(poids @ rev_avant), "revenu_propose": float(poids @ rev_apres)}
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Optimisation de la grille tarifaire NWM (sous-cotation TM, revenus projetés)")
+    p.add_argument("flotte", nargs="?", help="flotte cible XLSX / CSV (défaut: navires de référence Annexe 7)")
+    p.add_argument("--sous-cotation", type=float, default=10.0, help="écart visé vs TM (%%)")
+    p.add_argument("--mode", choices=list(MODES), default="navire")
+    p.add_argument("--bornes", type=float, nargs=2, default=BORNES_DEFAUT, help="multiplicateurs min / max")
+    p.add_argument("--actualisation", type=float, default=0.0, help="taux d'actualisation des revenus (%%/an)")
+    p.add_argument("--sortie", help="grille proposée en version tarifaire JSON (cf. revision_tarifs)")
+    args = p.parse_args()
+    fl = None
+    if args.flotte:
+        from classeurs import lire_flotte
+        from estimation import completer, incomplet
+        fl = lire_flotte(args.flotte) if args.flotte.endswith(".xlsx") else pd.read_csv(args.flotte)
+        fl = completer(fl) if incomplet(fl) else fl
+    out = optimiser(fl, args.sous_cotation, mode=args.mode, bornes=tuple(args.bornes), actualisation=args.actualisation)
+    print(out["multiplicateurs"].to_string(index=False))
+    print(out["trajectoire"].to_string(index=False))
+    print(f"Revenu NWM cumulé: {out['revenu_actuel']:,.0f} → {out['revenu_propose']:,.0f} €")
+    if args.sortie:
+        from revision_tarifs import ecrire_version
+        ecrire_version(out["grille"], args.sortie)
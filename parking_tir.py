@@ -0,0 +1,157 @@
+"""
+parking_tir.py — Facturation du parking TIR (Tanger Med) sur flux d'événements portes
+
+Chaque événement est un dict {"horodatage": datetime, "sens": "in"|"out", "camion": id,
+"categorie": clé de PARKING_TIR_TM, "litige": bool (optionnel, sur l'entrée ou la sortie)}.
+Les barèmes PARKING_TIR_TM (franchise en jours ou en heures, tranches j2_5 / j5_10 / j10+,
+tarif horaire export, forfait par 24h) sont compilés une fois en tables de tranches cumulées:
+le montant d'un séjour se calcule en O(1). Occupation et revenus sont agrégés au fil de l'eau,
+une année de trafic se facture en une seule passe.
+
+Usage en ligne de commande:
+    python parking_tir.py evenements.csv   # colonnes: horodatage,sens,camion,categorie[,litige]
+"""
+import argparse
+import csv
+import math
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from tarifs_data import PARKING_TIR_TM, PARKING_TIR_PLAFOND_LITIGE
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# COMPILATION DES BARÈMES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def compiler_bareme(b):
+    """Barème PARKING_TIR_TM → {"unite_h", "tranches": [(début, taux)], "table": cumuls par unité}
+
+    Une clé "jA_B" facture les unités A+1..B au taux, "jA+" les unités au-delà de A.
+    L'unité est le jour (24h entamées) ou l'heure (franchise_h + tarif_h).
+    """
+    if "franchise_h" in b:
+        if "tarif_h" in b:
+            unite_h, tranches = 1, [(b["franchise_h"], b["tarif_h"])]
+        else:
+            unite_h, tranches = 24, [(b["franchise_h"] // 24, b["tarif_24h"])]
+    else:
+        unite_h = 24
+        tranches = []
+        for k, taux in b.items():
+            if k == "franchise_j":
+                continue
+            debut = k[1:].rstrip("+").split("_")[0]
+            tranches.append((int(debut), taux))
+        tranches.sort()
+        if tranches[0][0] != b["franchise_j"]:
+            raise ValueError(f"Tranches non contiguës à la franchise: {b}")
+    # table[u] = montant cumulé pour u unités, jusqu'au début de la dernière tranche (ouverte)
+    dernier_debut = tranches[-1][0]
+    table = [0.0] * (dernier_debut + 1)
+    for u in range(1, dernier_debut + 1):
+        taux = next((t for d, t in reversed(tranches) if u > d), 0.0)
+        table[u] = table[u - 1] + taux
+    return {"unite_h": unite_h, "tranches": tranches, "table": table,
+            "dernier_debut": dernier_debut, "dernier_taux": tranches[-1][1]}
+
+
+BAREMES = {cat: compiler_bareme(b) for cat, b in PARKING_TIR_TM.items()}
+
+
+def montant_sejour(categorie, duree_h, litige=False):
+    """Montant d'un séjour de duree_h heures (unités entamées), plafonné en cas de litige douane"""
+    c = BAREMES[categorie]
+    u = math.ceil(duree_h / c["unite_h"]) if duree_h > 0 else 0
+    if u <= c["dernier_debut"]:
+        m = c["table"][u]
+    else:
+        m = c["table"][-1] + (u - c["dernier_debut"]) * c["dernier_taux"]
+    return min(m, PARKING_TIR_PLAFOND_LITIGE) if litige else m
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# FLUX D'ÉVÉNEMENTS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def etat_parking():
+    """État incrémental: camions présents et agrégats d'occupation / revenus"""
+    return {"presents": {}, "occupation": Counter(), "occupation_max": Counter(), "occupation_totale_max": 0,
+            "revenus": defaultdict(float), "revenus_mois": defaultdict(float), "sejours": Counter(),
+            "heures": defaultdict(float), "anomalies": []}
+
+
+def traiter_evenement(etat, ev):
+    """Applique un événement porte; renvoie le séjour facturé à la sortie, sinon None"""
+    camion = ev["camion"]
+    if ev["sens"] == "in":
+        if camion in etat["presents"]:
+            etat["anomalies"].append(("entree_double", ev))
+            return None
+        if ev["categorie"] not in BAREMES:
+            etat["anomalies"].append(("categorie_inconnue", ev))
+            return None
+        etat["presents"][camion] = ev
+        cat = ev["categorie"]
+        etat["occupation"][cat] += 1
+        if etat["occupation"][cat] > etat["occupation_max"][cat]:
+            etat["occupation_max"][cat] = etat["occupation"][cat]
+        etat["occupation_totale_max"] = max(etat["occupation_totale_max"], len(etat["presents"]))
+        return None
+    entree = etat["presents"].pop(camion, None)
+    if entree is None:
+        etat["anomalies"].append(("sortie_sans_entree", ev))
+        return None
+    cat = entree["categorie"]
+    duree_h = (ev["horodatage"] - entree["horodatage"]).total_seconds() / 3600
+    litige = bool(entree.get("litige") or ev.get("litige"))
+    m = montant_sejour(cat, duree_h, litige)
+    etat["occupation"][cat] -= 1
+    etat["revenus"][cat] += m
+    etat["revenus_mois"][(ev["horodatage"].year, ev["horodatage"].month)] += m
+    etat["sejours"][cat] += 1
+    etat["heures"][cat] += duree_h
+    return {"camion": camion, "categorie": cat, "entree": entree["horodatage"], "sortie": ev["horodatage"],
+            "duree_h": duree_h, "litige": litige, "montant": m}
+
+
+def facturer_flux(evenements, etat=None):
+    """Générateur: séjours facturés au fil des sorties (événements triés par horodatage)"""
+    etat = etat_parking() if etat is None else etat
+    for ev in evenements:
+        sejour = traiter_evenement(etat, ev)
+        if sejour is not None:
+            yield sejour
+
+
+def synthese(etat):
+    """Agrégats par catégorie: séjours, durée moyenne, revenus, occupation courante et max"""
+    rows = []
+    for cat in PARKING_TIR_TM:
+        n = etat["sejours"][cat]
+        rows.append({"categorie": cat, "sejours": n, "duree_moy_h": etat["heures"][cat] / n if n else 0.0,
+                     "revenus": etat["revenus"][cat], "presents": etat["occupation"][cat],
+                     "occupation_max": etat["occupation_max"][cat]})
+    return rows
+
+
+def lire_evenements_csv(f):
+    """Lit un CSV d'événements porte (horodatage ISO 8601) ligne à ligne"""
+    for row in csv.DictReader(f):
+        yield {"horodatage": datetime.fromisoformat(row["horodatage"]), "sens": row["sens"].strip().lower(),
+               "camion": row["camion"], "categorie": row["categorie"],
+               "litige": row.get("litige", "").strip().lower() in ("1", "true", "oui")}
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Facturation parking TIR sur un fichier d'événements portes")
+    p.add_argument("evenements")
+    args = p.parse_args()
+    etat = etat_parking()
+    with open(args.evenements, newline="", encoding="utf-8") as f:
+        total = sum(s["montant"] for s in facturer_flux(lire_evenements_csv(f), etat))
+    for r in synthese(etat):
+        print(f"{r['categorie']:<36} {r['sejours']:>8} séjours {r['revenus']:>14,.2f} € (max {r['occupation_max']} présents)")
+    print(f"{'TOTAL':<36} {sum(etat['sejours'].values()):>8} séjours {total:>14,.2f} €")
+    if etat["anomalies"]:
+        print(f"{len(etat['anomalies'])} événements ignorés (anomalies)")
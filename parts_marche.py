@@ -0,0 +1,245 @@
+"""
+parts_marche.py — Parts de marché TM / NWM / Algeciras par choix logit sur le coût d'escale
+
+Chaque classe de navires (catégorie de projection × navire de référence de PROJ_MAPPING) choisit son port
+avec une probabilité logit sur le coût d'escale relatif:
+    V[p] = asc[p] − θ · coût_généralisé[p] / coût moyen de la classe (tarifs en vigueur)
+    coût_généralisé[p] = coût d'escale[p] × (1 + α · (escales[p] / capacité[p])^β)   (congestion, BPR)
+Le marché d'une classe est calé sur les escales NWM Annexe 7: aux tarifs en vigueur et sans congestion,
+les escales NWM reproduisent exactement PROJ_ESCALES. Les asc reproduisent des parts de référence si fournies (0 sinon).
+Avec capacités, les parts dépendent des escales de chaque port: Newton amorti sur l'utilisation des ports, toutes les
+années de l'horizon à la fois.
+compiler_marche() précalcule classes, coûts de référence et marchés; equilibre() ne réévalue que les coûts
+(calc_cout_flotte vectorisé) et le point fixe — re-résolution après changement de tarifs en quelques ms.
+
+Usage en ligne de commande:
+    python parts_marche.py --elasticite 4 --capacites 0 2500 0
+    python parts_marche.py --tarifs grille_nwm.json --parts 0.55 0.15 0.30 --sortie parts.csv
+    python parts_marche.py --verifier
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from cout_escale import PORTS, calc_cout_flotte
+from projections import ESC_CATS, VOL_MAP, annees, get_nav, terminaux_categorie, calc_volumes, calc_projection
+from scenarios import projection_scenario
+from tarifs_data import PROJ_NAVIRES, PROJ_MAPPING
+
+ELASTICITE_DEFAUT = 4.0   # θ: élasticité-prix propre ≈ −θ · (1 − part) · coût / coût moyen
+BPR_ALPHA, BPR_BETA = 0.15, 4.0
+TOLERANCE = 1e-10
+MAX_ITER = 100
+# Cas de contrôle: capacités saturées (θ, parts de référence, capacités) — cf. verifier_convergence
+CAS_VERIFICATION = [
+    (4.0, None, {"NWM": 500}),
+    (4.0, None, {"NWM": 1000}),
+    (15.0, None, {"NWM": 500}),
+    (4.0, {"TM": 0.55, "NWM": 0.15, "Algeciras": 0.30}, {"TM": 3000, "NWM": 500, "Algeciras": 2000}),
+    (4.0, None, {"TM": 1000, "NWM": 1000, "Algeciras": 1000}),
+]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CLASSES DE NAVIRES ET MARCHÉ
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def classes_navires(nav_overrides=None):
+    """Une ligne par (catégorie, navire) de PROJ_MAPPING: part, dimensions, terminaux de la catégorie, EVP"""
+    rows = []
+    for cat in ESC_CATS:
+        term_tm, term_nwm = terminaux_categorie(cat)
+        for ntype, pct in PROJ_MAPPING[cat]:
+            nav = get_nav(ntype, nav_overrides)
+            rows.append({"categorie": cat, "navire": ntype, "part": pct,
+                         **{k: float(nav[k]) for k in ("loa", "beam", "draft", "gt", "sejour_h")}, "nb_rem": nav["nb_rem"],
+                         "terminal_tm": term_tm, "terminal_nwm": term_nwm,
+                         "evp": PROJ_NAVIRES[ntype].get("teu_par_escale", 0) if "Conteneur" in cat else 0})
+    return pd.DataFrame(rows)
+
+
+def _logit(v):
+    e = np.exp(v - v.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def _parts_classes(parts_reference, classes):
+    """Parts de référence {port: part} ou {catégorie: {port: part}} → tableau (classes, ports)"""
+    out = np.empty((len(classes), len(PORTS)))
+    for i, cat in enumerate(classes["categorie"]):
+        pr = parts_reference[cat] if isinstance(parts_reference.get(cat), dict) else parts_reference
+        manquants = set(PORTS) - set(pr)
+        if manquants:
+            raise ValueError(f"Parts de référence: ports manquants {sorted(manquants)} ({cat})")
+        out[i] = [pr[p] for p in PORTS]
+    if (out <= 0).any():
+        raise ValueError("Parts de référence: valeurs strictement positives attendues")
+    return out / out.sum(axis=1, keepdims=True)
+
+
+def compiler_marche(proj=None, elasticite=ELASTICITE_DEFAUT, parts_reference=None, capacites=None):
+    """Modèle {classes, cout_ref, cout_moyen, asc, marche (années × classes), capacites, ...} précalculé
+
+    proj: entrées de projection (scenarios.projection_scenario, défaut: Annexe 7);
+    capacites: {port: escales/an} (absent, 0 ou None: sans congestion).
+    """
+    proj = proj or projection_scenario()
+    if elasticite <= 0:
+        raise ValueError(f"Élasticité θ > 0 attendue (reçu {elasticite})")
+    classes = classes_navires(proj["nav_overrides"])
+    cout_ref = calc_cout_flotte(classes)[PORTS].to_numpy()
+    cout_moyen = cout_ref.mean(axis=1)
+    v_ref = -elasticite * cout_ref / cout_moyen[:, None]
+    asc = np.log(_parts_classes(parts_reference, classes)) - v_ref if parts_reference else np.zeros_like(v_ref)
+    part_nwm = _logit(asc + v_ref)[:, PORTS.index("NWM")]
+    escales = np.array([proj["escales"][cat] for cat in classes["categorie"]], dtype="float64").T  # années × classes
+    cap = np.array([float((capacites or {}).get(p) or np.inf) for p in PORTS])
+    return {"classes": classes, "cout_ref": cout_ref, "cout_moyen": cout_moyen, "asc": asc, "elasticite": elasticite,
+            "marche": escales * classes["part"].to_numpy() / part_nwm, "capacites": cap, "proj": proj}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ÉQUILIBRE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def equilibre(modele, tarifs=None, tol=TOLERANCE, max_iter=MAX_ITER):
+    """Parts de marché à l'équilibre sous une version tarifaire (structures de STRUCTURES_TARIFS, défaut: en vigueur)
+
+    Inconnue: utilisation u (années × ports) telle que u = escales(parts(u)) / capacité. Direction de Newton
+    (jacobienne analytique 3×3 par année), pas divisé par deux tant que l'écart ne décroît pas: un point fixe amorti
+    oscille dès qu'une capacité est saturée (BPR β = 4). Résidu: écart max entre parts et parts réévaluées.
+    → {parts (années × classes × ports), escales_ports (années × ports), cout, iterations, residu, converge}
+    """
+    cout = modele["cout_ref"] if tarifs is None else calc_cout_flotte(modele["classes"], tarifs)[PORTS].to_numpy()
+    if np.isnan(cout).any():
+        raise ValueError("Coût d'escale indéfini pour certaines classes (terminal absent de la version tarifaire?)")
+    base = modele["asc"] - modele["elasticite"] * cout / modele["cout_moyen"][:, None]
+    echelle = modele["elasticite"] / modele["cout_moyen"][:, None] * cout
+    marche, cap = modele["marche"], modele["capacites"]
+    inv_cap = np.where(np.isfinite(cap), 1 / cap, 0.0)
+
+    def parts(u):
+        return _logit(base[None] - echelle[None] * BPR_ALPHA * u[:, None, :] ** BPR_BETA)
+
+    def ecart(u):
+        return u - np.einsum("yk,ykp->yp", marche, parts(u)) * inv_cap
+
+    u = np.zeros((len(marche), len(PORTS)))
+    s = parts(u)
+    residu, it = 0.0, 0
+    if np.isfinite(cap).any():
+        ident = np.eye(len(PORTS))
+        h = ecart(u)
+        norme = np.abs(h).max(axis=1)
+        for it in range(1, max_iter + 1):
+            dv = -echelle[None] * BPR_ALPHA * BPR_BETA * u[:, None, :] ** (BPR_BETA - 1)  # ∂V[k, q] / ∂u[q]
+            jac = np.einsum("yk,ykp,ykpq,ykq->ypq", marche, s, ident - s[:, :, None, :], dv) * inv_cap[:, None]
+            d = np.linalg.solve(ident - jac, -h[..., None])[..., 0]
+            pas = np.ones(len(u))
+            for _ in range(40):
+                u_n = np.maximum(u + pas[:, None] * d, 0.0)
+                h_n = ecart(u_n)
+                norme_n = np.abs(h_n).max(axis=1)
+                refus = (norme_n > (1 - 1e-4 * pas) * norme) & (norme > 0)
+                if not refus.any():
+                    break
+                pas = np.where(refus, pas / 2, pas)
+            u, h, norme = u_n, h_n, norme_n
+            s = parts(u)
+            residu = float(np.abs(parts(np.einsum("yk,ykp->yp", marche, s) * inv_cap) - s).max())
+            if residu < tol:
+                break
+    esc = np.einsum("yk,ykp->yp", marche, s)
+    return {"parts": s, "escales_ports": esc, "cout": cout, "iterations": it, "residu": residu,
+            "converge": residu < tol or not np.isfinite(cap).any()}
+
+
+def escales_nwm(modele, eq):
+    """Escales NWM à l'équilibre par catégorie → {catégorie: [valeur par année]} (format calc_escales)"""
+    nwm = modele["marche"] * eq["parts"][:, :, PORTS.index("NWM")]
+    cats = modele["classes"]["categorie"].to_numpy()
+    return {cat: nwm[:, cats == cat].sum(axis=1).tolist() for cat in ESC_CATS}
+
+
+def projection_equilibre(modele, eq, tarifs=None):
+    """Revenus NWM / TM (calc_projection) sur les escales NWM à l'équilibre
+
+    Volumes liés: recalculés sur les escales; volumes Annexe 7: mis à l'échelle des escales de chaque famille.
+    """
+    proj = modele["proj"]
+    esc = escales_nwm(modele, eq)
+    if proj.get("linked", True):
+        volumes = calc_volumes(esc, True)
+    else:
+        volumes = {k: list(v) for k, v in proj["volumes"].items()}
+        for key, cats in VOL_MAP.items():
+            for yi in range(len(esc[ESC_CATS[0]])):
+                ref = sum(proj["escales"][c][yi] for c in cats)
+                volumes[key][yi] *= sum(esc[c][yi] for c in cats) / ref if ref else 0.0
+    return calc_projection(esc, volumes, proj["tarifs"], proj["nav_overrides"], tarifs)
+
+
+def table_parts(modele, eq):
+    """Équilibre → DataFrame long: year, categorie, navire, port, escales, part, cout"""
+    cl = modele["classes"]
+    ny, nk, np_ = eq["parts"].shape
+    return pd.DataFrame({"year": np.repeat(annees(modele["proj"]["escales"]), nk * np_),
+                         "categorie": np.tile(np.repeat(cl["categorie"].to_numpy(), np_), ny),
+                         "navire": np.tile(np.repeat(cl["navire"].to_numpy(), np_), ny),
+                         "port": np.tile(PORTS, ny * nk),
+                         "escales": (modele["marche"][:, :, None] * eq["parts"]).ravel(),
+                         "part": eq["parts"].ravel() * 100,
+                         "cout": np.tile(eq["cout"].ravel(), ny)})
+
+
+def table_ports(modele, eq):
+    """Équilibre → DataFrame par année × port: escales, part (%), utilisation (% de la capacité)"""
+    esc = eq["escales_ports"]
+    ans = annees(modele["proj"]["escales"])
+    df = pd.DataFrame({"year": np.repeat(ans, len(PORTS)), "port": np.tile(PORTS, len(ans)),
+                       "escales": esc.ravel(),
+                       "part": (esc / np.maximum(esc.sum(axis=1, keepdims=True), 1e-12)).ravel() * 100})
+    df["utilisation"] = (esc / modele["capacites"]).ravel() * 100
+    df.loc[~np.isfinite(np.tile(modele["capacites"], len(ans))), "utilisation"] = np.nan
+    return df
+
+
+def verifier_convergence(cas=None, proj=None):
+    """Résout les cas de contrôle (capacités saturées) → DataFrame: cas, iterations, residu, converge, utilisation max"""
+    rows = []
+    for theta, parts, caps in cas or CAS_VERIFICATION:
+        mod = compiler_marche(proj, theta, parts, caps)
+        eq = equilibre(mod)
+        rows.append({"θ": theta, "capacites": " ".join(f"{p}={c:,}" for p, c in caps.items()),
+                     "iterations": eq["iterations"], "residu": eq["residu"], "converge": eq["converge"],
+                     "utilisation_max": float(np.nanmax(table_ports(mod, eq)["utilisation"]))})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Parts de marché TM / NWM / Algeciras (logit sur le coût d'escale)")
+    p.add_argument("--elasticite", type=float, default=ELASTICITE_DEFAUT)
+    p.add_argument("--parts", type=float, nargs=3, metavar=tuple(PORTS), help="parts de référence (TM NWM Algeciras)")
+    p.add_argument("--capacites", type=float, nargs=3, metavar=tuple(PORTS), help="escales/an (0: sans congestion)")
+    p.add_argument("--tarifs", help="version tarifaire JSON (cf. revision_tarifs)")
+    p.add_argument("--sortie", help="CSV des parts par année × classe × port")
+    p.add_argument("--verifier", action="store_true", help="contrôle de convergence sur capacités saturées (code 1 si échec)")
+    args = p.parse_args()
+    if args.verifier:
+        ctrl = verifier_convergence()
+        print(ctrl.to_string(index=False))
+        raise SystemExit(0 if ctrl["converge"].all() else 1)
+    mod = compiler_marche(None, args.elasticite, dict(zip(PORTS, args.parts)) if args.parts else None,
+                          dict(zip(PORTS, args.capacites)) if args.capacites else None)
+    v = None
+    if args.tarifs:
+        from revision_tarifs import charger_version
+        v = charger_version(args.tarifs)
+    eq = equilibre(mod, v)
+    print(table_ports(mod, eq).to_string(index=False))
+    print(f"{eq['iterations']} itérations, résidu {eq['residu']:.2e}")
+    res_nwm, _ = projection_equilibre(mod, eq, v)
+    print(f"Revenu NWM cumulé: {sum(r['total'] for r in res_nwm):,.0f} €")
+    if args.sortie:
+        table_parts(mod, eq).to_csv(args.sortie, index=False)
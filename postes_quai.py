@@ -0,0 +1,230 @@
+"""
+postes_quai.py — Saisonnalité mensuelle et occupation des postes à quai NWM (simulation à événements discrets)
+
+Les escales annuelles d'une année de projection (calc_escales, Annexe 7 par défaut) sont réparties sur l'année
+selon un profil saisonnier par catégorie, puis servies terminal par terminal (terminaux_categorie) par un nombre
+de postes à quai fixé:
+    arrivées      — nombre annuel de la classe (catégorie × navire de PROJ_MAPPING), mois tiré selon le profil
+                    (intensité journalière relative × jours du mois), instant uniforme dans le mois
+    séjour à quai — sejour_h du navire, dispersion Gamma de coefficient de variation cv_sejour
+    postes        — premier arrivé premier servi: file de priorité (heapq) des instants de libération des postes,
+                    O(N log postes) — pas de pas de temps, ≈ 0,1 s pour 20 000 escales/an
+Un navire arrivé postes pleins attend en rade; l'attente est facturée en stationnement
+(calc_stationnement, taux du terminal NWM: jours 1 à 4 plein tarif, 50% à partir du 5ème jour de rade).
+Port vide au 1er janvier; les séjours débordant sur l'année suivante restent imputés à l'année d'arrivée.
+
+Usage en ligne de commande:
+    python postes_quai.py --annee 2035 --postes 6 4 4 1
+    python postes_quai.py --horizon --sortie rade.csv
+"""
+import argparse
+import calendar
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from projections import ESC_CATS, STRUCTURES_PROJ, annees, get_nav, terminaux_categorie
+from navires import navire
+from tarifs_data import PROJ_ESCALES, PROJ_MAPPING, PROJ_YEARS, calc_stationnement
+
+# Postes à quai par terminal NWM (hypothèses de dimensionnement, modifiables)
+POSTES_NWM = {"Terminal à Conteneurs": 6, "Terminal Marchandises Div": 4, "Terminal Hydrocarbures": 4,
+              "Terminal GAZ": 1}
+JOUR_RADE_NWM = 5  # Rade NWM: 50% dès 5ème jour
+CV_SEJOUR = 0.3
+
+# Intensité journalière relative des arrivées par mois (1 = moyenne)
+PROFILS_SAISON = {
+    "uniforme":   [1.0] * 12,
+    "conteneurs": [0.90, 0.85, 0.95, 1.00, 1.00, 1.00, 1.05, 1.05, 1.10, 1.10, 1.05, 0.95],  # pic avant fin d'année
+    "energie":    [1.15, 1.10, 1.05, 0.95, 0.90, 0.90, 0.95, 0.95, 0.95, 1.00, 1.00, 1.10],  # demande hivernale
+    "vrac":       [0.90, 0.90, 0.95, 1.00, 1.05, 1.15, 1.15, 1.10, 1.00, 0.95, 0.90, 0.95],  # campagnes agricoles
+    "marhaba":    [0.70, 0.70, 0.80, 0.90, 1.00, 1.25, 1.70, 1.70, 1.15, 0.80, 0.70, 0.70],  # Opération Marhaba
+}
+PROFIL_CATEGORIE = {
+    "Conteneurs TC1": "conteneurs", "Conteneurs TC2": "conteneurs",
+    "Hydrocarbures Q1": "energie", "Hydrocarbures Q2": "energie", "Hydrocarbures Q3": "energie",
+    "Marchandises Div.": "uniforme", "Vrac Solide": "vrac", "Roulier": "marhaba",
+}
+COLONNES_ESCALES = ["categorie", "navire", "terminal", "mois", "arrivee_h", "accostage_h", "attente_h", "sejour_h",
+                    "depart_h", "stationnement_rade"]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ARRIVÉES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def profil(nom_ou_valeurs):
+    """Nom de PROFILS_SAISON ou 12 intensités mensuelles → tableau (12,) de moyenne 1"""
+    v = np.asarray(PROFILS_SAISON[nom_ou_valeurs] if isinstance(nom_ou_valeurs, str) else nom_ou_valeurs,
+                   dtype="float64")
+    if v.shape != (12,) or (v < 0).any() or not v.sum():
+        raise ValueError(f"Profil saisonnier: 12 intensités positives attendues (reçu {nom_ou_valeurs!r})")
+    return v / v.mean()
+
+
+def calendrier(annee):
+    """Début et durée (heures depuis le 1er janvier) de chaque mois de l'année"""
+    duree = np.array([calendar.monthrange(annee, m)[1] * 24.0 for m in range(1, 13)])
+    return np.concatenate([[0.0], np.cumsum(duree)[:-1]]), duree
+
+
+def arrivees(escales_annee, annee, profils=None, nav_overrides=None, cv_sejour=CV_SEJOUR, rng=None):
+    """{catégorie: escales de l'année} → DataFrame d'escales (categorie, navire, terminal, mois, arrivee_h, sejour_h)
+
+    profils: {catégorie: nom ou 12 intensités} remplaçant PROFIL_CATEGORIE; escales fractionnaires arrondies
+    aléatoirement (espérance conservée).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    debut, duree = calendrier(annee)
+    parts = []
+    for cat in ESC_CATS:
+        p = profil((profils or {}).get(cat, PROFIL_CATEGORIE.get(cat, "uniforme"))) * duree
+        terminal = terminaux_categorie(cat)[1]
+        for ntype, pct in PROJ_MAPPING[cat]:
+            x = escales_annee[cat] * pct
+            n = int(x) + int(rng.random() < x - int(x))
+            if not n:
+                continue
+            mois = rng.choice(12, n, p=p / p.sum())
+            sej = get_nav(ntype, nav_overrides)["sejour_h"]
+            k = 1 / cv_sejour ** 2 if cv_sejour > 0 else None
+            parts.append(pd.DataFrame({"categorie": cat, "navire": ntype, "terminal": terminal, "mois": mois + 1,
+                                       "arrivee_h": debut[mois] + rng.random(n) * duree[mois],
+                                       "sejour_h": rng.gamma(k, sej / k, n) if k else np.full(n, float(sej))}))
+    if not parts:
+        return pd.DataFrame(columns=COLONNES_ESCALES[:5] + ["sejour_h"])
+    return pd.concat(parts, ignore_index=True).sort_values("arrivee_h", kind="stable", ignore_index=True)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# POSTES À QUAI
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def accostages(arrivee_h, sejour_h, postes):
+    """Instants d'accostage, premier arrivé premier servi sur `postes` postes (arrivées triées)"""
+    if postes < 1:
+        raise ValueError(f"Au moins un poste à quai attendu (reçu {postes})")
+    libres = [0.0] * postes  # instants de libération des postes (tas)
+    out = np.empty(len(arrivee_h))
+    for i, (a, s) in enumerate(zip(arrivee_h.tolist(), sejour_h.tolist())):
+        debut = max(a, libres[0])
+        heapq.heapreplace(libres, debut + s)
+        out[i] = debut
+    return out
+
+
+def stationnement_rade(attente_h, vg, taux):
+    """Stationnement en rade NWM par escale: plein tarif jusqu'au jour JOUR_RADE_NWM − 1, 50% au-delà"""
+    plein_h = (JOUR_RADE_NWM - 1) * 24
+    out = np.zeros(len(attente_h))
+    for i in np.flatnonzero(attente_h > 24):  # franchise 24h
+        h = attente_h[i]
+        out[i] = calc_stationnement(vg[i], taux[i], min(h, plein_h))
+        if h > plein_h:  # jours ≥ JOUR_RADE_NWM: différence des montants réduits (rade)
+            out[i] += (calc_stationnement(vg[i], taux[i], h, en_rade=True, jour_rade=1)
+                       - calc_stationnement(vg[i], taux[i], plein_h, en_rade=True, jour_rade=1))
+    return out
+
+
+def simuler(computed_escales=None, annee=PROJ_YEARS[-1], postes=None, profils=None, nav_overrides=None,
+            structures=None, cv_sejour=CV_SEJOUR, graine=None):
+    """Escales d'une année servies par les postes NWM → DataFrame une ligne par escale (COLONNES_ESCALES)
+
+    computed_escales: calc_escales (défaut: Annexe 7); postes: {terminal: nombre} remplaçant POSTES_NWM;
+    structures: tarifs NWM (DROITS_PORT_NAVIRES_NWM) remplaçant ceux de STRUCTURES_PROJ.
+    """
+    computed_escales = computed_escales or PROJ_ESCALES
+    ans = annees(computed_escales)
+    if annee not in ans:
+        raise ValueError(f"Année hors horizon: {annee} (attendu: {ans[0]}-{ans[-1]})")
+    yi = ans.index(annee)
+    postes = {**POSTES_NWM, **(postes or {})}
+    droits = {**STRUCTURES_PROJ, **(structures or {})}["DROITS_PORT_NAVIRES_NWM"]
+    df = arrivees({cat: computed_escales[cat][yi] for cat in ESC_CATS}, annee, profils, nav_overrides, cv_sejour,
+                  np.random.default_rng(graine))
+    df["accostage_h"] = 0.0
+    for terminal, idx in df.groupby("terminal", sort=False).indices.items():
+        df.loc[idx, "accostage_h"] = accostages(df["arrivee_h"].to_numpy()[idx], df["sejour_h"].to_numpy()[idx],
+                                                postes[terminal])
+    df["attente_h"] = df["accostage_h"] - df["arrivee_h"]
+    df["depart_h"] = df["accostage_h"] + df["sejour_h"]
+    vg = {ntype: navire(get_nav(ntype, nav_overrides)).vg for ntype in df["navire"].unique()}
+    df["stationnement_rade"] = stationnement_rade(df["attente_h"].to_numpy(), df["navire"].map(vg).to_numpy(),
+                                                  df["terminal"].map(lambda t: droits[t]["stationnement"]).to_numpy())
+    return df[COLONNES_ESCALES]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SYNTHÈSES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _file_max(df):
+    """Nombre maximal de navires simultanément en rade"""
+    a = df.loc[df["attente_h"] > 0, ["arrivee_h", "accostage_h"]].to_numpy()
+    if not len(a):
+        return 0
+    t = np.concatenate([a[:, 0], a[:, 1]])
+    d = np.concatenate([np.ones(len(a)), -np.ones(len(a))])
+    o = np.lexsort((d, t))  # accostage avant arrivée au même instant
+    return int(np.cumsum(d[o]).max())
+
+
+def synthese_postes(df, postes=None, annee=PROJ_YEARS[-1]):
+    """Par terminal: escales, postes, occupation (%), attente moyenne / P95 / max (h), % en rade, file max, revenu rade"""
+    postes = {**POSTES_NWM, **(postes or {})}
+    heures = (366 if calendar.isleap(annee) else 365) * 24
+    rows = []
+    for terminal, g in df.groupby("terminal", sort=False):
+        w = g["attente_h"].to_numpy()
+        rows.append({"terminal": terminal, "escales": len(g), "postes": postes[terminal],
+                     "occupation": g["sejour_h"].sum() / (postes[terminal] * heures) * 100,
+                     "attente_moy_h": w.mean(), "attente_p95_h": np.percentile(w, 95), "attente_max_h": w.max(),
+                     "en_rade": (w > 0).mean() * 100, "file_max": _file_max(g),
+                     "stationnement_rade": g["stationnement_rade"].sum()})
+    return pd.DataFrame(rows, columns=["terminal", "escales", "postes", "occupation", "attente_moy_h", "attente_p95_h",
+                                       "attente_max_h", "en_rade", "file_max", "stationnement_rade"])
+
+
+def synthese_mensuelle(df):
+    """Par mois × terminal: escales, attente moyenne (h), revenu stationnement en rade"""
+    g = df.groupby(["mois", "terminal"], sort=True).agg(escales=("attente_h", "size"),
+                                                        attente_moy_h=("attente_h", "mean"),
+                                                        stationnement_rade=("stationnement_rade", "sum"))
+    return g.reset_index()
+
+
+def simulation_horizon(computed_escales=None, postes=None, profils=None, nav_overrides=None, structures=None,
+                       cv_sejour=CV_SEJOUR, graine=None):
+    """synthese_postes pour chaque année de l'horizon → DataFrame (year en première colonne)"""
+    computed_escales = computed_escales or PROJ_ESCALES
+    rng = np.random.default_rng(graine)
+    out = []
+    for annee in annees(computed_escales):
+        df = simuler(computed_escales, annee, postes, profils, nav_overrides, structures, cv_sejour,
+                     rng.integers(2 ** 32))
+        out.append(synthese_postes(df, postes, annee).assign(year=annee))
+    res = pd.concat(out, ignore_index=True)
+    return res[["year"] + [c for c in res.columns if c != "year"]]
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Occupation des postes à quai NWM et stationnement en rade (Annexe 7)")
+    p.add_argument("--annee", type=int, default=PROJ_YEARS[-1])
+    p.add_argument("--postes", type=int, nargs=len(POSTES_NWM), metavar=tuple(POSTES_NWM))
+    p.add_argument("--cv", type=float, default=CV_SEJOUR, help="coefficient de variation des séjours à quai")
+    p.add_argument("--graine", type=int, default=0)
+    p.add_argument("--horizon", action="store_true", help="synthèse de chaque année 2026-2035")
+    p.add_argument("--sortie", help="CSV (escales simulées, ou synthèse annuelle avec --horizon)")
+    args = p.parse_args()
+    pst = dict(zip(POSTES_NWM, args.postes)) if args.postes else None
+    if args.horizon:
+        res = simulation_horizon(None, pst, cv_sejour=args.cv, graine=args.graine)
+        print(res.to_string(index=False))
+    else:
+        res = simuler(None, args.annee, pst, cv_sejour=args.cv, graine=args.graine)
+        print(synthese_postes(res, pst, args.annee).to_string(index=False))
+        print(f"Stationnement en rade {args.annee}: {res['stationnement_rade'].sum():,.0f} €")
+    if args.sortie:
+        res.to_csv(args.sortie, index=False)
@@ -0,0 +1,413 @@
+"""
+projections.py — Moteur de projections de revenus NWM / TM 2026-2035 (Annexe 7)
+Indépendant de Streamlit: utilisé par app.py et par le runner de scénarios.
+"""
+import json
+
+from tarifs_data import (
+    PROJ_YEARS, PROJ_TRAFIC, PROJ_ESCALES, PROJ_NAVIRES, PROJ_MAPPING,
+    DROITS_PORT_NAVIRES_TM, DROITS_PORT_NAVIRES_NWM, REMORQUAGE_TM, REMORQUAGE_TM_SUP,
+    REMORQUAGE_NWM, REMORQUAGE_NWM_SUP, LAMANAGE_TM, PILOTAGE_NWM, LAMANAGE_NWM, HYDROCARBURES_NWM,
+    MARCHANDISES_ROULIER_NWM_DH, MARCHANDISES_ROULIER_TM, TAUX_DH_EUR_DEFAULT,
+    calc_stationnement, calc_pilotage_tm, calc_pilotage_nwm_entree_sortie,
+    calc_remorquage, calc_lamanage_nwm,
+)
+from navires import navire
+
+ESC_CATS = list(PROJ_ESCALES.keys())
+ANNEE_MAX = 2100
+GRANULARITES = {"annuel": 1, "trimestriel": 4, "mensuel": 12}
+
+# Cargo moyen par escale et par catégorie (référence Annexe 7)
+AVG_CARGO_PER_CALL = {
+    "Conteneurs TC1": 1750,   # TEU/call
+    "Conteneurs TC2": 1200,   # TEU/call
+    "Hydrocarbures Q1": 26667, # T/call
+    "Hydrocarbures Q2": 27907, # T/call
+    "Hydrocarbures Q3": 26780, # T/call
+    "Marchandises Div.": 14286, # T/call
+    "Vrac Solide": 20588,      # T/call
+    "Roulier": 1280,           # unités/call
+}
+
+CARGO_UNITS = {
+    "Conteneurs TC1": "TEU", "Conteneurs TC2": "TEU",
+    "Hydrocarbures Q1": "T", "Hydrocarbures Q2": "T", "Hydrocarbures Q3": "T",
+    "Marchandises Div.": "T", "Vrac Solide": "T", "Roulier": "unités",
+}
+
+# Clés PROJ_TRAFIC agrégées → catégories d'escales (mode volumes liés)
+VOL_MAP = {
+    "Total Conteneurs (TEU)": ["Conteneurs TC1", "Conteneurs TC2"],
+    "Total Hydrocarbures (T)": ["Hydrocarbures Q1", "Hydrocarbures Q2", "Hydrocarbures Q3"],
+    "Marchandises Div. (T)": ["Marchandises Div."],
+    "Vrac Solide (T)": ["Vrac Solide"],
+    "Roulier (unités)": ["Roulier"],
+}
+
+REV_KEYS = ["droits_port", "pilotage", "remorquage", "lamanage", "ctn", "hydro", "md", "vrac", "roulier"]
+
+# Structures tarifaires des revenus par escale, remplaçables par une autre version (cf. cout_escale.STRUCTURES_TARIFS)
+STRUCTURES_PROJ = {
+    "DROITS_PORT_NAVIRES_TM": DROITS_PORT_NAVIRES_TM, "DROITS_PORT_NAVIRES_NWM": DROITS_PORT_NAVIRES_NWM,
+    "REMORQUAGE_TM": REMORQUAGE_TM, "REMORQUAGE_TM_SUP": REMORQUAGE_TM_SUP,
+    "REMORQUAGE_NWM": REMORQUAGE_NWM, "REMORQUAGE_NWM_SUP": REMORQUAGE_NWM_SUP, "LAMANAGE_TM": LAMANAGE_TM,
+    "PILOTAGE_NWM": PILOTAGE_NWM, "LAMANAGE_NWM": LAMANAGE_NWM,
+}
+
+HYDRO_BLANCS = "Produits blancs (diesel, kérosène, essence, lubrifiants)"
+HYDRO_NOIRS = "Produits noirs (fuel lourd, bitume)"
+
+
+def tarif_hydro_nwm(hydro_type="Mix 60% blancs / 40% noirs", hydro_op="Import/Export"):
+    """Tarif hydrocarbures NWM (€/T) selon le produit dominant et l'opération"""
+    if "blancs" in hydro_type.lower():
+        return HYDROCARBURES_NWM[HYDRO_BLANCS][hydro_op]
+    elif "noirs" in hydro_type.lower():
+        return HYDROCARBURES_NWM[HYDRO_NOIRS][hydro_op]
+    tb = HYDROCARBURES_NWM[HYDRO_BLANCS][hydro_op]
+    tn = HYDROCARBURES_NWM[HYDRO_NOIRS][hydro_op]
+    return 0.6 * tb + 0.4 * tn
+
+
+_ROUL_TM = MARCHANDISES_ROULIER_TM["1.1 Remorque/ensemble routier plein"]
+
+# Tarifs marchandises par défaut de l'onglet Projections (€/TEU, €/T, €/unité)
+TARIFS_PROJ_DEFAUT = {
+    "pct_ts": 70,
+    "t_ctn_ts_nwm": 0.55, "t_ctn_ie_nwm": 38.25,
+    "t_ctn_ts_tm": 0.583, "t_ctn_ie_tm": 38.63,
+    "t_vrac_nwm": 1.23, "t_md_nwm": 0.82,
+    "t_vrac_tm": 0.73, "t_md_tm": 0.86,
+    "t_hydro_nwm": tarif_hydro_nwm(),
+    "t_hydro_tm": tarif_hydro_nwm() * 1.10,  # estimation +10% vs NWM
+    "t_roul_nwm": MARCHANDISES_ROULIER_NWM_DH["Remorques pleines"] / TAUX_DH_EUR_DEFAULT,
+    "t_roul_tm": (_ROUL_TM["Import"] + _ROUL_TM["Export"]) / 2,
+}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ESCALES & VOLUMES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def horizon(fin=PROJ_YEARS[-1]):
+    """Années projetées de 2026 à fin (Annexe 7 jusqu'en 2035, prolongée au-delà)"""
+    if not PROJ_YEARS[0] <= fin <= ANNEE_MAX:
+        raise ValueError(f"Horizon hors limites: {fin} (attendu: {PROJ_YEARS[0]}-{ANNEE_MAX})")
+    return list(range(PROJ_YEARS[0], fin + 1))
+
+
+def annees(computed_escales):
+    """Années couvertes par des escales calculées (longueur des séries de calc_escales)"""
+    return horizon(PROJ_YEARS[0] + len(computed_escales[ESC_CATS[0]]) - 1)
+
+
+def periodes(annee, granularite="annuel"):
+    """Libellés des périodes d'une année: "2026" | "2026-T1"… | "2026-01"…"""
+    if granularite not in GRANULARITES:
+        raise ValueError(f"Granularité inconnue: {granularite!r} (attendu: {', '.join(GRANULARITES)})")
+    n = GRANULARITES[granularite]
+    if n == 1:
+        return [str(annee)]
+    return [f"{annee}-T{i}" if n == 4 else f"{annee}-{i:02d}" for i in range(1, n + 1)]
+
+
+def _prolonger(serie, n):
+    """Série Annexe 7 sur n années (dernière valeur maintenue au-delà de 2035)"""
+    return list(serie[:n]) + [serie[-1]] * (n - len(serie))
+
+
+def escales_annexe7(target_year):
+    """Escales Annexe 7 de l'année cible (arrondies), point de départ des saisies"""
+    ti = PROJ_YEARS.index(target_year)
+    return {cat: int(round(PROJ_ESCALES[cat][ti])) for cat in ESC_CATS}
+
+
+def calc_escales(esc_target, target_year, growth_rate, fin=PROJ_YEARS[-1]):
+    """Escales de 2026 à fin: interpolation linéaire 2026 → cible, puis croissance composée"""
+    computed_escales = {}  # {cat: [une valeur par année de l'horizon]}
+    for cat in ESC_CATS:
+        vals = []
+        base_2026 = PROJ_ESCALES[cat][0]  # Annexe 7 first year
+        target_val = esc_target[cat]
+        years_to_target = target_year - 2026
+
+        for year in horizon(fin):
+            if year < target_year:
+                # Linear interpolation 2026 → target
+                if years_to_target > 0:
+                    frac = (year - 2026) / years_to_target
+                    v = base_2026 + (target_val - base_2026) * frac
+                else:
+                    v = target_val
+            elif year == target_year:
+                v = target_val
+            else:
+                # Compound growth after target
+                years_after = year - target_year
+                v = target_val * ((1 + growth_rate / 100) ** years_after)
+            vals.append(max(0, v))
+        computed_escales[cat] = vals
+    return computed_escales
+
+
+def calc_volumes(computed_escales, linked=True):
+    """Volumes par clé PROJ_TRAFIC: liés aux escales (cargo moyen/navire) ou Annexe 7"""
+    n = len(computed_escales[ESC_CATS[0]])
+    volumes = {k: _prolonger(v, n) for k, v in PROJ_TRAFIC.items()}
+    if linked:
+        per_cat = {cat: [computed_escales[cat][yi] * AVG_CARGO_PER_CALL.get(cat, 0) for yi in range(n)]
+                   for cat in ESC_CATS}
+        for key, cats in VOL_MAP.items():
+            volumes[key] = [sum(per_cat[c][yi] for c in cats) for yi in range(n)]
+    return volumes
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# REVENUS PAR ESCALE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def get_nav(ntype, nav_overrides=None):
+    """Paramètres navire: surcharge utilisateur si présente, sinon Annexe 7"""
+    if nav_overrides and ntype in nav_overrides:
+        return nav_overrides[ntype]
+    d = PROJ_NAVIRES[ntype]
+    return {"gt": d["gt_est"], "nb_rem": d["nb_rem"], "sejour_h": d["sejour_h"],
+            "loa": d["loa"], "beam": d["beam"], "draft": d["draft"]}
+
+
+def calc_revenue_per_call(nav, port="NWM", structures=None):
+    """Calcul revenu par escale pour un type de navire (Navire ou dict get_nav)
+
+    structures: {nom: valeur} remplaçant celles de STRUCTURES_PROJ (autre version tarifaire).
+    """
+    nav = navire(nav)
+    s = {**STRUCTURES_PROJ, **structures} if structures else STRUCTURES_PROJ
+    gt = nav.gt
+    vg_n = nav.vg
+    nb_r = nav.nb_rem
+    sej = nav.sejour_h
+
+    if port == "NWM":
+        # Déterminer terminal NWM
+        term = "Terminal à Conteneurs"  # default
+        r = s["DROITS_PORT_NAVIRES_NWM"][term]
+        dp = vg_n * r["nautique"] + vg_n * r["port"] + calc_stationnement(vg_n, r["stationnement"], sej)
+        pil = calc_pilotage_nwm_entree_sortie(gt, s["PILOTAGE_NWM"]) * 2
+        rem = calc_remorquage(gt, s["REMORQUAGE_NWM"], s["REMORQUAGE_NWM_SUP"]) * nb_r * 2
+        lam = calc_lamanage_nwm(gt, s["LAMANAGE_NWM"])
+    else:  # TM
+        term = "Terminaux à Conteneurs (TC1-TC4)"
+        r = s["DROITS_PORT_NAVIRES_TM"][term]
+        dp = vg_n * r["nautique"] + vg_n * r["port"] + calc_stationnement(vg_n, r["stationnement"], sej)
+        pil = calc_pilotage_tm(vg_n, "Entrée") + calc_pilotage_tm(vg_n, "Sortie")
+        rem = calc_remorquage(gt, s["REMORQUAGE_TM"], s["REMORQUAGE_TM_SUP"]) * nb_r * 2
+        ll = s["LAMANAGE_TM"]["Cat B&C – Autres navires"]
+        lam = max(nav.loa * ll["tarif_ml"], ll["min"])
+
+    return {"droits_port": dp, "pilotage": pil, "remorquage": rem, "lamanage": lam}
+
+
+def calc_revenue_per_call_hydro(nav, port="NWM", structures=None):
+    """Idem pour terminal hydrocarbures"""
+    nav = navire(nav)
+    s = {**STRUCTURES_PROJ, **structures} if structures else STRUCTURES_PROJ
+    gt = nav.gt
+    vg_n = nav.vg
+    nb_r = nav.nb_rem
+    sej = nav.sejour_h
+
+    if port == "NWM":
+        r = s["DROITS_PORT_NAVIRES_NWM"]["Terminal Hydrocarbures"]
+        dp = vg_n * r["nautique"] + vg_n * r["port"] + calc_stationnement(vg_n, r["stationnement"], sej)
+        pil = calc_pilotage_nwm_entree_sortie(gt, s["PILOTAGE_NWM"]) * 2
+        rem = calc_remorquage(gt, s["REMORQUAGE_NWM"], s["REMORQUAGE_NWM_SUP"]) * nb_r * 2
+        lam = calc_lamanage_nwm(gt, s["LAMANAGE_NWM"])
+    else:
+        r = s["DROITS_PORT_NAVIRES_TM"]["Terminal Hydrocarbures"]
+        dp = vg_n * r["nautique"] + vg_n * r["port"] + calc_stationnement(vg_n, r["stationnement"], sej)
+        pil = calc_pilotage_tm(vg_n, "Entrée") + calc_pilotage_tm(vg_n, "Sortie")
+        rem = calc_remorquage(gt, s["REMORQUAGE_TM"], s["REMORQUAGE_TM_SUP"]) * nb_r * 2
+        ll = s["LAMANAGE_TM"]["Cat B&C – Autres navires"]
+        lam = max(nav.loa * ll["tarif_ml"], ll["min"])
+    return {"droits_port": dp, "pilotage": pil, "remorquage": rem, "lamanage": lam}
+
+
+def calc_revenue_per_call_md(nav, port="NWM", structures=None):
+    """Idem pour terminal marchandises diverses / vrac"""
+    nav = navire(nav)
+    s = {**STRUCTURES_PROJ, **structures} if structures else STRUCTURES_PROJ
+    gt = nav.gt
+    vg_n = nav.vg
+    nb_r = nav.nb_rem
+    sej = nav.sejour_h
+
+    if port == "NWM":
+        r = s["DROITS_PORT_NAVIRES_NWM"]["Terminal Marchandises Div"]
+        dp = vg_n * r["nautique"] + vg_n * r["port"] + calc_stationnement(vg_n, r["stationnement"], sej)
+        pil = calc_pilotage_nwm_entree_sortie(gt, s["PILOTAGE_NWM"]) * 2
+        rem = calc_remorquage(gt, s["REMORQUAGE_NWM"], s["REMORQUAGE_NWM_SUP"]) * nb_r * 2
+        lam = calc_lamanage_nwm(gt, s["LAMANAGE_NWM"])
+    else:
+        r = s["DROITS_PORT_NAVIRES_TM"]["Terminal Vrac & MD"]
+        dp = vg_n * r["nautique"] + vg_n * r["port"] + calc_stationnement(vg_n, r["stationnement"], sej)
+        pil = calc_pilotage_tm(vg_n, "Entrée") + calc_pilotage_tm(vg_n, "Sortie")
+        rem = calc_remorquage(gt, s["REMORQUAGE_TM"], s["REMORQUAGE_TM_SUP"]) * nb_r * 2
+        ll = s["LAMANAGE_TM"]["Cat B&C – Autres navires"]
+        lam = max(nav.loa * ll["tarif_ml"], ll["min"])
+    return {"droits_port": dp, "pilotage": pil, "remorquage": rem, "lamanage": lam}
+
+
+def fn_revenue_per_call(cat):
+    """Fonction de revenu par escale selon la catégorie (terminal hydro, conteneurs ou MD/vrac)"""
+    if "Hydro" in cat:
+        return calc_revenue_per_call_hydro
+    elif "Conteneur" in cat:
+        return calc_revenue_per_call
+    return calc_revenue_per_call_md
+
+
+def terminaux_categorie(cat):
+    """(terminal TM, terminal NWM) des revenus par escale de la catégorie (mêmes règles que fn_revenue_per_call)"""
+    if "Hydro" in cat:
+        return "Terminal Hydrocarbures", "Terminal Hydrocarbures"
+    elif "Conteneur" in cat:
+        return "Terminaux à Conteneurs (TC1-TC4)", "Terminal à Conteneurs"
+    return "Terminal Vrac & MD", "Terminal Marchandises Div"
+
+
+def compiler_revenus(nav_overrides=None, structures=None):
+    """Revenus par escale compilés: {catégorie: [(navire, part, revenu NWM, revenu TM) pour PROJ_MAPPING]}
+
+    Chaque couple terminaux × navire n'est évalué qu'une fois (fn_revenue_per_call, calc_vg): les boucles
+    de projection ne font plus que des lectures de table.
+    """
+    navs = {}
+    par_terminal = {}  # (terminal TM, terminal NWM, navire) → (revenu NWM, revenu TM)
+    table = {}
+    for cat in ESC_CATS:
+        fn = fn_revenue_per_call(cat)
+        lignes = []
+        for ntype, pct_nav in PROJ_MAPPING[cat]:
+            k = (*terminaux_categorie(cat), ntype)
+            if k not in par_terminal:
+                nav = navs.setdefault(ntype, navire(get_nav(ntype, nav_overrides)))
+                par_terminal[k] = (fn(nav, "NWM", structures), fn(nav, "TM", structures))
+            lignes.append((ntype, pct_nav, *par_terminal[k]))
+        table[cat] = lignes
+    return table
+
+
+_REVENUS_COMPILES = {}  # empreinte (nav_overrides, structures) → compiler_revenus
+TAILLE_CACHE_REVENUS = 64
+
+
+def revenus_compiles(nav_overrides=None, structures=None):
+    """compiler_revenus mémorisé par empreinte des surcharges navires et des structures (lecture seule)"""
+    k = json.dumps([nav_overrides, structures], sort_keys=True, ensure_ascii=False, default=repr)
+    table = _REVENUS_COMPILES.get(k)
+    if table is None:
+        if len(_REVENUS_COMPILES) >= TAILLE_CACHE_REVENUS:
+            _REVENUS_COMPILES.pop(next(iter(_REVENUS_COMPILES)))
+        table = _REVENUS_COMPILES[k] = compiler_revenus(nav_overrides, structures)
+    return table
+
+
+def calc_revenus_par_escale(nav_overrides=None, structures=None):
+    """Table revenu par escale NWM/TM pour chaque couple catégorie × navire de référence"""
+    rows = []
+    for cat, lignes in revenus_compiles(nav_overrides, structures).items():
+        for ntype, pct_nav, c_nwm, c_tm in lignes:
+            for port, c in (("NWM", c_nwm), ("TM", c_tm)):
+                rows.append({"categorie": cat, "navire": ntype, "part": pct_nav, "port": port,
+                             **c, "total": sum(c.values())})
+    return rows
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CALCUL ANNUEL
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _fraction(rev, periode, n):
+    """Revenus annuels → part d'une période (répartition uniforme sur l'année)"""
+    return {"year": rev["year"], "periode": periode, **{k: v / n for k, v in rev.items() if k != "year"}}
+
+
+def iter_projection(computed_escales, volumes, tarifs, nav_overrides=None, structures=None, granularite="annuel"):
+    """Revenus NWM et TM période par période: produit (rev_nwm, rev_tm) au fil du calcul de chaque année
+
+    Horizon = longueur des séries de computed_escales (calc_escales(..., fin)); granularite trimestriel /
+    mensuel: chaque année est répartie uniformément sur ses périodes (clé "periode" en plus de "year").
+    structures: autre version des structures tarifaires par escale (cf. calc_revenue_per_call).
+    """
+    par_an = len(periodes(PROJ_YEARS[0], granularite))
+    t = {**TARIFS_PROJ_DEFAUT, **tarifs}
+    pct_ts = t["pct_ts"]
+    pct_ie = 100 - pct_ts
+    revenus = revenus_compiles(nav_overrides, structures)
+
+    for yi, year in enumerate(annees(computed_escales)):
+        rev_nwm = {"year": year, "droits_port": 0, "pilotage": 0, "remorquage": 0, "lamanage": 0,
+                    "ctn": 0, "hydro": 0, "md": 0, "vrac": 0, "roulier": 0, "escales": 0}
+        rev_tm = {"year": year, "droits_port": 0, "pilotage": 0, "remorquage": 0, "lamanage": 0,
+                   "ctn": 0, "hydro": 0, "md": 0, "vrac": 0, "roulier": 0, "escales": 0}
+
+        for cat in ESC_CATS:
+            nb_esc = computed_escales[cat][yi]
+            if nb_esc <= 0:
+                continue
+            rev_nwm["escales"] += nb_esc
+            rev_tm["escales"] += nb_esc
+
+            for _, pct_nav, c_nwm, c_tm in revenus[cat]:
+                esc_part = nb_esc * pct_nav
+                for k in ["droits_port", "pilotage", "remorquage", "lamanage"]:
+                    rev_nwm[k] += c_nwm[k] * esc_part
+                    rev_tm[k] += c_tm[k] * esc_part
+
+        # Cargo revenue - Conteneurs
+        teu_total = volumes["Total Conteneurs (TEU)"][yi]
+        rev_nwm["ctn"] = teu_total * (pct_ts/100 * t["t_ctn_ts_nwm"] + pct_ie/100 * t["t_ctn_ie_nwm"])
+        rev_tm["ctn"] = teu_total * (pct_ts/100 * t["t_ctn_ts_tm"] + pct_ie/100 * t["t_ctn_ie_tm"])
+
+        # Cargo revenue - Hydrocarbures
+        hydro_total = volumes["Total Hydrocarbures (T)"][yi]
+        rev_nwm["hydro"] = hydro_total * t["t_hydro_nwm"]
+        rev_tm["hydro"] = hydro_total * t["t_hydro_tm"]
+
+        # Cargo revenue - Marchandises Diverses
+        md_total = volumes["Marchandises Div. (T)"][yi]
+        rev_nwm["md"] = md_total * t["t_md_nwm"]
+        rev_tm["md"] = md_total * t["t_md_tm"]
+
+        # Cargo revenue - Vrac Solide
+        vrac_total = volumes["Vrac Solide (T)"][yi]
+        rev_nwm["vrac"] = vrac_total * t["t_vrac_nwm"]
+        rev_tm["vrac"] = vrac_total * t["t_vrac_tm"]
+
+        # Cargo revenue - Roulier
+        roul_total = volumes["Roulier (unités)"][yi]
+        rev_nwm["roulier"] = roul_total * t["t_roul_nwm"]
+        rev_tm["roulier"] = roul_total * t["t_roul_tm"]
+
+        # Totals
+        for rev in (rev_nwm, rev_tm):
+            rev["navire_total"] = rev["droits_port"] + rev["pilotage"] + rev["remorquage"] + rev["lamanage"]
+            rev["cargo_total"] = rev["ctn"] + rev["hydro"] + rev["md"] + rev["vrac"] + rev["roulier"]
+            rev["total"] = rev["navire_total"] + rev["cargo_total"]
+
+        if par_an == 1:
+            yield rev_nwm, rev_tm
+        else:
+            for periode in periodes(year, granularite):
+                yield _fraction(rev_nwm, periode, par_an), _fraction(rev_tm, periode, par_an)
+
+
+def calc_projection(computed_escales, volumes, tarifs, nav_overrides=None, structures=None):
+    """Revenus annuels NWM et TM (listes de dicts, une entrée par année de l'horizon)"""
+    results_nwm = []
+    results_tm = []
+    for rev_nwm, rev_tm in iter_projection(computed_escales, volumes, tarifs, nav_overrides, structures):
+        results_nwm.append(rev_nwm)
+        results_tm.append(rev_tm)
+    return results_nwm, results_tm
@@ -0,0 +1,134 @@
+"""
+rapprochement.py — Rapprochement des factures portuaires réelles (TM / NWM) avec le simulateur
+
+Classeurs de factures (XLSX), lus en flux (openpyxl read_only, ligne à ligne):
+    feuille "lignes"  : escale, poste (libellé de POSTES_FACTURE), montant
+    feuille "escales" : escale, port, loa, beam, draft, gt [+ paramètres de FACTURE_DEFAUT]
+                        (ou classeur d'escales séparé; mouvements_pilotage séparés par ";")
+Chaque escale est refacturée par facture.factures_lot, puis chaque couple (escale, poste) facturé
+est comparé au montant simulé. Seuls les agrégats par (escale, poste) sont gardés en mémoire:
+une année de factures se traite sans charger les classeurs entiers.
+
+Usage en ligne de commande:
+    python rapprochement.py factures_2025_*.xlsx --escales escales_2025.xlsx --sortie ecarts.csv
+    python rapprochement.py --modele modele_factures.xlsx
+"""
+import argparse
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from classeurs import ecrire_classeur, lignes_feuille, ouvrir
+from facture import FACTURE_DEFAUT, POSTES_FACTURE, factures_lot
+
+TOLERANCE_EUR = 1.0       # écart absolu toléré
+TOLERANCE_REL = 0.005     # écart relatif toléré (0,5 % du montant simulé)
+COLONNES_ESCALES = ["escale", "loa", "beam", "draft", "gt"] + list(FACTURE_DEFAUT)
+COLONNES_LIGNES = ["escale", "poste", "montant"]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LECTURE EN FLUX
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def lire_feuille(source, feuille):
+    """Lignes d'une feuille, sans charger le classeur en mémoire (read_only)"""
+    wb = ouvrir(source)
+    try:
+        yield from lignes_feuille(wb, feuille)
+    finally:
+        wb.close()
+
+
+def _escale(row):
+    """Ligne de la feuille escales → (identifiant, dict d'escale pour facture.py)"""
+    e = {k: v for k, v in row.items() if k in COLONNES_ESCALES}
+    ident = str(e.pop("escale"))
+    if isinstance(e.get("mouvements_pilotage"), str):
+        e["mouvements_pilotage"] = tuple(m.strip() for m in e["mouvements_pilotage"].split(";") if m.strip())
+    return ident, e
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# RAPPROCHEMENT
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def montants_simules(escales):
+    """{identifiant: escale} → {(identifiant, poste): montant simulé}"""
+    ids = list(escales)
+    lignes = factures_lot(escales[i] for i in ids)
+    cle = np.array(ids, dtype=object)[lignes["facture"]]
+    simule = defaultdict(float)
+    for i, p, m in zip(cle, lignes["poste"], lignes["montant"]):
+        simule[(i, POSTES_FACTURE[p])] += m
+    return simule
+
+
+def rapprocher(factures, escales=None, tol_eur=TOLERANCE_EUR, tol_rel=TOLERANCE_REL, alias=None):
+    """Compare les lignes facturées aux montants simulés → DataFrame par (escale, poste) avec statut
+
+    statut: ok | ecart | non_simule (facturé, absent de la simulation) | non_facture | escale_inconnue
+    """
+    alias = alias or {}
+    sources = list(factures)
+    esc = dict(_escale(r) for r in lire_feuille(escales, "escales")) if escales is not None else {}
+    facture = defaultdict(float)
+    for src in sources:
+        wb = ouvrir(src)  # un seul parcours par classeur
+        try:
+            if escales is None:
+                esc.update(_escale(r) for r in lignes_feuille(wb, "escales"))
+            for r in lignes_feuille(wb, "lignes"):
+                poste = str(r.get("poste", "")).strip()
+                facture[(str(r["escale"]), alias.get(poste, poste))] += float(r.get("montant", 0.0))
+        finally:
+            wb.close()
+    simule = montants_simules(esc)
+    factures_escales = {i for i, _ in facture}
+    cles = list(facture) + [k for k in simule if k not in facture and k[0] in factures_escales]
+    df = pd.DataFrame(cles, columns=["escale", "poste"])
+    df["port"] = [esc[i].get("port", FACTURE_DEFAUT["port"]) if i in esc else None for i in df["escale"]]
+    df["facture"] = np.array([facture.get(k, np.nan) for k in cles], dtype="float64")
+    df["simule"] = np.array([simule.get(k, np.nan) for k in cles], dtype="float64")
+    df["ecart"] = df["facture"].fillna(0.0) - df["simule"].fillna(0.0)
+    df["ecart_rel"] = df["ecart"] / df["simule"].where(df["simule"] != 0)
+    hors_tol = df["ecart"].abs() > np.maximum(tol_eur, tol_rel * df["simule"].abs().fillna(0.0))
+    df["statut"] = np.select(
+        [~df["escale"].isin(list(esc)), df["simule"].isna(), df["facture"].isna(), hors_tol],
+        ["escale_inconnue", "non_simule", "non_facture", "ecart"], "ok")
+    return df.sort_values(["escale", "poste"], ignore_index=True)
+
+
+def synthese_rapprochement(df):
+    """Nombre de lignes et montants par statut"""
+    return (df.groupby("statut").agg(lignes=("poste", "size"), facture=("facture", "sum"), simule=("simule", "sum"),
+                                     ecart=("ecart", "sum")).reset_index())
+
+
+def modele_classeur(dest):
+    """Classeur vide au format attendu (feuilles escales et lignes), écrit en flux (write_only)"""
+    ecrire_classeur({
+        "escales": (COLONNES_ESCALES, [["ESC-0001", 190.94, 32.2, 6.5, 22341] +
+                                       [";".join(v) if isinstance(v, tuple) else v for v in FACTURE_DEFAUT.values()]]),
+        "lignes": (COLONNES_LIGNES, [["ESC-0001", POSTES_FACTURE[0], 0.0]]),
+    }, dest)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Rapprochement factures portuaires réelles / simulateur")
+    p.add_argument("factures", nargs="*")
+    p.add_argument("--escales", help="classeur des escales (sinon feuille 'escales' des factures)")
+    p.add_argument("--tolerance", type=float, default=TOLERANCE_EUR, help="écart absolu toléré (€)")
+    p.add_argument("--tolerance-rel", type=float, default=TOLERANCE_REL)
+    p.add_argument("--sortie", help="CSV des lignes rapprochées")
+    p.add_argument("--modele", help="écrit un classeur modèle et s'arrête")
+    args = p.parse_args()
+    if args.modele:
+        modele_classeur(args.modele)
+        print(args.modele)
+    else:
+        res = rapprocher(args.factures, args.escales, args.tolerance, args.tolerance_rel)
+        print(synthese_rapprochement(res).to_string(index=False))
+        if args.sortie:
+            res.to_csv(args.sortie, index=False)
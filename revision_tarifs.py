@@ -0,0 +1,189 @@
+"""
+revision_tarifs.py — Comparaison de deux versions tarifaires et impact sur les escales (flotte ou historique)
+
+Une version tarifaire est un dict {structure: valeur} sur STRUCTURES_TARIFS (PILOTAGE_TM, REMORQUAGE_NWM,
+DROITS_PORT_NAVIRES_*, ALG_*, ...), enregistrée en JSON; une version partielle reprend les structures
+en vigueur (tarifs_data) pour les clés absentes.
+    diff_tarifs()  — écarts paramètre par paramètre (chemin dans la structure, avant / après)
+    impact()       — chaque lot d'escales est retarifé sous les deux versions dans la même passe
+                     (calc_cout_flotte vectorisé); seuls les agrégats par poste × terminal × tranche GT
+                     sont conservés, un historique de plusieurs années se traite à mémoire constante.
+
+Usage en ligne de commande:
+    python revision_tarifs.py --modele tarifs_2025.json
+    python revision_tarifs.py tarifs_2026.json --historique --sortie impact.csv
+    python revision_tarifs.py tarifs_2026.json --avant tarifs_2025.json --flotte flotte.xlsx
+"""
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from cout_escale import PORTS, POSTES_COUT, STRUCTURES_TARIFS, tarifs_courants, calc_cout_flotte
+from flotte import TRANCHES_GT, LIBELLES_TRANCHES_GT
+from navires import CHOIX, LotEscales
+
+TOTAL = "TOTAL"
+TERMINAL_PORT = {"TM": "terminal_tm", "NWM": "terminal_nwm", "Algeciras": None}
+COLONNES_IMPACT = ["port", "poste", "terminal", "tranche_gt", "escales", "escales_touchees", "avant", "apres", "impact",
+                   "impact_pct"]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# VERSIONS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def version(structures=None):
+    """Version complète: structures en vigueur remplacées par celles fournies; ValueError si structure inconnue"""
+    inconnues = sorted(set(structures or {}) - set(STRUCTURES_TARIFS))
+    if inconnues:
+        raise ValueError(f"Structures tarifaires inconnues: {inconnues} (attendu: {', '.join(STRUCTURES_TARIFS)})")
+    return {**tarifs_courants(), **(structures or {})}
+
+
+def charger_version(source):
+    """Fichier JSON (chemin ou objet fichier) → version complète"""
+    if hasattr(source, "read"):
+        return version(json.loads(source.read()))
+    with open(source, encoding="utf-8") as f:
+        return version(json.load(f))
+
+
+def ecrire_version(v, dest):
+    """Version → JSON (modèle à modifier pour une nouvelle version)"""
+    with open(dest, "w", encoding="utf-8") as f:
+        json.dump(v, f, ensure_ascii=False, indent=1)
+
+
+def json_version(v):
+    return json.dumps(v, ensure_ascii=False, indent=1)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ÉCARTS PARAMÈTRE PAR PARAMÈTRE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def aplatir(obj, chemin=""):
+    """Structure imbriquée (dicts, listes de tranches) → {chemin "a / b / 0 / 2": valeur}"""
+    if isinstance(obj, dict):
+        items = obj.items()
+    elif isinstance(obj, (list, tuple)):
+        items = enumerate(obj)
+    else:
+        return {chemin: obj}
+    out = {}
+    for k, v in items:
+        out.update(aplatir(v, f"{chemin} / {k}" if chemin else str(k)))
+    return out
+
+
+def diff_tarifs(avant, apres):
+    """Paramètres modifiés, ajoutés ou supprimés entre deux versions → DataFrame"""
+    rows = []
+    for s in STRUCTURES_TARIFS:
+        a, b = aplatir(avant[s]), aplatir(apres[s])
+        for p in list(a) + [p for p in b if p not in a]:
+            va, vb = a.get(p), b.get(p)
+            if va == vb:
+                continue
+            num = isinstance(va, (int, float)) and isinstance(vb, (int, float))
+            rows.append({"structure": s, "parametre": p, "avant": va, "apres": vb,
+                         "ecart": vb - va if num else np.nan,
+                         "ecart_pct": (vb / va - 1) * 100 if num and va else np.nan,
+                         "statut": "ajoute" if p not in a else "supprime" if p not in b else "modifie"})
+    return pd.DataFrame(rows, columns=["structure", "parametre", "avant", "apres", "ecart", "ecart_pct", "statut"])
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# IMPACT SUR LES ESCALES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _lots(escales):
+    if isinstance(escales, LotEscales):
+        yield escales
+    elif isinstance(escales, pd.DataFrame):
+        yield LotEscales.depuis_table(escales)
+    else:
+        yield from escales
+
+
+def impact(escales, avant, apres):
+    """Escales (LotEscales, DataFrame ou itérable de LotEscales) tarifées sous les deux versions
+    → DataFrame par port × poste (POSTES_COUT + TOTAL) × terminal × tranche GT: escales, escales touchées,
+    montants, impact (€, %)"""
+    nc = len(LIBELLES_TRANCHES_GT)
+    acc = {}
+    for lot in _lots(escales):
+        ca, cb = calc_cout_flotte(lot, avant), calc_cout_flotte(lot, apres)
+        classe = np.clip(np.searchsorted(TRANCHES_GT, lot.gt, side="left") - 1, 0, nc - 1)
+        for port in PORTS:
+            col = TERMINAL_PORT[port]
+            nt = len(CHOIX[col]) if col else 1
+            cle = (getattr(lot, col).astype("i8") if col else 0) * nc + classe
+            for p in POSTES_COUT + [TOTAL]:
+                a, b = (ca[port], cb[port]) if p == TOTAL else (ca[f"{port} · {p}"], cb[f"{port} · {p}"])
+                a, b = a.to_numpy(), b.to_numpy()
+                a_, b_ = np.nan_to_num(a), np.nan_to_num(b)
+                n = acc.setdefault((port, p), np.zeros((4, nt * nc)))
+                n[0] += np.bincount(cle, minlength=nt * nc)
+                n[1] += np.bincount(cle, weights=(np.abs(b - a) > 1e-9) | (np.isnan(a) != np.isnan(b)), minlength=nt * nc)
+                n[2] += np.bincount(cle, weights=a_, minlength=nt * nc)
+                n[3] += np.bincount(cle, weights=b_, minlength=nt * nc)
+    rows = []
+    for (port, p), n in acc.items():
+        col = TERMINAL_PORT[port]
+        for k in np.flatnonzero(n[0]):
+            rows.append({"port": port, "poste": p, "terminal": CHOIX[col][k // nc] if col else "—",
+                         "tranche_gt": LIBELLES_TRANCHES_GT[k % nc], "escales": int(n[0, k]),
+                         "escales_touchees": int(n[1, k]), "avant": n[2, k], "apres": n[3, k]})
+    df = pd.DataFrame(rows, columns=COLONNES_IMPACT[:-2])
+    df["impact"] = df["apres"] - df["avant"]
+    df["impact_pct"] = df["impact"] / df["avant"].where(df["avant"] != 0) * 100
+    return df
+
+
+def impact_historique(avant, apres, annees=None, ports=None, racine=None):
+    """Impact sur l'historique d'escales stocké (historique.lire, memory-map)"""
+    from historique import RACINE_HISTORIQUE, lire
+    return impact((lot for *_, lot in lire(racine or RACINE_HISTORIQUE, annees, ports)), avant, apres)
+
+
+def synthese_impact(df, axe="poste"):
+    """Impact agrégé par port × axe (poste, terminal ou tranche_gt; hors poste: lignes TOTAL)"""
+    src = df if axe == "poste" else df[df["poste"] == TOTAL]
+    g = src.groupby(["port", axe], sort=False)[["escales", "escales_touchees", "avant", "apres", "impact"]].sum()
+    g["impact_pct"] = g["impact"] / g["avant"].where(g["avant"] != 0) * 100
+    return g.reset_index()
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Écarts entre versions tarifaires et impact sur les escales")
+    p.add_argument("apres", nargs="?", help="version tarifaire JSON (nouvelle)")
+    p.add_argument("--avant", help="version de référence JSON (défaut: tarifs en vigueur)")
+    p.add_argument("--flotte", help="flotte XLSX / CSV à retarifer")
+    p.add_argument("--historique", action="store_true", help="retarifer l'historique d'escales stocké")
+    p.add_argument("--annees", type=int, nargs="*")
+    p.add_argument("--sortie", help="CSV de l'impact détaillé")
+    p.add_argument("--modele", help="écrit la version en vigueur en JSON et s'arrête")
+    args = p.parse_args()
+    if args.modele:
+        ecrire_version(tarifs_courants(), args.modele)
+        print(args.modele)
+    else:
+        v_avant = charger_version(args.avant) if args.avant else version()
+        v_apres = charger_version(args.apres)
+        print(diff_tarifs(v_avant, v_apres).to_string(index=False))
+        if args.historique:
+            res = impact_historique(v_avant, v_apres, args.annees)
+        elif args.flotte:
+            from classeurs import lire_flotte
+            from estimation import completer, incomplet
+            fl = lire_flotte(args.flotte) if args.flotte.endswith(".xlsx") else pd.read_csv(args.flotte)
+            res = impact(completer(fl) if incomplet(fl) else fl, v_avant, v_apres)
+        else:
+            res = None
+        if res is not None:
+            print(synthese_impact(res).to_string(index=False))
+            if args.sortie:
+                res.to_csv(args.sortie, index=False)
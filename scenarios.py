@@ -0,0 +1,145 @@
+"""
+scenarios.py — Comparaison de jeux de scénarios de projection (escales × tarifs × navires)
+
+Chaque scénario est un dict plat, par ex.:
+    {"nom": "Croissance 5%", "target_year": 2030, "growth_rate": 5.0, "pct_ts": 80,
+     "t_ctn_ie_nwm": 36.0, "navires": {"Feeder": {"gt": 25000}}, "escales": {"Roulier": 60}}
+Les clés absentes reprennent les valeurs par défaut de l'onglet Projections (Annexe 7).
+Les scénarios sont évalués en parallèle (pool de processus) et mis en cache disque
+(cache_disque) par empreinte: un scénario inchangé n'est jamais recalculé.
+"""
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import cache_disque
+import navires
+import projections
+from tarifs_data import PROJ_YEARS
+from projections import (
+    ESC_CATS, REV_KEYS, TARIFS_PROJ_DEFAUT, escales_annexe7, calc_escales, calc_volumes,
+    get_nav, calc_projection,
+)
+
+SCENARIO_DEFAUT = {"target_year": 2030, "growth_rate": 3.0, "linked": True}
+POSTES = REV_KEYS + ["navire_total", "cargo_total", "total", "escales"]
+
+
+def normaliser_scenario(sc):
+    """Complète un scénario avec les valeurs par défaut (hors nom) et valide ses clés"""
+    inconnues = set(sc) - {"nom", "escales", "navires"} - set(SCENARIO_DEFAUT) - set(TARIFS_PROJ_DEFAUT)
+    if inconnues:
+        raise ValueError(f"Scénario {sc.get('nom', '?')!r}: paramètres inconnus {sorted(inconnues)}")
+    out = {k: sc.get(k, v) for k, v in SCENARIO_DEFAUT.items()}
+    out["target_year"] = int(out["target_year"])
+    if out["target_year"] not in PROJ_YEARS:
+        raise ValueError(f"Année cible hors horizon: {out['target_year']}")
+    out["growth_rate"] = float(out["growth_rate"])
+    out["linked"] = bool(out["linked"])
+    out["tarifs"] = {k: float(sc.get(k, v)) for k, v in TARIFS_PROJ_DEFAUT.items()}
+    esc = escales_annexe7(out["target_year"])
+    esc.update(sc.get("escales") or {})
+    out["escales"] = {cat: float(esc[cat]) for cat in ESC_CATS}
+    navs = {}
+    for ntype, ov in (sc.get("navires") or {}).items():
+        inconnus = set(ov) - set(get_nav(ntype))
+        if inconnus:
+            raise ValueError(f"Scénario {sc.get('nom', '?')!r}: paramètres navire inconnus {sorted(inconnus)} ({ntype})")
+        navs[ntype] = {**get_nav(ntype), **ov}
+    out["navires"] = navs
+    return out
+
+
+def scenario_hash(sc):
+    """Empreinte SHA-256 du scénario normalisé (le nom n'intervient pas)"""
+    payload = json.dumps(normaliser_scenario(sc), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def projection_scenario(sc=None, fin=PROJ_YEARS[-1]):
+    """Entrées de projection d'un scénario jusqu'à l'année fin → {escales, volumes, tarifs, nav_overrides, linked}"""
+    n = normaliser_scenario(sc or {})
+    escales = calc_escales(n["escales"], n["target_year"], n["growth_rate"], fin)
+    return {"escales": escales, "volumes": calc_volumes(escales, n["linked"]), "tarifs": n["tarifs"],
+            "nav_overrides": n["navires"] or None, "linked": n["linked"]}
+
+
+def calc_scenario(sc):
+    """Projection complète d'un scénario → (results_nwm, results_tm)"""
+    p = projection_scenario(sc)
+    return calc_projection(p["escales"], p["volumes"], p["tarifs"], p["nav_overrides"])
+
+
+# Modules dont dépend le résultat d'une projection (tarifs_data est déjà dans toute clé cache_disque)
+MODULES_PROJECTION = (projections, navires)
+
+
+def _cle_cache(h):
+    """Clé disque d'un scénario: empreinte scénario + données tarifaires + moteur de projection et navires"""
+    return cache_disque.cle("scenario", h, [cache_disque.empreinte_fichier(m.__file__) for m in MODULES_PROJECTION])
+
+
+def resultats_long(nom, results_nwm, results_tm):
+    """Aplatit les résultats annuels en format long: scenario, port, year, poste, valeur"""
+    rows = []
+    for port, results in (("NWM", results_nwm), ("TM", results_tm)):
+        for r in results:
+            for p in POSTES:
+                rows.append({"scenario": nom, "port": port, "year": r["year"], "poste": p, "valeur": float(r[p])})
+    return rows
+
+
+def iter_scenarios(scenarios, max_workers=None, cache=True):
+    """Évalue un jeu de scénarios et produit (nom, lignes longues) au fil des résultats (cache disque d'abord)"""
+    noms = [sc.get("nom") or f"Scénario {i + 1}" for i, sc in enumerate(scenarios)]
+    if len(set(noms)) != len(noms):
+        raise ValueError("Les noms de scénarios doivent être uniques")
+    hashes = [scenario_hash(sc) for sc in scenarios]
+    noms_par_hash = {}
+    for nom, h in zip(noms, hashes):
+        noms_par_hash.setdefault(h, []).append(nom)
+
+    a_calculer = {}
+    for sc, h in zip(scenarios, hashes):
+        if h in a_calculer:
+            continue
+        cached = cache_disque.lire(_cle_cache(h)) if cache else None
+        if cached is None:
+            a_calculer[h] = sc
+        elif noms_par_hash.get(h):
+            for nom in noms_par_hash.pop(h):
+                yield nom, resultats_long(nom, *cached)
+
+    def publier(h, res):
+        if cache:
+            cache_disque.ecrire(_cle_cache(h), res)
+        for nom in noms_par_hash[h]:
+            yield nom, resultats_long(nom, *res)
+
+    if len(a_calculer) == 1 or max_workers == 1:
+        for h, sc in a_calculer.items():
+            yield from publier(h, list(calc_scenario(sc)))
+    elif a_calculer:
+        pool = ProcessPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {pool.submit(calc_scenario, sc): h for h, sc in a_calculer.items()}
+            for f in as_completed(futures):
+                yield from publier(futures[f], list(f.result()))
+        finally:  # générateur fermé (tâche annulée): les scénarios non démarrés sont abandonnés
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def table_scenarios(partiels, noms=None):
+    """Partiels (nom, lignes) → DataFrame long combiné, dans l'ordre des noms si fourni"""
+    par_nom = dict(partiels)
+    ordre = noms if noms is not None else list(par_nom)
+    rows = [r for nom in ordre if nom in par_nom for r in par_nom[nom]]
+    return pd.DataFrame(rows, columns=["scenario", "port", "year", "poste", "valeur"])
+
+
+def run_scenarios(scenarios, max_workers=None, cache=True):
+    """Évalue un jeu de scénarios en parallèle et renvoie un DataFrame long combiné"""
+    noms = [sc.get("nom") or f"Scénario {i + 1}" for i, sc in enumerate(scenarios)]
+    return table_scenarios(iter_scenarios(scenarios, max_workers, cache), noms)
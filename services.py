@@ -0,0 +1,102 @@
+"""
+services.py — Facturation des fournitures et services à l'escale (TM / NWM / Algeciras)
+
+Entrée: relevés de consommation (compteurs, vacations), une ligne par relevé:
+    escale, port (TM | NWM | Algeciras), service (clé de SERVICES), quantite
+    nb — optionnel, multiplicateur (remorqueurs en veille / mis à disposition)
+Les services horaires sont facturés par heure entamée et par vacation, avec les minimums
+(vedette en rade, taxi rade) et les tranches horaires de REMORQUEUR_DISPO_TM (tarif horaire
+selon la durée de la mise à disposition). Le calcul est vectorisé sur l'ensemble des relevés;
+les frais de branchement sont ajoutés une fois par escale et par fourniture consommée.
+"""
+import numpy as np
+import pandas as pd
+
+from tarifs_data import (
+    FOURNITURES, ALG_UTILITIES, REMORQUEUR_DISPO_TM, VEILLE_SECURITE, VEDETTE_PILOTAGE_TM, TAXI_RADE_TM, SECURITE_TM,
+)
+from cout_escale import PORTS
+
+# service → unité, tarif par port (absent = non publié), minimum par vacation, facturation à l'heure entamée
+SERVICES = {
+    "eau": {"unite": "m³", "TM": FOURNITURES["Eau potable"]["tarif"], "NWM": FOURNITURES["Eau potable"]["tarif"],
+            "Algeciras": ALG_UTILITIES["Eau locale (autres)"]},
+    "elec_bt": {"unite": "kWh", "TM": FOURNITURES["Électricité BT"]["tarif"], "NWM": FOURNITURES["Électricité BT"]["tarif"],
+                "Algeciras": ALG_UTILITIES["Électricité générale"]},
+    "elec_mt": {"unite": "kWh", "TM": FOURNITURES["Électricité MT"]["tarif"], "NWM": FOURNITURES["Électricité MT"]["tarif"],
+                "Algeciras": ALG_UTILITIES["Électricité haute tension"]},
+    "remorqueur_dispo": {"unite": "h", "TM": REMORQUEUR_DISPO_TM["1-2h"], "horaire": True},  # tarif selon tranche
+    "veille_securite": {"unite": "h", "TM": VEILLE_SECURITE["TM"], "NWM": VEILLE_SECURITE["NWM"], "horaire": True},
+    "vedette_interieur": {"unite": "h", "TM": VEDETTE_PILOTAGE_TM["Intérieur port (€/h)"], "horaire": True},
+    "vedette_rade": {"unite": "h", "TM": VEDETTE_PILOTAGE_TM["Rade/mouillage (€/h)"], "horaire": True,
+                     "minimum": VEDETTE_PILOTAGE_TM["Minimum rade"]},
+    "taxi_rade": {"unite": "h", "TM": TAXI_RADE_TM["Tarif horaire"], "horaire": True, "minimum": TAXI_RADE_TM["Minimum"]},
+    "taxi_marchandise": {"unite": "kg", "TM": TAXI_RADE_TM["Transport marchandise (€/kg)"],
+                         "minimum": TAXI_RADE_TM["Minimum marchandise"]},
+    "securite_equipe": {"unite": "h", "TM": SECURITE_TM["Mise à disposition équipe (€/h)"], "horaire": True},
+}
+# Frais de branchement par escale et par fourniture consommée
+BRANCHEMENTS = {
+    ("TM", "eau"): FOURNITURES["Branchement eau"]["tarif"],
+    ("NWM", "eau"): FOURNITURES["Branchement eau"]["tarif"],
+    ("Algeciras", "eau"): ALG_UTILITIES["Connexion eau navire"],
+    ("Algeciras", "elec_bt"): ALG_UTILITIES["Connexion électricité navire"],
+    ("Algeciras", "elec_mt"): ALG_UTILITIES["Connexion électricité navire"],
+}
+
+
+def _tranches_dispo():
+    """REMORQUEUR_DISPO_TM ("1-2h", "3-12h", "13h+") → bornes hautes et tarifs horaires"""
+    bornes, taux = [], []
+    for k, t in REMORQUEUR_DISPO_TM.items():
+        if not k.endswith("+"):
+            bornes.append(int(k.rstrip("h").split("-")[1]))
+        taux.append(t)
+    return np.array(bornes), np.array(taux, dtype="float64")
+
+
+DISPO_BORNES_H, DISPO_TAUX = _tranches_dispo()
+
+# Tables compilées indexées par code (port, service)
+_CLES = [(p, s) for p in PORTS for s in SERVICES]
+_TAUX = np.array([SERVICES[s].get(p, np.nan) for p, s in _CLES], dtype="float64")
+_MINIMUM = np.array([SERVICES[s].get("minimum", 0.0) if p in SERVICES[s] else 0.0 for p, s in _CLES], dtype="float64")
+_HORAIRE = np.array([SERVICES[s].get("horaire", False) for p, s in _CLES])
+_BRANCHEMENTS = pd.DataFrame([{"port": p, "service": s, "montant": m} for (p, s), m in BRANCHEMENTS.items()])
+
+
+def tarifer_releves(releves):
+    """Ajoute quantite_facturee et montant (€) à chaque relevé; NaN = service non publié dans ce port"""
+    df = releves.copy()
+    p = pd.Categorical(df["port"], categories=PORTS).codes
+    s = pd.Categorical(df["service"], categories=list(SERVICES)).codes
+    if (p < 0).any() or (s < 0).any():
+        inconnus = sorted(set(df.loc[(p < 0) | (s < 0), ["port", "service"]].astype(str).agg("/".join, axis=1)))
+        raise ValueError(f"Port ou service inconnu: {inconnus}")
+    code = p * len(SERVICES) + s
+    q = df["quantite"].to_numpy(dtype="float64")
+    q = np.where(_HORAIRE[code], np.ceil(q), q)
+    taux = _TAUX[code]
+    dispo = (s == list(SERVICES).index("remorqueur_dispo")) & (p == PORTS.index("TM"))
+    taux = np.where(dispo, DISPO_TAUX[np.searchsorted(DISPO_BORNES_H, q, side="left")], taux)
+    nb = df["nb"].to_numpy(dtype="float64") if "nb" in df else 1.0
+    df["quantite_facturee"] = q
+    df["montant"] = np.where(q > 0, np.maximum(q * taux, _MINIMUM[code]), q * taux) * nb  # minimum: par vacation effective
+    return df
+
+
+def factures_services(releves):
+    """Facture par escale × port × service (branchements inclus), relevés agrégés en une passe"""
+    df = tarifer_releves(releves)
+    lignes = (df.groupby(["escale", "port", "service"], sort=True, observed=True)[["quantite", "montant"]]
+              .sum(min_count=1).reset_index())
+    frais = lignes[lignes["quantite"] > 0][["escale", "port", "service"]].merge(_BRANCHEMENTS, on=["port", "service"])
+    frais["service"] = "branchement_" + frais["service"]
+    frais["quantite"] = 1.0
+    return pd.concat([lignes, frais], ignore_index=True).sort_values(["escale", "port", "service"], ignore_index=True)
+
+
+def totaux_escale(factures):
+    """Total services par escale et par port (colonnes TM / NWM / Algeciras); NaN = aucun service publié dans ce port"""
+    return (factures.groupby(["escale", "port"], sort=True, observed=True)["montant"].sum(min_count=1)
+            .unstack("port").reindex(columns=PORTS))
@@ -0,0 +1,59 @@
+"""
+stockage_vrac.py — Facturation du stockage vrac Tanger Med (Hangar / Terre-plein)
+
+Les tranches STOCKAGE_VRAC_TM (j1_5, j6_15, j16_25, j26+ en €/T/jour) sont compilées en sommes
+cumulées par jour: le coût d'un couple (tonnage, jours) est une simple lecture de tableau.
+Les fonctions acceptent des vecteurs numpy: un inventaire de milliers de lots se réévalue
+en une opération quand les durées changent.
+"""
+import numpy as np
+
+from tarifs_data import STOCKAGE_VRAC_TM
+
+
+def compiler_vrac(bande):
+    """Tranches {"jA_B": taux, "jA+": taux} → {"cumul": €/T cumulés par jour, "seuil", "taux_final"}
+
+    Les jours non couverts par une tranche (ex. J1-5 en terre-plein) sont gratuits.
+    """
+    tranches = []
+    for k, taux in bande.items():
+        bornes = k[1:].split("_")
+        debut = int(bornes[0].rstrip("+"))
+        fin = int(bornes[1]) if len(bornes) > 1 else None
+        tranches.append((debut, fin, taux))
+    tranches.sort()
+    debut_final, fin_final, taux_final = tranches[-1]
+    if fin_final is not None:
+        raise ValueError(f"Dernière tranche non ouverte: {bande}")
+    seuil = debut_final - 1  # jours couverts par la table, au-delà taux_final par jour
+    taux_jour = np.zeros(seuil + 1)
+    for debut, fin, taux in tranches[:-1]:
+        taux_jour[debut:fin + 1] = taux
+    return {"cumul": np.cumsum(taux_jour), "seuil": seuil, "taux_final": taux_final}
+
+
+BAREMES_VRAC = {lieu: compiler_vrac(b) for lieu, b in STOCKAGE_VRAC_TM.items()}
+
+
+def cout_vrac(lieu, tonnage, jours):
+    """Coût de stockage (€) pour tonnage × jours entamés; scalaires ou tableaux (broadcast numpy)"""
+    c = BAREMES_VRAC[lieu]
+    j = np.maximum(np.ceil(np.asarray(jours, dtype="float64")), 0).astype("int64")
+    par_tonne = np.where(j <= c["seuil"], c["cumul"][np.minimum(j, c["seuil"])],
+                         c["cumul"][-1] + (j - c["seuil"]) * c["taux_final"])
+    cout = par_tonne * np.asarray(tonnage, dtype="float64")
+    return float(cout) if cout.ndim == 0 else cout
+
+
+def cout_lots(lieux, tonnages, jours):
+    """Coût de chaque lot d'un inventaire (vecteurs alignés lieu / tonnage / jours)"""
+    lieux = np.asarray(lieux)
+    tonnages = np.asarray(tonnages, dtype="float64")
+    jours = np.asarray(jours, dtype="float64")
+    out = np.full(len(lieux), np.nan)
+    for lieu in BAREMES_VRAC:
+        m = lieux == lieu
+        if m.any():
+            out[m] = cout_vrac(lieu, tonnages[m], jours[m])
+    return out
@@ -0,0 +1,168 @@
+"""
+tableaux.py — Grilles de comparaison des barèmes TM / NWM / Algeciras
+Construites hors Streamlit; les grilles statiques sont mémoïsées en mémoire (lru_cache): leur calcul coûte
+moins qu'un aller-retour pickle sur disque.
+
+Les grilles gardent des colonnes numériques (float64, NaN = non publié): tri et calculs vectorisés
+restent possibles. Le formatage (€, %, M€) n'est appliqué qu'au rendu, à partir des formats printf
+attachés dans df.attrs["formats"] (voir afficher_table dans app.py).
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+
+from tarifs_data import (
+    DROITS_PORT_NAVIRES_TM, DROITS_PORT_NAVIRES_NWM, REMORQUAGE_TM, REMORQUAGE_NWM, REMORQUAGE_NWM_SUP,
+    MANUTENTION_CTN_TM, MARCHANDISES_DIV_TM, MARCHANDISES_DIV_NWM, HYDROCARBURES_NWM,
+    ALG_PILOTAGE_TARIFS, calc_remorquage,
+)
+
+
+def fmt(v): return f"{v:,.2f} €"
+def pct(tm, nwm):
+    if tm == 0: return "—"
+    d = (nwm - tm) / tm * 100
+    return f"{'+' if d > 0 else ''}{d:.1f}%"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# COUCHE TABLE NUMÉRIQUE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Formats printf (st.column_config.NumberColumn)
+EUR = "%.2f €"
+EUR1 = "%.1f"
+TAUX = "%.3f"
+PCT = "%+.1f%%"
+MEUR = "%.2f"
+ENTIER = "%d"
+
+
+def table(rows, formats=None, columns=None):
+    """Lignes → DataFrame numérique, avec les formats d'affichage {colonne: printf} dans attrs"""
+    df = pd.DataFrame(rows, columns=columns)
+    df.attrs["formats"] = {c: f for c, f in (formats or {}).items() if c in df.columns}
+    return df
+
+
+def ecart_pct(tm, autre):
+    """Écart relatif en % vs TM, vectorisé (NaN si base nulle ou absente) — pendant numérique de pct()"""
+    tm = np.asarray(tm, dtype="float64")
+    autre = np.asarray(autre, dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(tm > 0, (autre - tm) / tm * 100, np.nan)
+
+
+@functools.lru_cache(maxsize=32)
+def grille_droits_port():
+    """Taux droits de port TM vs NWM par type de terminal (€/m³)"""
+    rows = []
+    mapping = [("TC", "Terminaux à Conteneurs (TC1-TC4)", "Terminal à Conteneurs"),
+               ("Vrac/MD", "Terminal Vrac & MD", "Terminal Marchandises Div"),
+               ("Hydrocarbures", "Terminal Hydrocarbures", "Terminal Hydrocarbures"),
+               ("GPL/GAZ", "Navires GPL", "Terminal GAZ")]
+    for label, tm_k, nwm_k in mapping:
+        a = DROITS_PORT_NAVIRES_TM.get(tm_k, {})
+        b = DROITS_PORT_NAVIRES_NWM.get(nwm_k, {})
+        if a and b:
+            rows.append({"Terminal": label,
+                "TM Naut.": a["nautique"], "NWM Naut.": b["nautique"],
+                "TM Port": a["port"], "NWM Port": b["port"],
+                "TM Stat.": a["stationnement"], "NWM Stat.": b["stationnement"]})
+    return table(rows)
+
+
+@functools.lru_cache(maxsize=32)
+def grille_remorquage():
+    """Barème remorquage TM par tranche GT, avec le tarif NWM au milieu de tranche"""
+    lo, hi, t = (np.array(c) for c in zip(*REMORQUAGE_TM))
+    n = np.array([calc_remorquage(g, REMORQUAGE_NWM, REMORQUAGE_NWM_SUP) for g in (lo + hi) // 2], dtype="float64")
+    return table({"GT": [f"{a:,}–{b:,}" for a, b in zip(lo, hi)], "TM (€)": t.astype("float64"),
+                  "NWM (€)": n, "Δ": ecart_pct(t, n)},
+                 {"TM (€)": EUR1, "NWM (€)": EUR1, "Δ": PCT})
+
+
+@functools.lru_cache(maxsize=32)
+def grille_manutention_ctn():
+    """Manutention conteneurs TM par terminal (tarifs max publics)"""
+    rows = []
+    for tc, v in MANUTENTION_CTN_TM.items():
+        rows.append({"Terminal": tc, "20' Bord-Quai": v["20_bord_quai"], "40' Bord-Quai": v["40_bord_quai"],
+                     "20' Terre": v["20_terre"], "Pesage": v["pesage"]})
+    return table(rows, {c: EUR for c in ("20' Bord-Quai", "40' Bord-Quai", "20' Terre", "Pesage")})
+
+
+@functools.lru_cache(maxsize=32)
+def grille_marchandises_div(tonnage):
+    """Marchandises diverses TM vs NWM (€/T et total pour le tonnage donné; NaN = non publié)"""
+    all_md = sorted(set(MARCHANDISES_DIV_TM) | set(MARCHANDISES_DIV_NWM))
+    a = np.array([MARCHANDISES_DIV_TM.get(t) or np.nan for t in all_md], dtype="float64")
+    b = np.array([MARCHANDISES_DIV_NWM.get(t) or np.nan for t in all_md], dtype="float64")
+    c_tm, c_nwm = f"TM ({tonnage:,}T)", f"NWM ({tonnage:,}T)"
+    return table({"Marchandise": all_md, "TM (€/T)": a, "NWM (€/T)": b,
+                  c_tm: a * tonnage, c_nwm: b * tonnage, "Écart": ecart_pct(a, b)},
+                 {"TM (€/T)": TAUX, "NWM (€/T)": TAUX, c_tm: EUR, c_nwm: EUR, "Écart": PCT})
+
+
+@functools.lru_cache(maxsize=32)
+def grille_hydrocarbures(ton_h):
+    """Hydrocarbures NWM par produit et opération"""
+    col = f"Total {ton_h:,}T"
+    rows = []
+    for p, ops in HYDROCARBURES_NWM.items():
+        for o, t in ops.items():
+            rows.append({"Produit": p, "Opération": o, "€/T": t, col: t * ton_h})
+    return table(rows, {col: EUR})
+
+
+@functools.lru_cache(maxsize=32)
+def grille_alg_pilotage(gt):
+    """Barème pilotage Algeciras (fixe + variable × GT) avec exemple pour le GT donné"""
+    col = f"Exemple GT={gt:,}"
+    rows = []
+    for tr, mouvs in ALG_PILOTAGE_TARIFS.items():
+        for m, vals in mouvs.items():
+            rows.append({"Tranche": tr, "Mouvement": m, "Fixe (€)": vals["fixe"], "Variable (€/GT)": vals["variable"],
+                         col: vals["fixe"] + vals["variable"] * gt})
+    return table(rows, {col: EUR})
+
+
+def grille_stockage_ctn(tarifs, nb_j):
+    """Stockage conteneur jour par jour (franchise / J3-7 / J8+) avec cumul, sans boucle"""
+    jours = np.arange(1, nb_j + 1)
+    periode = np.select([jours <= tarifs["franchise"], jours <= 7], ["Franchise", "J3-7"], "J8+")
+    t = np.select([jours <= tarifs["franchise"], jours <= 7], [0.0, tarifs["j3_7"]], tarifs["j8+"])
+    return table({"Jour": jours, "Période": periode, "€/j": t, "Cumul": np.cumsum(t)},
+                 {"€/j": EUR, "Cumul": EUR})
+
+
+def grille_recap_cout(cout):
+    """Récapitulatif coût d'escale 3 ports (sortie de calc_cout_escale) avec ligne TOTAL et écarts vs TM"""
+    tot = cout["totaux"]
+    a = np.append(cout["TM"], tot["TM"]).astype("float64")
+    b = np.append(cout["NWM"], tot["NWM"]).astype("float64")
+    c = np.append(cout["Algeciras"], tot["Algeciras"]).astype("float64")
+    return table({"Poste": list(cout["postes"]) + ["🔴 TOTAL"], "🔵 TM": a, "🔴 NWM": b, "🟢 Algeciras": c,
+                  "Δ ALG vs TM": ecart_pct(a, c), "Δ NWM vs TM": ecart_pct(a, b)},
+                 {"🔵 TM": EUR, "🔴 NWM": EUR, "🟢 Algeciras": EUR, "Δ ALG vs TM": PCT, "Δ NWM vs TM": PCT})
+
+
+def grille_projection(results, col_total):
+    """Résultats annuels d'un port → tableau complet en M€ (col_total = libellé de la colonne total)"""
+    df = pd.DataFrame(results)
+    cols = {"droits_port": "Droits Port", "pilotage": "Pilotage", "remorquage": "Remorquage", "lamanage": "Lamanage",
+            "navire_total": "σ Navire", "ctn": "Conteneurs", "hydro": "Hydrocarbures", "md": "March. Div.",
+            "vrac": "Vrac", "roulier": "Roulier", "cargo_total": "σ Cargo", "total": col_total}
+    data = {"Année": df["year"], "Escales": df["escales"].round()}
+    data.update({c: df[k] / 1e6 for k, c in cols.items()})
+    return table(data, {"Escales": ENTIER, **{c: MEUR for c in cols.values()}})
+
+
+def grille_ecart_projection(results_nwm, results_tm):
+    """Revenu total NWM vs TM par année (M€) avec écart relatif"""
+    tn = np.array([r["total"] for r in results_nwm], dtype="float64")
+    tt = np.array([r["total"] for r in results_tm], dtype="float64")
+    return table({"Année": [r["year"] for r in results_nwm], "NWM Total (M€)": tn / 1e6, "TM Total (M€)": tt / 1e6,
+                  "Δ NWM vs TM": ecart_pct(tt, tn), "Escales": [round(r["escales"]) for r in results_nwm]},
+                 {"NWM Total (M€)": MEUR, "TM Total (M€)": MEUR, "Δ NWM vs TM": PCT, "Escales": ENTIER})
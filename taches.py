@@ -0,0 +1,101 @@
+"""
+taches.py — Exécution de calculs longs en arrière-plan (jeux de scénarios, balayages)
+
+Le script Streamlit ne bloque plus: lancer() démarre un générateur de résultats partiels sur un
+pool de threads local et renvoie immédiatement l'état de la tâche (dict partagé avec le thread):
+    etat        — en_attente | en_cours | termine | annule | erreur
+    progression — 0..1 (partiels reçus / total annoncé)
+    partiels    — résultats partiels dans l'ordre d'arrivée (ex. scénario par scénario, année par année)
+    resultat    — valeur de retour du générateur (return), sinon liste des partiels
+    erreur      — message si le calcul a échoué
+Chaque tâche porte une clé (empreinte des entrées): relancer sous le même nom avec une autre clé
+annule la tâche périmée (drapeau vérifié entre deux partiels, générateur fermé proprement).
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+NB_THREADS = 2
+ETATS_FINAUX = ("termine", "annule", "erreur")
+
+_pool = None
+_verrou = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _verrou:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=NB_THREADS, thread_name_prefix="tache")
+    return _pool
+
+
+def _executer(t, gen_fn, args, kwargs):
+    """Consomme le générateur dans un thread du pool; s'arrête au premier partiel après annulation"""
+    if t["annuler"].is_set():
+        t["etat"] = "annule"
+        return
+    t["etat"] = "en_cours"
+    t["debut"] = time.monotonic()
+    gen = gen_fn(*args, **kwargs)
+    try:
+        while True:
+            if t["annuler"].is_set():
+                gen.close()
+                t["etat"] = "annule"
+                return
+            try:
+                partiel = next(gen)
+            except StopIteration as fin:
+                t["resultat"] = fin.value if fin.value is not None else list(t["partiels"])
+                break
+            t["partiels"].append(partiel)
+            if t["total"]:
+                t["progression"] = min(len(t["partiels"]) / t["total"], 1.0)
+        t["progression"] = 1.0
+        t["etat"] = "termine"
+    except Exception as exc:  # remonté à l'interface, le pool reste utilisable
+        t["erreur"] = f"{type(exc).__name__}: {exc}"
+        t["etat"] = "erreur"
+    finally:
+        t["duree_s"] = time.monotonic() - t["debut"]
+
+
+def lancer(taches, nom, cle, gen_fn, *args, total=None, **kwargs):
+    """Démarre gen_fn(*args, **kwargs) en arrière-plan sous taches[nom] (dict de session)
+
+    Si une tâche de même nom et de même clé existe déjà (en cours ou terminée), elle est renvoyée telle quelle;
+    une tâche de même nom mais de clé différente est annulée et remplacée.
+    """
+    t = taches.get(nom)
+    if t is not None and t["cle"] == cle and t["etat"] not in ("annule", "erreur"):
+        return t
+    annuler(taches, nom)
+    t = {"nom": nom, "cle": cle, "etat": "en_attente", "progression": 0.0, "total": total, "partiels": [],
+         "resultat": None, "erreur": None, "debut": None, "duree_s": None, "annuler": threading.Event()}
+    t["future"] = _get_pool().submit(_executer, t, gen_fn, args, kwargs)
+    taches[nom] = t
+    return t
+
+
+def annuler(taches, nom):
+    """Annule la tâche nom si elle n'est pas terminée (retirée de la file si elle n'a pas démarré)"""
+    t = taches.get(nom)
+    if t is None or t["etat"] in ETATS_FINAUX:
+        return False
+    t["annuler"].set()
+    if t["future"].cancel():
+        t["etat"] = "annule"
+    return True
+
+
+def annuler_si_perimee(taches, nom, cle):
+    """Annule la tâche nom si ses entrées (clé) ne correspondent plus aux entrées courantes"""
+    t = taches.get(nom)
+    if t is not None and t["cle"] != cle:
+        return annuler(taches, nom)
+    return False
+
+
+def en_cours(t):
+    return t is not None and t["etat"] in ("en_attente", "en_cours")
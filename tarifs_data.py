@@ -47,6 +47,7 @@ ROULIERS_NWM = {
     "Forfait unique (≤8h)": {"forfait": 1700, "duree_h": 8.0, "suppl_30min": 200},
 }
 ROULIERS_NWM_NAUTIQUE = 0.005  # €/m³
+TAUX_DH_EUR_DEFAULT = 10.85  # conversion des tarifs NWM publiés en DH
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # 2. PILOTAGE
@@ -148,13 +149,20 @@ def calc_pilotage_tm(volume_m3, mouvement):
 
 
 # --- NWM: formule linéaire basée sur GTs ---
-def calc_pilotage_nwm_entree_sortie(gts):
-    """Pilotage NWM: 0.022641381 × GTs + 21.26, min 261.1€"""
-    return max(0.022641381 * gts + 21.25659786, 261.1)
+PILOTAGE_NWM = {
+    "Entrée/Sortie":      {"variable": 0.022641381, "fixe": 21.25659786, "min": 261.1},  # €/GT, €, € minimum
+    "Changement de quai": {"variable": 0.011521001, "fixe": 145.23524,   "min": 261.1},
+}
+
+def calc_pilotage_nwm_entree_sortie(gts, pilotage=None):
+    """Pilotage NWM: 0.022641381 × GTs + 21.26, min 261.1€ (pilotage: autre version de PILOTAGE_NWM)"""
+    p = (pilotage or PILOTAGE_NWM)["Entrée/Sortie"]
+    return max(p["variable"] * gts + p["fixe"], p["min"])
 
-def calc_pilotage_nwm_chg_quai(gts):
+def calc_pilotage_nwm_chg_quai(gts, pilotage=None):
     """Pilotage NWM changement quai: 0.011521001 × GTs + 145.24, min 261.1€"""
-    return max(0.011521001 * gts + 145.23524, 261.1)
+    p = (pilotage or PILOTAGE_NWM)["Changement de quai"]
+    return max(p["variable"] * gts + p["fixe"], p["min"])
 
 # NWM majorations: navire désemparé = tarif doublé (×2)
 # NWM exonérations: navires de guerre, pêche marocains, remorqueurs marocains,
@@ -214,9 +222,12 @@ LAMANAGE_TM = {
 # TM: lamanage TC1-TC4 NON mentionné dans le cahier (convention séparée)
 
 # NWM: formule linéaire basée sur GTs
-def calc_lamanage_nwm(gts):
-    """Lamanage NWM: 0.0108104 × GTs + 6.68"""
-    return 0.0108104 * gts + 6.68
+LAMANAGE_NWM = {"variable": 0.0108104, "fixe": 6.68}  # €/GT, €
+
+def calc_lamanage_nwm(gts, lamanage=None):
+    """Lamanage NWM: 0.0108104 × GTs + 6.68 (lamanage: autre version de LAMANAGE_NWM)"""
+    l = lamanage or LAMANAGE_NWM
+    return l["variable"] * gts + l["fixe"]
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -480,7 +491,7 @@ PARKING_TIR_TM = {
     "Fourgons/souffrance":              {"franchise_h": 24, "tarif_24h": 20},
     "Matière Dangereuse":               {"franchise_j": 2, "j2_4": 25, "j4+": 100},
 }
-# Plafond litiges douane: 1 000€ max
+PARKING_TIR_PLAFOND_LITIGE = 1000  # Plafond litiges douane: 1 000€ max par séjour
 
 TVCU_MANUTENTION_TM = {
     "Véhicule tourisme neuf Cat A – Import": 16.65,
@@ -759,17 +770,17 @@ ALG_UTILITIES = {
 ALG_DECHETS_BASE_R1 = 80.0   # Navires cargo
 ALG_DECHETS_BASE_R1_PAX = 75.0  # Navires à passagers
 ALG_DECHETS_BASE_R2_PAX = 0.25  # €/personne (pax seulement)
-
-def calc_alg_dechets(gt, nb_pax=0):
-    """Taxe déchets navires Algeciras"""
-    if gt <= 2500:
-        coef = 1.50
-    elif gt <= 25000:
-        coef = 0.0006 * gt
-    elif gt <= 100000:
-        coef = 0.00012 * gt + 12
-    else:
-        coef = 24.00
+# Coefficient R1 par tranche de GT: (GT max, × GT, fixe), au-delà de la dernière tranche: max
+ALG_DECHETS_COEF = {"tranches": [(2500, 0.0, 1.50), (25000, 0.0006, 0.0), (100000, 0.00012, 12.0)], "max": 24.00}
+
+def calc_alg_dechets(gt, nb_pax=0, coef_dechets=None):
+    """Taxe déchets navires Algeciras (coef_dechets: autre version de ALG_DECHETS_COEF)"""
+    d = coef_dechets or ALG_DECHETS_COEF
+    coef = d["max"]
+    for gt_max, variable, fixe in d["tranches"]:
+        if gt <= gt_max:
+            coef = variable * gt + fixe
+            break
     if nb_pax > 0:
         return ALG_DECHETS_BASE_R1_PAX * coef + ALG_DECHETS_BASE_R2_PAX * nb_pax
     return ALG_DECHETS_BASE_R1 * coef
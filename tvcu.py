@@ -0,0 +1,97 @@
+"""
+tvcu.py — Tarification des manifestes véhicules au terminal TVCU (Tanger Med)
+
+Un manifeste est une table avec une ligne par véhicule (ou par lot avec une colonne "nb"):
+    type       — clé de TYPES_TVCU (tourisme, engin_hh, engin_remorque, leger_roulant)
+    poids_t    — poids / PTAC en tonnes (choix de la classe Cat A/B/C, ≤10T/>10T, ≤50T/>50T)
+    operation  — Import, Export ou Transbordement
+    depannage  — optionnel, remorquage dépannage facturé selon le PTAC (REMORQUAGE_DEPANNAGE_TM)
+    escale     — optionnel, identifiant d'escale pour ventiler une saison
+Les tarifs sont lus dans un index catégoriel précompilé (type × classe de poids × opération):
+une escale de 6 000 véhicules ou une saison complète se tarifie en une passe colonnaire.
+"""
+import numpy as np
+import pandas as pd
+
+from tarifs_data import TVCU_MANUTENTION_TM, REMORQUAGE_DEPANNAGE_TM
+
+OPERATIONS_TVCU = ["Import", "Export", "Transbordement"]
+TYPES_TVCU = {
+    "tourisme":       {"seuils_t": [1.5, 3.0], "classes": ["Véhicule tourisme neuf Cat A", "Véhicule Cat B (1,5-3T)", "Véhicule Cat C (3-5T)"]},
+    "engin_hh":       {"seuils_t": [10.0], "classes": ["Engin H&H neuf", "Engin H&H neuf >10T"]},
+    "engin_remorque": {"seuils_t": [50.0], "classes": ["Engin remorqué ≤50T", "Engin remorqué >50T"]},
+    "leger_roulant":  {"seuils_t": [], "classes": ["Véhicule léger roulant"]},
+}
+DEPANNAGE_SEUILS_T = [3.5, 8.0]
+DEPANNAGE_TARIFS = np.array([REMORQUAGE_DEPANNAGE_TM["PTAC ≤ 3,5T"], REMORQUAGE_DEPANNAGE_TM["PTAC 3,5T – 8T"],
+                             REMORQUAGE_DEPANNAGE_TM["PTAC > 8T"]], dtype="float64")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# INDEX CATÉGORIEL
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def compiler_index():
+    """Index [type, classe, opération] → position dans LIBELLES (-1 = non publié)"""
+    types = list(TYPES_TVCU)
+    nb_classes = max(len(t["classes"]) for t in TYPES_TVCU.values())
+    index = np.full((len(types), nb_classes, len(OPERATIONS_TVCU)), -1, dtype="int64")
+    libelles = list(TVCU_MANUTENTION_TM)
+    for ti, t in enumerate(types):
+        for ci, classe in enumerate(TYPES_TVCU[t]["classes"]):
+            for oi, op in enumerate(OPERATIONS_TVCU):
+                k = f"{classe} – {op}"
+                if k in TVCU_MANUTENTION_TM:
+                    index[ti, ci, oi] = libelles.index(k)
+    return index, libelles
+
+
+INDEX_TVCU, LIBELLES_TVCU = compiler_index()
+TARIFS_TVCU = np.array([TVCU_MANUTENTION_TM[k] for k in LIBELLES_TVCU] + [np.nan], dtype="float64")  # [-1] = non publié
+
+
+def _codes(serie, categories, nom):
+    codes = pd.Categorical(serie, categories=categories).codes
+    if (codes < 0).any():
+        inconnus = sorted(set(pd.Series(serie)[codes < 0].astype(str)))
+        raise ValueError(f"{nom} inconnu(s): {inconnus} (attendu: {', '.join(categories)})")
+    return codes
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TARIFICATION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def tarifer_manifeste(manifeste):
+    """Ajoute libelle / manutention / depannage / total (€ par ligne, × nb) au manifeste"""
+    df = manifeste.copy()
+    t = _codes(df["type"], list(TYPES_TVCU), "Type")
+    o = _codes(df["operation"], OPERATIONS_TVCU, "Opération")
+    poids = df["poids_t"].to_numpy(dtype="float64")
+    classe = np.zeros(len(df), dtype="int64")
+    for ti, spec in enumerate(TYPES_TVCU.values()):
+        m = t == ti
+        if m.any() and spec["seuils_t"]:
+            classe[m] = np.searchsorted(spec["seuils_t"], poids[m], side="left")  # bornes hautes incluses
+    idx = INDEX_TVCU[t, classe, o]
+    nb = df["nb"].to_numpy(dtype="float64") if "nb" in df else 1.0
+    df["libelle"] = pd.Categorical.from_codes(idx, categories=LIBELLES_TVCU)  # -1 → NaN (non publié)
+    df["manutention"] = TARIFS_TVCU[idx] * nb
+    if "depannage" in df:
+        dep = df["depannage"].fillna(False).to_numpy(dtype=bool)
+        df["depannage_eur"] = np.where(dep, DEPANNAGE_TARIFS[np.searchsorted(DEPANNAGE_SEUILS_T, poids, side="left")], 0.0) * nb
+    else:
+        df["depannage_eur"] = 0.0
+    df["total"] = df["manutention"].fillna(0.0) + df["depannage_eur"]
+    return df
+
+
+def ventilation(tarife, par=None):
+    """Ventilation par catégorie tarifaire (et par escale si par="escale"): véhicules et montants"""
+    nb = tarife["nb"] if "nb" in tarife else 1
+    lib = tarife["libelle"].cat.add_categories("Non publié").fillna("Non publié")
+    cles = ([par] if par else []) + ["libelle"]
+    out = (tarife.assign(libelle=lib, vehicules=nb).groupby(cles, observed=True, sort=True)
+           [["vehicules", "manutention", "depannage_eur", "total"]].sum().reset_index())
+    out["libelle"] = out["libelle"].astype(str)
+    return out